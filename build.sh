@@ -8,5 +8,11 @@ pip install -r requirements.txt
 # Run database migrations
 python manage.py migrate
 
+# Make resized derivatives for course images that lack them
+python manage.py generate_image_variants
+
 # Collect static files for production
 python manage.py collectstatic --noinput
+
+# Prerender the static pages served by WhiteNoise
+python manage.py prerender_pages
@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -44,11 +44,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Add whitenoise for static files
+    'script.middleware.HubWhiteNoiseMiddleware',  # WhiteNoise for static files and prerendered pages
+    'script.middleware.QueryBudgetMiddleware',  # Query counts, Server-Timing and N+1 warnings
+    'script.middleware.ReplicaPinMiddleware',  # Read-your-writes for replica reads
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'script.middleware.HubUserMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -57,7 +60,8 @@ ROOT_URLCONF = 'javascript.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that also times renders for QueryBudgetMiddleware
+        'BACKEND': 'script.instrumentation.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / "templates"],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -92,6 +96,12 @@ GOOGLE_OAUTH2_USERINFO_URL = 'https://www.googleapis.com/oauth2/v2/userinfo'
 GITHUB_OAUTH2_AUTH_URL = 'https://github.com/login/oauth/authorize'
 GITHUB_OAUTH2_TOKEN_URL = 'https://github.com/login/oauth/access_token'
 GITHUB_OAUTH2_USERINFO_URL = 'https://api.github.com/user'
+GITHUB_OAUTH2_EMAILS_URL = 'https://api.github.com/user/emails'
+
+# Outbound calls to the identity providers share a keep-alive pool with strict timeouts (seconds)
+OAUTH_HTTP_TIMEOUT = config('OAUTH_HTTP_TIMEOUT', default=5.0, cast=float)
+OAUTH_HTTP_CONNECT_TIMEOUT = config('OAUTH_HTTP_CONNECT_TIMEOUT', default=3.0, cast=float)
+OAUTH_HTTP_MAX_CONNECTIONS = config('OAUTH_HTTP_MAX_CONNECTIONS', default=20, cast=int)
 
 
 # Database
@@ -115,6 +125,169 @@ if 'DATABASE_URL' in os.environ:
     except ImportError:
         pass
 
+# SQLite profile for single-node deployments, applied to every new connection.
+# WAL lets readers run alongside the single writer; IMMEDIATE transactions take
+# the write lock at BEGIN, so a transaction never fails upgrading from a read
+# lock and busy_timeout can queue writers instead of raising "database is locked".
+SQLITE_TUNED = config('SQLITE_TUNED', default=True, cast=bool)
+SQLITE_SYNCHRONOUS = config('SQLITE_SYNCHRONOUS', default='NORMAL')
+SQLITE_MMAP_SIZE = config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int)
+# Negative values are KiB, positive values are pages
+SQLITE_CACHE_SIZE = config('SQLITE_CACHE_SIZE', default=-64000, cast=int)
+SQLITE_BUSY_TIMEOUT = config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int)
+# Queue hot progress writes on a per-process lock before they reach SQLite
+SQLITE_SERIALIZE_WRITES = config('SQLITE_SERIALIZE_WRITES', default=True, cast=bool)
+
+if SQLITE_TUNED and DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default'].setdefault('OPTIONS', {}).update({
+        'init_command': ';'.join([
+            'PRAGMA journal_mode=WAL',
+            f'PRAGMA synchronous={SQLITE_SYNCHRONOUS}',
+            f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}',
+            f'PRAGMA cache_size={SQLITE_CACHE_SIZE}',
+            f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}',
+            'PRAGMA temp_store=MEMORY',
+        ]),
+        'transaction_mode': 'IMMEDIATE',
+        # sqlite3's own busy handler, in seconds; matches the pragma above
+        'timeout': SQLITE_BUSY_TIMEOUT / 1000,
+    })
+    # Tests run against a file so concurrent connections behave as in production
+    DATABASES['default'].setdefault('TEST', {})['NAME'] = BASE_DIR / 'test_db.sqlite3'
+
+# Read replicas, e.g. DATABASE_REPLICA_URLS=postgres://replica-1/hub,postgres://replica-2/hub.
+# Views marked read_from_replica read from a random replica; clients that just
+# wrote read from the primary for REPLICA_PIN_SECONDS.
+DATABASE_REPLICAS = []
+for index, url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv())):
+    import dj_database_url
+    alias = f'replica_{index + 1}'
+    DATABASES[alias] = dj_database_url.parse(url, conn_max_age=600, conn_health_checks=True)
+    # Under test the replicas read the test database
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['script.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
+# Request instrumentation
+# Per-request query count, database and template time as a Server-Timing
+# header and a JSON line on the script.requests logger; off by default in
+# production, where the per-query wrapper costs every request
+QUERY_INSTRUMENTATION = config('QUERY_INSTRUMENTATION', default=DEBUG, cast=bool)
+# The header exposes query counts and timings, so only by default when debugging
+QUERY_SERVER_TIMING = config('QUERY_SERVER_TIMING', default=DEBUG, cast=bool)
+# Warn when one SQL shape runs more often than this in a single request
+QUERY_REPEAT_THRESHOLD = config('QUERY_REPEAT_THRESHOLD', default=5, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'script': {
+            'handlers': ['console'],
+            'level': config('LOG_LEVEL', default='WARNING'),
+        },
+    },
+}
+
+# Learning progress
+# When enabled, LessonProgress rows are created on first access instead of at enrollment
+LAZY_LESSON_PROGRESS = config('LAZY_LESSON_PROGRESS', default=False, cast=bool)
+
+# Buffer percentage-only progress updates in memory and write them in bulk.
+# Completions are always written immediately.
+PROGRESS_WRITE_BEHIND = config('PROGRESS_WRITE_BEHIND', default=False, cast=bool)
+PROGRESS_FLUSH_INTERVAL = config('PROGRESS_FLUSH_INTERVAL', default=5, cast=float)
+PROGRESS_BUFFER_MAX = config('PROGRESS_BUFFER_MAX', default=1000, cast=int)
+
+# Rows fetched per round trip by the streaming enrollment/progress exports
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+# Exports stop this many seconds before now, so transactions still committing
+# with an earlier updated_at are picked up by the next incremental run
+EXPORT_SAFETY_LAG = config('EXPORT_SAFETY_LAG', default=300, cast=int)
+
+
+# Cache
+# File based by default so every gunicorn worker sees the same invalidations;
+# set REDIS_URL to share one Redis cache instead
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / '.cache')),
+        }
+    }
+
+# Seconds to cache the logged in User between requests (0 disables the cache)
+HUB_USER_CACHE_TTL = config('HUB_USER_CACHE_TTL', default=60, cast=int)
+
+# Seconds a rendered catalog page is cached; Course changes invalidate it immediately
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=600, cast=int)
+
+# Seconds a user's dashboard summary is cached; progress and enrollment changes invalidate it (0 disables)
+DASHBOARD_CACHE_TIMEOUT = config('DASHBOARD_CACHE_TIMEOUT', default=300, cast=int)
+
+
+# Contact form submissions are appended to a local spool file and inserted
+# in batches by a background drainer (CONTACT_DRAIN_INTERVAL=0 leaves draining
+# to `manage.py drain_contact_queue`). Identical submissions within
+# CONTACT_DEDUP_WINDOW seconds are stored once.
+CONTACT_QUEUE = config('CONTACT_QUEUE', default=True, cast=bool)
+CONTACT_SPOOL_DIR = config('CONTACT_SPOOL_DIR', default=str(BASE_DIR / 'spool'))
+CONTACT_DRAIN_INTERVAL = config('CONTACT_DRAIN_INTERVAL', default=2, cast=float)
+CONTACT_BATCH_SIZE = config('CONTACT_BATCH_SIZE', default=500, cast=int)
+CONTACT_DEDUP_WINDOW = config('CONTACT_DEDUP_WINDOW', default=600, cast=int)
+
+# Password hashing
+# https://docs.djangoproject.com/en/5.1/topics/auth/passwords/
+
+# The preferred hasher signs new passwords; the others still verify older hashes,
+# which are upgraded to the preferred one on the next successful login.
+# argon2 and bcrypt need argon2-cffi / bcrypt installed.
+PASSWORD_HASHER_CHOICES = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'bcrypt': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='pbkdf2')
+PASSWORD_HASHERS = [PASSWORD_HASHER_CHOICES[PASSWORD_HASHER]] + [
+    hasher for name, hasher in PASSWORD_HASHER_CHOICES.items() if name != PASSWORD_HASHER
+]
+
+# Password hashes run on a small per-process pool so a burst of logins cannot
+# occupy every request thread; requests beyond the queue limit are turned away
+PASSWORD_HASH_WORKERS = config('PASSWORD_HASH_WORKERS', default=2, cast=int)
+PASSWORD_HASH_QUEUE = config('PASSWORD_HASH_QUEUE', default=16, cast=int)
+
+# Sessions
+# https://docs.djangoproject.com/en/5.1/topics/http/sessions/
+
+# db: a django_session query on every request.
+# cached_db: reads come from a short-lived process-local copy, then the shared
+#   cache, and fall back to the database; writes go to all three.
+# signed_cookies: no server-side storage; the small payload we keep lives in a
+#   signed cookie, so a session cannot be revoked before it expires.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'script.sessions',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_MODE = config('SESSION_MODE', default='cached_db')
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+# Seconds a process may serve a session from its local tier (0 disables the tier)
+SESSION_LOCAL_CACHE_TTL = config('SESSION_LOCAL_CACHE_TTL', default=5, cast=int)
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -156,13 +329,30 @@ STATICFILES_DIRS = [BASE_DIR / "static",]
 # Static files configuration for production
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
-# Enable WhiteNoise for static files
-STATICFILES_STORAGE = 'whitenoise.storage.StaticFilesStorage'
+# Content-hashed, gzip and brotli precompressed static files served by WhiteNoise
+# with far-future immutable cache headers
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'script.storage.HubStaticFilesStorage',
+    },
+}
+
+# Static pages rendered at build time by `manage.py prerender_pages`
+PRERENDER_ROOT = BASE_DIR / 'prerendered'
+PRERENDER_MAX_AGE = config('PRERENDER_MAX_AGE', default=300, cast=int)
 
 # Media files (User uploaded content)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Widths of the WebP/JPEG derivatives made for course images, and the
+# background threads that make them (0 generates them inline)
+IMAGE_VARIANT_WIDTHS = config('IMAGE_VARIANT_WIDTHS', default='320,640,960', cast=lambda v: [int(w) for w in v.split(',')])
+IMAGE_WORKERS = config('IMAGE_WORKERS', default=2, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -1,16 +1,52 @@
-from django.contrib import admin
+import codecs
+
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.http import StreamingHttpResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils.decorators import method_decorator
+from .course_io import CourseImportError, export_courses, import_courses, iter_documents, write_jsonl
 from .models import User, Contact, Course, Module, Lesson, Enrollment, LessonProgress
+from .routers import read_from_replica
+from .search import KIND_COURSE, KIND_LESSON, search_backend, search_ids
+
+
+class IndexedSearchMixin:
+    """Answer the changelist search box from the full-text index instead of icontains scans"""
+    search_kind = None
+    
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or search_backend() is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(id__in=search_ids(search_term, self.search_kind, limit=None)), False
+
+
+class ReplicaChangeListMixin:
+    """Read changelists from a replica; edits and actions stay on the primary"""
+    
+    @method_decorator(read_from_replica)
+    def changelist_view(self, request, extra_context=None):
+        return super().changelist_view(request, extra_context)
+
+
+class CourseImportForm(forms.Form):
+    file = forms.FileField(help_text='JSONL (one course per line) or a JSON array of course trees')
+    prune = forms.BooleanField(required=False, help_text='Delete modules and lessons that are not in the file')
+
 
 # Register your models here.
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     list_display = ('firstname', 'lastname', 'email', 'created_at')
     search_fields = ('firstname', 'lastname', 'email')
     list_filter = ('created_at',)
     ordering = ('-created_at',)
 
 @admin.register(Contact)
-class ContactAdmin(admin.ModelAdmin):
+class ContactAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     list_display = ('name', 'email', 'subject', 'created_at')
     search_fields = ('name', 'email', 'subject', 'message')
     list_filter = ('created_at',)
@@ -18,28 +54,78 @@ class ContactAdmin(admin.ModelAdmin):
     ordering = ('-created_at',)
 
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
-    list_display = ('title', 'difficulty', 'duration_hours', 'is_free', 'created_at')
+class CourseAdmin(ReplicaChangeListMixin, IndexedSearchMixin, admin.ModelAdmin):
+    search_kind = KIND_COURSE
+    list_display = ('title', 'difficulty', 'duration_hours', 'lesson_count', 'total_duration_minutes', 'is_free', 'created_at')
     list_filter = ('difficulty', 'is_free', 'created_at')
     search_fields = ('title', 'description')
     ordering = ('-created_at',)
+    actions = ['export_course_trees']
+    change_list_template = 'admin/script/course/change_list.html'
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_lesson_stats()
+    
+    def get_urls(self):
+        urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='script_course_import'),
+        ]
+        return urls + super().get_urls()
+    
+    @admin.action(description='Export selected course trees as JSONL')
+    def export_course_trees(self, request, queryset):
+        # Rows are read and written one course at a time while the response streams
+        courses = Course.objects.filter(pk__in=queryset.order_by().values('pk'))
+        response = StreamingHttpResponse(write_jsonl(export_courses(courses)), content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="courses.jsonl"'
+        return response
+    
+    def import_view(self, request):
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+        form = CourseImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            stream = codecs.getreader('utf-8')(form.cleaned_data['file'])
+            try:
+                stats = import_courses(iter_documents(stream), prune=form.cleaned_data['prune'])
+            except (CourseImportError, UnicodeDecodeError) as e:
+                messages.error(request, f'Import stopped, earlier courses were kept: {e}')
+            else:
+                messages.success(
+                    request,
+                    f'Imported {stats["courses"]} courses: {stats["lessons_created"]} lessons created, '
+                    f'{stats["lessons_updated"]} updated, {stats["deleted"]} rows pruned.',
+                )
+                return redirect('admin:script_course_changelist')
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Import course trees',
+            'opts': self.model._meta,
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/script/course/import.html', context)
+    
+    @admin.display(description='Lesson minutes', ordering='total_duration_minutes')
+    def total_duration_minutes(self, obj):
+        return obj.total_duration_minutes
 
 @admin.register(Module)
-class ModuleAdmin(admin.ModelAdmin):
+class ModuleAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     list_display = ('title', 'course', 'order', 'created_at')
     list_filter = ('course', 'created_at')
     search_fields = ('title', 'description')
     ordering = ('course', 'order')
 
 @admin.register(Lesson)
-class LessonAdmin(admin.ModelAdmin):
+class LessonAdmin(ReplicaChangeListMixin, IndexedSearchMixin, admin.ModelAdmin):
+    search_kind = KIND_LESSON
     list_display = ('title', 'module', 'duration_minutes', 'order', 'created_at')
     list_filter = ('module__course', 'created_at')
     search_fields = ('title', 'content')
     ordering = ('module__course', 'module__order', 'order')
 
 @admin.register(Enrollment)
-class EnrollmentAdmin(admin.ModelAdmin):
+class EnrollmentAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     list_display = ('user', 'course', 'enrolled_at', 'completed_at', 'is_active')
     list_filter = ('course', 'enrolled_at', 'completed_at', 'is_active')
     search_fields = ('user__firstname', 'user__lastname', 'course__title')
@@ -47,7 +133,7 @@ class EnrollmentAdmin(admin.ModelAdmin):
     ordering = ('-enrolled_at',)
 
 @admin.register(LessonProgress)
-class LessonProgressAdmin(admin.ModelAdmin):
+class LessonProgressAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     list_display = ('user', 'lesson', 'is_completed', 'progress_percentage', 'completed_at')
     list_filter = ('is_completed', 'completed_at', 'lesson__module__course')
     search_fields = ('user__firstname', 'user__lastname', 'lesson__title')
@@ -0,0 +1,77 @@
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import Http404, JsonResponse
+from django.shortcuts import redirect
+
+from .models import User
+
+
+# Only these columns are cached; the password hash never leaves the database
+CACHED_FIELDS = ('id', 'firstname', 'lastname', 'email', 'updated_at')
+
+
+def _version_key(user_id):
+    return f'hub_user:{user_id}:version'
+
+
+def _cache_key(user_id, version):
+    return f'hub_user:{user_id}:{version}'
+
+
+def _load_user(user_id):
+    """Return the User with only CACHED_FIELDS loaded; other fields load on access
+
+    The cache holds a pointer to the user's current updated_at and the fields
+    under a key that includes it, so a save that moves updated_at never serves
+    the old row, and invalidate_hub_user() only has to drop the pointer.
+    """
+    ttl = settings.HUB_USER_CACHE_TTL
+    if ttl:
+        version = cache.get(_version_key(user_id))
+        fields = cache.get(_cache_key(user_id, version)) if version is not None else None
+        if fields is not None:
+            return User.from_db(DEFAULT_DB_ALIAS, CACHED_FIELDS, [fields[name] for name in CACHED_FIELDS])
+
+    user = User.objects.filter(id=user_id).only(*CACHED_FIELDS).first()
+    if user is not None and ttl:
+        version = int(user.updated_at.timestamp() * 1_000_000)
+        cache.set_many({
+            _version_key(user_id): version,
+            _cache_key(user_id, version): {name: getattr(user, name) for name in CACHED_FIELDS},
+        }, ttl)
+    return user
+
+
+def get_hub_user(request):
+    """Return the logged in User for this request, loading it at most once"""
+    if not hasattr(request, '_cached_hub_user'):
+        user_id = request.session.get('user_id')
+        request._cached_hub_user = _load_user(user_id) if user_id is not None else None
+    return request._cached_hub_user
+
+
+def invalidate_hub_user(user_id):
+    # After commit, so a request that read the old row mid-transaction cannot re-cache it for good
+    transaction.on_commit(lambda: cache.delete(_version_key(user_id)))
+
+
+def hub_login_required(view_func=None, *, json=False):
+    """Require a logged in hub user, redirecting to login (or a 401 for JSON endpoints)"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if 'user_id' not in request.session:
+                if json:
+                    return JsonResponse({'error': 'Not authenticated'}, status=401)
+                return redirect('login')
+            if not request.hub_user:
+                raise Http404('User not found')
+            return view_func(request, *args, **kwargs)
+        return wrapper
+
+    if view_func is not None:
+        return decorator(view_func)
+    return decorator
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import get_template
+
+CATALOG_VERSION_KEY = 'catalog_version'
+
+# Seconds a worker may spend rebuilding a page before others stop waiting
+REBUILD_LOCK_TIMEOUT = 30
+REBUILD_WAIT = 2.0
+REBUILD_POLL = 0.05
+
+# Url names and templates of the pages rendered without any context
+STATIC_PAGES = [
+    ('about', 'about.html'),
+    ('video_tutorials', 'video_tutorials.html'),
+    ('code_examples', 'code_examples.html'),
+    ('practice_exercises', 'practice_exercises.html'),
+]
+
+_static_pages_version = None
+
+
+def get_catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Time based so a lost version key never resurrects older pages
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, time.time_ns(), None)
+
+
+def navbar_state(request):
+    """Identify what base.html shows in the navbar: anonymous links or the user's name"""
+    if not request.session.get('user_id'):
+        return 'anon'
+    name = request.session.get('user_name', '')
+    return 'user-' + hashlib.md5(name.encode()).hexdigest()
+
+
+def _wait_for(key):
+    deadline = time.monotonic() + REBUILD_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(REBUILD_POLL)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    return None
+
+
+def get_static_pages_version():
+    """Fingerprint of the static page templates, shared by every worker of a deploy"""
+    global _static_pages_version
+    if _static_pages_version is None:
+        fingerprint = hashlib.md5()
+        for name in ['base.html'] + [template for _, template in STATIC_PAGES]:
+            path = get_template(name).origin.name
+            stat = os.stat(path)
+            fingerprint.update(f'{path}:{stat.st_mtime_ns}:{stat.st_size}'.encode())
+        _static_pages_version = fingerprint.hexdigest()
+    return _static_pages_version
+
+
+def _versioned_page_cache(prefix, get_version, timeout):
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            # Pending flash messages are rendered into the page, so never cache those
+            if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+                return view_func(request, *args, **kwargs)
+
+            path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = f'{prefix}:{view_func.__name__}:{get_version()}:{navbar_state(request)}:{path_hash}'
+
+            cached = cache.get(key)
+            if cached is None:
+                lock_key = f'{key}:lock'
+                if cache.add(lock_key, 1, REBUILD_LOCK_TIMEOUT):
+                    try:
+                        response = view_func(request, *args, **kwargs)
+                        if response.status_code == 200 and not response.streaming:
+                            cache.set(key, (response.content, response['Content-Type']), timeout())
+                    finally:
+                        cache.delete(lock_key)
+                    return response
+
+                cached = _wait_for(key)
+                if cached is None:
+                    return view_func(request, *args, **kwargs)
+
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        return wrapper
+    return decorator
+
+
+def cache_catalog_page(view_func):
+    """Cache a full catalog page per URL and navbar state under the current catalog version
+
+    Only one worker rebuilds an expired page; the others wait briefly for
+    its result instead of all rendering the same page at once.
+    """
+    return _versioned_page_cache(
+        'catalog_page', get_catalog_version, lambda: settings.CATALOG_CACHE_TIMEOUT
+    )(view_func)
+
+
+def cache_static_page(view_func):
+    """Cache a context-free page per navbar state until its templates change"""
+    return _versioned_page_cache(
+        'static_page', get_static_pages_version, lambda: None
+    )(view_func)
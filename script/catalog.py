@@ -0,0 +1,101 @@
+import base64
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from django.db.models.functions import Substr
+
+from .models import Course
+
+CATALOG_PAGE_SIZE = 12
+
+# Enough of the description for the card's truncatewords:20 summary
+SUMMARY_LENGTH = 300
+
+CARD_FIELDS = (
+    'id', 'title', 'difficulty', 'image', 'image_variants', 'duration_hours', 'price', 'is_free', 'lesson_count',
+    'created_at',
+)
+
+
+def encode_cursor(course):
+    raw = f'{course.created_at.isoformat()}|{course.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, course_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(course_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _decimal(value):
+    try:
+        number = Decimal(value) if value not in (None, '') else None
+    except InvalidOperation:
+        return None
+    # NaN and Infinity parse but cannot be compared against a price column
+    return number if number is not None and number.is_finite() else None
+
+
+def _int(value):
+    try:
+        return int(value) if value not in (None, '') else None
+    except ValueError:
+        return None
+
+
+def filter_courses(params, difficulty=None):
+    """Apply the catalog filters from a QueryDict to the course listing"""
+    courses = Course.objects.all()
+
+    difficulty = difficulty or params.get('difficulty')
+    if difficulty:
+        courses = courses.filter(difficulty=difficulty)
+
+    is_free = params.get('is_free')
+    if is_free in ('1', 'true'):
+        courses = courses.filter(is_free=True)
+    elif is_free in ('0', 'false'):
+        courses = courses.filter(is_free=False)
+
+    for param, lookup, parse in (
+        ('min_price', 'price__gte', _decimal),
+        ('max_price', 'price__lte', _decimal),
+        ('min_hours', 'duration_hours__gte', _int),
+        ('max_hours', 'duration_hours__lte', _int),
+    ):
+        value = parse(params.get(param))
+        if value is not None:
+            courses = courses.filter(**{lookup: value})
+
+    return courses
+
+
+def catalog_page(params, difficulty=None, page_size=CATALOG_PAGE_SIZE):
+    """Return one page of course cards and the cursor of the next page
+
+    Pages are keyed on (created_at, id) so every page costs the same no
+    matter how deep into the catalog it is.
+    """
+    courses = filter_courses(params, difficulty)
+
+    cursor = decode_cursor(params.get('after', ''))
+    if cursor:
+        created_at, course_id = cursor
+        courses = courses.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=course_id))
+
+    courses = list(
+        courses.only(*CARD_FIELDS)
+        .annotate(summary=Substr('description', 1, SUMMARY_LENGTH))
+        .with_enrollment_count()
+        .order_by('-created_at', '-id')[:page_size + 1]
+    )
+
+    next_cursor = None
+    if len(courses) > page_size:
+        courses = courses[:page_size]
+        next_cursor = encode_cursor(courses[-1])
+    return courses, next_cursor
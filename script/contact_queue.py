@@ -0,0 +1,204 @@
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DataError, IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import Contact
+
+logger = logging.getLogger(__name__)
+
+SPOOL_NAME = 'contact.jsonl'
+# Submissions the database will not take are parked here for a person to look at
+DEAD_LETTER_NAME = 'contact.dead.jsonl'
+FIELDS = ('name', 'email', 'subject', 'message')
+
+
+def _spool_path():
+    return os.path.join(settings.CONTACT_SPOOL_DIR, SPOOL_NAME)
+
+
+def _dead_letter(row, reason):
+    path = os.path.join(settings.CONTACT_SPOOL_DIR, DEAD_LETTER_NAME)
+    with open(path, 'a', encoding='utf-8') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.write(json.dumps({'reason': reason, 'row': row}, default=str) + '\n')
+    logger.warning('Moved a contact submission to %s: %s', path, reason)
+
+
+def _contact(row):
+    return Contact(**{field: row[field] for field in FIELDS}, created_at=row['created_at'])
+
+
+def enqueue_contact(name, email, subject, message):
+    """Append a submission to the local spool file; the drainer writes it to the database"""
+    os.makedirs(settings.CONTACT_SPOOL_DIR, exist_ok=True)
+    line = json.dumps({
+        'name': name,
+        'email': email,
+        'subject': subject,
+        'message': message,
+        'created_at': timezone.now().isoformat(),
+    }) + '\n'
+    path = _spool_path()
+    while True:
+        with open(path, 'a', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            # The drainer may have moved the file away while we waited for the lock
+            try:
+                current = os.stat(path).st_ino == os.fstat(f.fileno()).st_ino
+            except FileNotFoundError:
+                current = False
+            if current:
+                f.write(line)
+                break
+    contact_drainer.ensure_running()
+
+
+def _claim_spool():
+    """Move the spool aside so new submissions start a fresh file, returning every file to drain"""
+    path = _spool_path()
+    if os.path.exists(path):
+        claimed = f'{path}.{os.getpid()}.{time.time_ns()}.draining'
+        try:
+            os.replace(path, claimed)
+        except FileNotFoundError:
+            pass
+    # Files left by an interrupted drain are picked up too, unless their drainer is still alive
+    return sorted(
+        claimed for claimed in glob.glob(f'{path}.*.draining')
+        if not _drained_elsewhere(claimed)
+    )
+
+
+def _drained_elsewhere(claimed):
+    pid = int(claimed.rsplit('.', 3)[-3])
+    if pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read_rows(claimed):
+    rows = []
+    with open(claimed, encoding='utf-8') as f:
+        # Wait for writers that opened the file before it was moved
+        fcntl.flock(f, fcntl.LOCK_EX)
+        for line in f:
+            try:
+                row = json.loads(line)
+                row['created_at'] = datetime.fromisoformat(row['created_at'])
+                _contact(row).full_clean()
+            except ValidationError as e:
+                _dead_letter(row, str(e.message_dict))
+                continue
+            except (ValueError, KeyError, TypeError) as e:
+                _dead_letter(line.rstrip('\n'), f'Malformed spool line: {e!r}')
+                continue
+            rows.append(row)
+    return rows
+
+
+def deduplicate(rows, window=None):
+    """Drop submissions identical to one already kept or stored within the window"""
+    if window is None:
+        window = timedelta(seconds=settings.CONTACT_DEDUP_WINDOW)
+    if not rows:
+        return []
+    rows = sorted(rows, key=lambda row: row['created_at'])
+
+    last_seen = {}
+    stored = Contact.objects.filter(
+        created_at__gte=rows[0]['created_at'] - window,
+        email__in={row['email'] for row in rows},
+    ).values_list(*FIELDS, 'created_at')
+    for *key, created_at in stored:
+        key = tuple(key)
+        last_seen[key] = max(last_seen.get(key, created_at), created_at)
+
+    unique = []
+    for row in rows:
+        key = tuple(row[field] for field in FIELDS)
+        previous = last_seen.get(key)
+        if previous is not None and row['created_at'] - previous <= window:
+            continue
+        last_seen[key] = row['created_at']
+        unique.append(row)
+    return unique
+
+
+def drain_contact_queue(batch_size=None):
+    """Insert every spooled submission with batched bulk_create; returns (inserted, duplicates)
+
+    Rows that fail validation or that the database rejects are appended to
+    DEAD_LETTER_NAME instead of being retried on every drain.
+    """
+    batch_size = batch_size or settings.CONTACT_BATCH_SIZE
+    inserted = duplicates = 0
+    for claimed in _claim_spool():
+        rows = _read_rows(claimed)
+        try:
+            with transaction.atomic():
+                unique = deduplicate(rows)
+                Contact.objects.bulk_create([_contact(row) for row in unique], batch_size=batch_size)
+            saved = len(unique)
+        except (DataError, IntegrityError):
+            # Something validation missed; insert row by row so one bad row cannot hold up the file
+            with transaction.atomic():
+                unique = deduplicate(rows)
+                saved = 0
+                for row in unique:
+                    try:
+                        with transaction.atomic():
+                            _contact(row).save()
+                        saved += 1
+                    except (DataError, IntegrityError) as e:
+                        _dead_letter(row, str(e))
+        os.remove(claimed)
+        inserted += saved
+        duplicates += len(rows) - len(unique)
+    return inserted, duplicates
+
+
+class ContactDrainer:
+    """Daemon thread that drains the contact spool every CONTACT_DRAIN_INTERVAL seconds"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def ensure_running(self):
+        # Started lazily, and again in a forked worker
+        if not settings.CONTACT_DRAIN_INTERVAL or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, name='contact-drainer', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(settings.CONTACT_DRAIN_INTERVAL)
+            try:
+                drain_contact_queue()
+            except Exception:
+                logger.exception('Draining the contact spool failed')
+            finally:
+                connection.close()
+
+
+contact_drainer = ContactDrainer()
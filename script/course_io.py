@@ -0,0 +1,263 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.text import slugify
+
+from .models import Course, Lesson, Module
+from .outline import invalidate_course_outline
+from .search import reindex_lessons
+from .services import refresh_lesson_counts
+
+COURSE_FIELDS = ('title', 'description', 'difficulty', 'duration_hours', 'price', 'is_free')
+MODULE_FIELDS = ('title', 'description', 'order')
+LESSON_FIELDS = ('title', 'content', 'video_url', 'duration_minutes', 'order')
+IMPORT_STATS = ('modules_created', 'modules_updated', 'lessons_created', 'lessons_updated', 'deleted')
+
+
+class CourseImportError(ValueError):
+    """Raised when an imported course tree document is malformed"""
+
+
+def export_courses(courses=None, chunk_size=500):
+    """Yield one nested dict per course, streaming the three tables side by side
+
+    Courses, modules and lessons are each read with a single ordered iterator
+    and merged in Python, so memory holds one course tree at a time. The reads
+    do not share a snapshot, so rows whose parent is gone from the stream
+    (deleted while the export runs) are skipped rather than stalling the merge.
+    """
+    if courses is None:
+        courses = Course.objects.all()
+    course_ids = courses.order_by().values('id')
+    course_rows = courses.order_by('id').values('id', 'slug', *COURSE_FIELDS)
+    # Both child streams follow parent ids; modules are put in course order per course
+    module_rows = (
+        Module.objects.filter(course_id__in=course_ids)
+        .order_by('course_id', 'id')
+        .values('id', 'course_id', 'slug', *MODULE_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    lesson_rows = (
+        Lesson.objects.filter(module__course_id__in=course_ids)
+        .order_by('module__course_id', 'module_id', 'order', 'id')
+        .values('module__course_id', 'module_id', 'slug', *LESSON_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    module = next(module_rows, None)
+    lesson = next(lesson_rows, None)
+
+    for course in course_rows.iterator(chunk_size=chunk_size):
+        course_id = course.pop('id')
+        while module is not None and module['course_id'] < course_id:
+            module = next(module_rows, None)
+        modules = []
+        while module is not None and module['course_id'] == course_id:
+            key = (course_id, module.pop('id'))
+            del module['course_id']
+            module['lessons'] = []
+            while lesson is not None and (lesson['module__course_id'], lesson['module_id']) < key:
+                lesson = next(lesson_rows, None)
+            while lesson is not None and (lesson['module__course_id'], lesson['module_id']) == key:
+                del lesson['module__course_id'], lesson['module_id']
+                module['lessons'].append(lesson)
+                lesson = next(lesson_rows, None)
+            modules.append(module)
+            module = next(module_rows, None)
+        # Stable sort, so modules sharing an order stay in id order
+        course['modules'] = sorted(modules, key=lambda m: m['order'])
+        yield course
+
+
+def write_jsonl(documents):
+    """Yield one JSON line per document"""
+    for document in documents:
+        yield json.dumps(document, cls=DjangoJSONEncoder) + '\n'
+
+
+def write_json(documents):
+    """Yield a JSON array of documents piece by piece"""
+    separator = '[\n'
+    for document in documents:
+        yield separator + json.dumps(document, cls=DjangoJSONEncoder)
+        separator = ',\n'
+    yield '[]\n' if separator == '[\n' else '\n]\n'
+
+
+def iter_documents(stream, chunk_size=65536):
+    """Yield documents from a text stream holding either JSONL or one JSON array"""
+    buffer = ''
+    while not buffer.strip():
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        buffer += chunk
+    buffer = buffer.lstrip()
+    if buffer.startswith('['):
+        yield from _iter_array(stream, buffer[1:], chunk_size)
+    else:
+        yield from _iter_lines(stream, buffer, chunk_size)
+
+
+def _iter_lines(stream, buffer, chunk_size):
+    number = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        lines = (buffer + chunk).split('\n')
+        buffer = lines.pop() if chunk else ''
+        for line in lines:
+            number += 1
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    raise CourseImportError(f'Line {number}: {e}')
+        if not chunk:
+            return
+
+
+def _iter_array(stream, buffer, chunk_size):
+    decoder = json.JSONDecoder()
+    position = 0
+    while True:
+        # Skip separators, then decode the next element once it is fully buffered
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            if position == len(buffer):
+                raise ValueError('Expecting value')
+            document, position = decoder.raw_decode(buffer, position)
+        except ValueError as e:
+            # Grow reads with the buffer so a huge element is not re-parsed per chunk
+            chunk = stream.read(max(chunk_size, len(buffer) - position))
+            if not chunk:
+                raise CourseImportError(f'Unterminated JSON array: {e}')
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield document
+
+
+def _slug(document, what):
+    if not isinstance(document, dict):
+        raise CourseImportError(f'Each {what} must be a JSON object')
+    slug = document.get('slug') or slugify(document.get('title') or '')
+    if not slug or slug != slugify(slug):
+        raise CourseImportError(f'{what.capitalize()} {document.get("title")!r} needs a valid slug')
+    return slug
+
+
+def _assign(obj, document, fields, position=0):
+    # Documents replace every exported field; missing keys fall back to defaults
+    for name in fields:
+        if name in document:
+            setattr(obj, name, document[name])
+        elif name == 'order':
+            obj.order = position
+        else:
+            setattr(obj, name, obj._meta.get_field(name).get_default())
+
+
+def _validate(obj, parent=None):
+    """Coerce and check field values with full_clean, reporting problems as CourseImportError
+
+    Children skip the parent foreign key and the per-parent slug constraint;
+    the import sets the former itself and rejects repeated slugs up front.
+    """
+    # Free text may be empty, as it often is on rows created outside the admin
+    exclude = [name for name in ('description', 'content') if getattr(obj, name, None) == '']
+    try:
+        if parent:
+            obj.full_clean(exclude=[parent, *exclude], validate_unique=False, validate_constraints=False)
+        else:
+            obj.full_clean(exclude=exclude)
+    except ValidationError as e:
+        problems = '; '.join(f'{field}: {" ".join(errors)}' for field, errors in e.message_dict.items())
+        raise CourseImportError(f'{obj._meta.verbose_name.capitalize()} {obj.slug!r}: {problems}')
+
+
+def import_course(document, batch_size=500, prune=False):
+    """Upsert one course tree keyed on slugs inside a single transaction"""
+    slug = _slug(document, 'course')
+    stats = dict.fromkeys(IMPORT_STATS, 0)
+
+    with transaction.atomic():
+        course = Course.objects.filter(slug=slug).first() or Course(slug=slug)
+        _assign(course, document, COURSE_FIELDS)
+        _validate(course)
+        course.save()
+
+        # Modules of one course are few; upsert them first so lessons can point at them
+        module_ids = dict(Module.objects.filter(course=course).values_list('slug', 'id'))
+        documents = {}
+        new, changed = [], []
+        for position, module_document in enumerate(document.get('modules') or []):
+            module_slug = _slug(module_document, 'module')
+            if module_slug in documents:
+                raise CourseImportError(f'Course {slug!r} repeats module {module_slug!r}')
+            documents[module_slug] = module_document
+            module = Module(pk=module_ids.get(module_slug), course=course, slug=module_slug)
+            _assign(module, module_document, MODULE_FIELDS, position)
+            _validate(module, 'course')
+            (changed if module.pk else new).append(module)
+        Module.objects.bulk_create(new, batch_size=batch_size)
+        Module.objects.bulk_update(changed, MODULE_FIELDS, batch_size=batch_size)
+        stats['modules_created'] += len(new)
+        stats['modules_updated'] += len(changed)
+
+        lesson_ids = dict(
+            ((module_id, lesson_slug), lesson_id) for lesson_id, module_id, lesson_slug in
+            Lesson.objects.filter(module__course=course).values_list('id', 'module_id', 'slug').iterator(chunk_size=batch_size)
+        )
+        seen = set()
+        new, changed = [], []
+
+        def flush(final=False):
+            if new and (final or len(new) >= batch_size):
+                Lesson.objects.bulk_create(new, batch_size=batch_size)
+                stats['lessons_created'] += len(new)
+                new.clear()
+            if changed and (final or len(changed) >= batch_size):
+                Lesson.objects.bulk_update(changed, LESSON_FIELDS, batch_size=batch_size)
+                stats['lessons_updated'] += len(changed)
+                changed.clear()
+
+        for module in Module.objects.filter(course=course, slug__in=documents).only('id', 'slug'):
+            for position, lesson_document in enumerate(documents[module.slug].get('lessons') or []):
+                key = (module.id, _slug(lesson_document, 'lesson'))
+                if key in seen:
+                    raise CourseImportError(f'Module {module.slug!r} repeats lesson {key[1]!r}')
+                seen.add(key)
+                lesson = Lesson(pk=lesson_ids.get(key), module_id=module.id, slug=key[1])
+                _assign(lesson, lesson_document, LESSON_FIELDS, position)
+                _validate(lesson, 'module')
+                (changed if lesson.pk else new).append(lesson)
+                flush()
+        flush(final=True)
+
+        if prune:
+            # Row deletes go through the signals so search documents are dropped too
+            stats['deleted'] += Lesson.objects.filter(
+                id__in=[lesson_id for key, lesson_id in lesson_ids.items() if key not in seen]
+            ).delete()[0]
+            stats['deleted'] += Module.objects.filter(course=course).exclude(slug__in=documents).delete()[0]
+
+        # Bulk writes skip the signals that keep these current
+        refresh_lesson_counts(course.pk)
+        invalidate_course_outline(course.pk)
+        reindex_lessons(Lesson.objects.filter(module__course=course))
+    return course, stats
+
+
+def import_courses(documents, batch_size=500, prune=False):
+    """Import every course tree from an iterable of documents, one transaction each"""
+    totals = dict.fromkeys(('courses',) + IMPORT_STATS, 0)
+    for document in documents:
+        course, stats = import_course(document, batch_size=batch_size, prune=prune)
+        totals['courses'] += 1
+        for name, value in stats.items():
+            totals[name] += value
+    return totals
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum
+
+from .models import Enrollment, LessonProgress
+
+RECENT_PROGRESS_LIMIT = 5
+
+
+def _cache_key(user_id):
+    return f'dashboard_summary:{user_id}'
+
+
+def build_dashboard_summary(user_id):
+    """Compute the dashboard counters with one aggregate query plus the recent activity"""
+    totals = Enrollment.objects.filter(user_id=user_id, is_active=True).aggregate(
+        total_courses=Count('id'),
+        completed_courses=Count('id', filter=Q(completed_at__isnull=False)),
+        completed_lessons=Sum('completed_lessons', default=0),
+        total_lessons=Sum('total_lessons', default=0),
+    )
+    totals['in_progress_courses'] = totals['total_courses'] - totals['completed_courses']
+    totals['overall_progress'] = (
+        min(totals['completed_lessons'], totals['total_lessons']) * 100 // totals['total_lessons']
+        if totals['total_lessons'] else 0
+    )
+
+    # Plain dicts so the cached summary does not pin model instances
+    totals['recent_progress'] = list(
+        LessonProgress.objects.filter(user_id=user_id, is_completed=True)
+        .order_by('-completed_at')
+        .values('lesson_id', 'completed_at', title=F('lesson__title'), course_id=F('lesson__module__course_id'))
+        [:RECENT_PROGRESS_LIMIT]
+    )
+    return totals
+
+
+def get_dashboard_summary(user_id):
+    timeout = settings.DASHBOARD_CACHE_TIMEOUT
+    if not timeout:
+        return build_dashboard_summary(user_id)
+
+    summary = cache.get(_cache_key(user_id))
+    if summary is None:
+        summary = build_dashboard_summary(user_id)
+        cache.set(_cache_key(user_id), summary, timeout)
+    return summary
+
+
+def invalidate_dashboard_summary(*user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def invalidate_course_dashboards(course_id):
+    """Drop the summaries of everyone enrolled in a course, e.g. after its lesson count changed"""
+    user_ids = Enrollment.objects.filter(course_id=course_id).values_list('user_id', flat=True)
+    invalidate_dashboard_summary(*user_ids)
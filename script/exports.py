@@ -0,0 +1,123 @@
+import csv
+import json
+import zlib
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Enrollment, LessonProgress
+
+# Column name -> values_list lookup; related columns are joined, never loaded as models
+EXPORTS = {
+    'enrollments': (Enrollment, {
+        'id': 'id',
+        'user_id': 'user_id',
+        'user_email': 'user__email',
+        'course_id': 'course_id',
+        'course_slug': 'course__slug',
+        'enrolled_at': 'enrolled_at',
+        'completed_at': 'completed_at',
+        'is_active': 'is_active',
+        'completed_lessons': 'completed_lessons',
+        'total_lessons': 'total_lessons',
+        'updated_at': 'updated_at',
+    }),
+    'progress': (LessonProgress, {
+        'id': 'id',
+        'user_id': 'user_id',
+        'user_email': 'user__email',
+        'course_id': 'lesson__module__course_id',
+        'lesson_id': 'lesson_id',
+        'lesson_slug': 'lesson__slug',
+        'is_completed': 'is_completed',
+        'progress_percentage': 'progress_percentage',
+        'completed_at': 'completed_at',
+        'updated_at': 'updated_at',
+    }),
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """File-like object whose write() hands back the line, for streaming csv.writer output"""
+
+    def write(self, value):
+        return value
+
+
+def parse_since(value):
+    """Parse an ISO date or datetime; naive values are in the current time zone"""
+    since = parse_datetime(value)
+    if since is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'{value!r} is not an ISO date or datetime')
+        since = datetime(day.year, day.month, day.day)
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def export_until():
+    """Upper bound for an export that leaves EXPORT_SAFETY_LAG for in-flight transactions"""
+    return timezone.now() - timedelta(seconds=settings.EXPORT_SAFETY_LAG)
+
+
+def export_rows(name, since=None, until=None, using=None, chunk_size=None):
+    """Return (columns, row iterator) for one export, read from a server-side cursor
+
+    since and until bound updated_at (since inclusive, until exclusive).
+    updated_at is stamped before its transaction commits, so until should come
+    from export_until(): passing the previous run's until as the next since
+    then misses nothing unless a transaction took longer than
+    EXPORT_SAFETY_LAG to commit.
+    """
+    model, columns = EXPORTS[name]
+    queryset = model.objects.using(using).order_by('id')
+    if since is not None:
+        queryset = queryset.filter(updated_at__gte=since)
+    if until is not None:
+        queryset = queryset.filter(updated_at__lt=until)
+    rows = queryset.values_list(*columns.values()).iterator(chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE)
+    return list(columns), rows
+
+
+def write_csv(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row])
+
+
+def write_jsonl(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_export(columns, rows, format='csv', compress=False, buffer_size=65536):
+    """Yield the encoded export in buffer_size pieces, gzipped when compress is set"""
+    writer = write_jsonl if format == 'jsonl' else write_csv
+    # wbits=31 writes a gzip header and trailer
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    pending, size = [], 0
+    for piece in writer(columns, rows):
+        pending.append(piece)
+        size += len(piece)
+        if size >= buffer_size:
+            data = ''.join(pending).encode()
+            pending, size = [], 0
+            data = compressor.compress(data) if compressor else data
+            if data:
+                yield data
+    data = ''.join(pending).encode()
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
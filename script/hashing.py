@@ -0,0 +1,68 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+
+class HashingBusy(Exception):
+    """Raised when more password hashes are waiting than PASSWORD_HASH_QUEUE allows"""
+
+
+class HashingPool:
+    """Bounded per-process thread pool for password hashing
+
+    The hashers release the GIL while deriving keys, so a few pool threads
+    keep hashing off the request threads' CPU budget and cap how many run
+    at once. Callers beyond the workers plus the queue get HashingBusy
+    instead of piling up.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+        self._slots = None
+
+    def _ensure_executor(self):
+        # Created lazily, and again in a forked worker
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            workers = settings.PASSWORD_HASH_WORKERS
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            self._slots = threading.BoundedSemaphore(workers + settings.PASSWORD_HASH_QUEUE)
+            self._pid = os.getpid()
+
+    def run(self, func, *args):
+        if not settings.PASSWORD_HASH_WORKERS:
+            return func(*args)
+        self._ensure_executor()
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            return self._executor.submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+
+hashing_pool = HashingPool()
+
+
+def _verify(raw_password, encoded):
+    # check_password calls the setter only for a valid, outdated hash
+    outdated = []
+    is_correct = check_password(raw_password, encoded, setter=outdated.append)
+    return is_correct, bool(outdated)
+
+
+def hash_password(raw_password):
+    return hashing_pool.run(make_password, raw_password)
+
+
+def verify_password(raw_password, encoded):
+    """Return (is_correct, needs_rehash) for a stored hash"""
+    return hashing_pool.run(_verify, raw_password, encoded)
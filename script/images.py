@@ -0,0 +1,135 @@
+import hashlib
+import logging
+import os
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .caching import bump_catalog_version
+from .models import Course
+
+logger = logging.getLogger(__name__)
+
+DERIVED_DIR = 'derived'
+
+# Encoder settings per output format
+FORMATS = {
+    'webp': ('WEBP', {'quality': 75, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+
+
+def _variant_name(source_name, digest, width, extension):
+    directory, filename = posixpath.split(source_name)
+    stem = os.path.splitext(filename)[0]
+    return posixpath.join(directory, DERIVED_DIR, f'{stem}.{digest}.{width}w.{extension}')
+
+
+def generate_variants(source_name, storage=default_storage):
+    """Write resized WebP and JPEG copies of an image and describe them
+
+    Names carry a hash of the source bytes, so an unchanged image maps to the
+    files already written and a replaced one never reuses a cached URL.
+    """
+    with storage.open(source_name, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()[:12]
+
+    with Image.open(BytesIO(data)) as original:
+        original = ImageOps.exif_transpose(original)
+        widths = sorted({min(width, original.width) for width in settings.IMAGE_VARIANT_WIDTHS})
+        variants = []
+        for width in widths:
+            height = max(1, round(original.height * width / original.width))
+            resized = None
+            for extension, (image_format, options) in FORMATS.items():
+                name = _variant_name(source_name, digest, width, extension)
+                if not storage.exists(name):
+                    if resized is None:
+                        resized = original.convert('RGB').resize((width, height), Image.LANCZOS)
+                    buffer = BytesIO()
+                    resized.save(buffer, image_format, **options)
+                    storage.save(name, ContentFile(buffer.getvalue()))
+                variants.append({'name': name, 'width': width, 'format': extension})
+    return {'source': source_name, 'variants': variants}
+
+
+def refresh_course_image_variants(course_id, force=False, storage=default_storage):
+    """Bring a course's stored derivatives in line with its current image"""
+    course = Course.objects.filter(pk=course_id).only('image', 'image_variants').first()
+    if course is None:
+        return
+    source_name = course.image.name if course.image else ''
+    if not force and course.image_variants.get('source', '') == source_name:
+        return
+
+    image_variants = generate_variants(source_name, storage) if source_name else {'source': ''}
+
+    # Skip the write if the image was replaced again meanwhile; that save schedules its own run
+    if Course.objects.filter(pk=course_id, image=source_name).update(image_variants=image_variants):
+        # Cached catalog and home pages still point at the full-size original
+        bump_catalog_version()
+
+    # Remove the previous image's derivatives
+    current = {variant['name'] for variant in image_variants.get('variants', [])}
+    delete_variants(
+        {'variants': [v for v in course.image_variants.get('variants', []) if v['name'] not in current]},
+        storage,
+    )
+
+
+def delete_variants(image_variants, storage=default_storage):
+    for variant in image_variants.get('variants', []):
+        storage.delete(variant['name'])
+
+
+class ImageWorkerPool:
+    """Per-process thread pool that builds image derivatives off the request path"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+
+    def _ensure_executor(self):
+        # Created lazily, and again in a forked worker
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS, thread_name_prefix='image-variants'
+            )
+            self._pid = os.getpid()
+
+    def submit(self, course_id):
+        if not settings.IMAGE_WORKERS:
+            refresh_course_image_variants(course_id)
+            return
+        self._ensure_executor()
+        self._executor.submit(self._run, course_id)
+
+    @staticmethod
+    def _run(course_id):
+        try:
+            refresh_course_image_variants(course_id)
+        except Exception:
+            logger.exception('Generating image variants for course %s failed', course_id)
+        finally:
+            connection.close()
+
+
+image_workers = ImageWorkerPool()
+
+
+def schedule_image_variants(course_id):
+    # Wait for the commit so the worker sees the new image
+    transaction.on_commit(lambda: image_workers.submit(course_id))
@@ -0,0 +1,98 @@
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+_request_metrics = ContextVar('request_metrics', default=None)
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+
+
+def fingerprint(sql):
+    """Reduce a statement to its shape so the same query with other values compares equal"""
+    sql = _LITERAL.sub('?', ' '.join(sql.split()))
+    return _IN_LIST.sub('(...)', sql)
+
+
+class RequestMetrics:
+    """Database and template timings collected while one request is served"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.shapes = Counter()
+        self._render_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper()
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.shapes[fingerprint(sql)] += 1
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def repeated(self, threshold):
+        """(count, shape) pairs for statements run more than threshold times"""
+        return [(count, shape) for shape, count in self.shapes.most_common() if count > threshold]
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ])
+
+
+@contextmanager
+def collect_metrics():
+    """Record every query on every database connection of this thread into a RequestMetrics"""
+    metrics = RequestMetrics()
+    token = _request_metrics.set(metrics)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+            yield metrics
+    finally:
+        _request_metrics.reset(token)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _request_metrics.get()
+        if metrics is None:
+            return super().render(context, request)
+
+        # Only the outermost render counts, minus the queries it ran lazily
+        metrics._render_depth += 1
+        started = time.perf_counter()
+        db_before = metrics.db_time
+        try:
+            return super().render(context, request)
+        finally:
+            metrics._render_depth -= 1
+            if not metrics._render_depth:
+                metrics.template_time += time.perf_counter() - started - (metrics.db_time - db_before)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing renders for the request being instrumented"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
@@ -0,0 +1,87 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from script.hashing import HashingBusy, _verify, verify_password
+
+PASSWORD = 'correct horse battery staple'
+
+
+def _probe():
+    # Stand-in for serving a cheap page: a little pure Python work under the GIL
+    return sum(range(20000))
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent password checks inline versus on the hashing pool, with page latency alongside'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8, help='Simultaneous logins (request threads)')
+        parser.add_argument('--logins', type=int, default=64, help='Logins per mode')
+        parser.add_argument('--hasher', choices=sorted(settings.PASSWORD_HASHER_CHOICES), default=settings.PASSWORD_HASHER)
+        parser.add_argument('--mode', choices=['inline', 'pool', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        algorithm = import_string(settings.PASSWORD_HASHER_CHOICES[options['hasher']]).algorithm
+        encoded = make_password(PASSWORD, hasher=algorithm)
+        modes = ['inline', 'pool'] if options['mode'] == 'both' else [options['mode']]
+
+        self.stdout.write(
+            f"hasher={options['hasher']} concurrency={options['concurrency']} logins={options['logins']} "
+            f"pool_workers={settings.PASSWORD_HASH_WORKERS} queue={settings.PASSWORD_HASH_QUEUE}"
+        )
+        for mode in modes:
+            check = _verify if mode == 'inline' else verify_password
+            self.report(mode, *self.run(check, encoded, options['concurrency'], options['logins']))
+
+    def run(self, check, encoded, concurrency, logins):
+        login_times = []
+        rejected = 0
+        probe_times = []
+        done = threading.Event()
+
+        def login():
+            nonlocal rejected
+            started = time.perf_counter()
+            try:
+                check(PASSWORD, encoded)
+            except HashingBusy:
+                rejected += 1
+                return
+            login_times.append(time.perf_counter() - started)
+
+        def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                _probe()
+                probe_times.append(time.perf_counter() - started)
+                time.sleep(0.005)
+
+        prober = threading.Thread(target=probe, daemon=True)
+        prober.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for _ in range(logins):
+                executor.submit(login)
+        elapsed = time.perf_counter() - started
+        done.set()
+        prober.join()
+        return elapsed, login_times, rejected, probe_times
+
+    def report(self, mode, elapsed, login_times, rejected, probe_times):
+        def ms(seconds):
+            return f'{seconds * 1000:.1f}ms'
+
+        p95 = statistics.quantiles(probe_times, n=20)[-1] if len(probe_times) > 1 else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{mode:>6}: {len(login_times) / elapsed:.1f} logins/s, '
+            f'login p50 {ms(statistics.median(login_times)) if login_times else "-"}, '
+            f'{rejected} rejected as busy, '
+            f'page p95 {ms(p95)} over {len(probe_times)} probes'
+        ))
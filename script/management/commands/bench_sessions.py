@@ -0,0 +1,69 @@
+import statistics
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from script.sessions import local_sessions
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request latency and queries for each session mode on a page that reads the session'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per mode')
+        parser.add_argument('--path', default='/about/', help='Page to request; it should render base.html')
+        parser.add_argument('--mode', choices=sorted(settings.SESSION_ENGINES), action='append', dest='modes')
+
+    def handle(self, *args, **options):
+        for mode in options['modes'] or sorted(settings.SESSION_ENGINES):
+            try:
+                # Sessions created for the run are rolled back afterwards
+                with transaction.atomic():
+                    self.report(mode, *self.run(mode, options['path'], options['requests']))
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def run(self, mode, path, requests):
+        engine = settings.SESSION_ENGINES[mode]
+        with override_settings(SESSION_MODE=mode, SESSION_ENGINE=engine, ALLOWED_HOSTS=['*']):
+            local_sessions.clear()
+            session = import_module(engine).SessionStore()
+            session['user_id'] = 0
+            session['user_name'] = 'Bench'
+            session.save()
+
+            client = Client()
+            client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+            client.get(path, secure=True)
+
+            times = []
+            queries = 0
+            for _ in range(requests):
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = client.get(path, secure=True)
+                    times.append(time.perf_counter() - started)
+                queries += len(captured)
+            if response.status_code != 200:
+                self.stderr.write(f'{mode}: {path} answered {response.status_code}')
+            return times, queries / requests
+
+    def report(self, mode, times, queries):
+        def ms(seconds):
+            return f'{seconds * 1000:.2f}ms'
+
+        times.sort()
+        p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+        self.stdout.write(
+            f'{mode:>15}: p50 {ms(statistics.median(times))}  p95 {ms(p95)}  queries/request {queries:.2f}'
+        )
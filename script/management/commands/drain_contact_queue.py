@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from script.contact_queue import drain_contact_queue
+
+
+class Command(BaseCommand):
+    help = 'Insert queued contact form submissions in batches, skipping duplicates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--loop', type=float, default=0, metavar='SECONDS',
+                            help='Keep draining every SECONDS instead of exiting')
+
+    def handle(self, *args, **options):
+        while True:
+            inserted, duplicates = drain_contact_queue(batch_size=options['batch_size'])
+            if inserted or duplicates or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Inserted {inserted} contact submissions, skipped {duplicates} duplicates.'
+                ))
+            if not options['loop']:
+                return
+            time.sleep(options['loop'])
@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from script.course_io import export_courses, write_json, write_jsonl
+from script.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Stream course trees (course, modules, lessons) to JSONL or JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-', help='File to write, or - for stdout')
+        parser.add_argument('--format', choices=['jsonl', 'json'], default='jsonl')
+        parser.add_argument('--course', action='append', dest='slugs', metavar='SLUG', help='Only export these courses')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options['slugs']:
+            courses = courses.filter(slug__in=options['slugs'])
+            missing = set(options['slugs']) - set(courses.values_list('slug', flat=True))
+            if missing:
+                raise CommandError(f'Unknown course slugs: {", ".join(sorted(missing))}')
+
+        writer = write_json if options['format'] == 'json' else write_jsonl
+        documents = export_courses(courses, chunk_size=options['chunk_size'])
+        output = sys.stdout if options['output'] == '-' else open(options['output'], 'w', encoding='utf-8')
+        try:
+            for piece in writer(documents):
+                output.write(piece)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        if output is not sys.stdout:
+            self.stdout.write(self.style.SUCCESS(f'Exported course trees to {options["output"]}.'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from script.images import refresh_course_image_variants
+from script.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Generate the resized WebP/JPEG derivatives for course images that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate even up-to-date derivatives')
+        parser.add_argument('--chunk-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        course_ids = Course.objects.exclude(image='').exclude(image__isnull=True).values_list('id', flat=True)
+        for course_id in course_ids.iterator(chunk_size=options['chunk_size']):
+            try:
+                refresh_course_image_variants(course_id, force=options['force'])
+            except (OSError, ValueError) as e:
+                failed += 1
+                self.stderr.write(f'Course {course_id}: {e}')
+                continue
+            processed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Checked {processed} course images, {failed} failed.'))
@@ -0,0 +1,33 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from script.course_io import CourseImportError, import_courses, iter_documents
+
+
+class Command(BaseCommand):
+    help = 'Upsert course trees from JSONL or a JSON array, one transaction per course'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to read, or - for stdin')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--prune', action='store_true', help='Delete modules and lessons missing from the file')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stream = sys.stdin if options['path'] == '-' else open(options['path'], encoding='utf-8')
+        try:
+            stats = import_courses(iter_documents(stream), batch_size=options['batch_size'], prune=options['prune'])
+        except CourseImportError as e:
+            raise CommandError(f'Import stopped, earlier courses were kept: {e}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {stats["courses"]} courses in {elapsed:.2f}s: '
+            f'{stats["modules_created"]} modules and {stats["lessons_created"]} lessons created, '
+            f'{stats["modules_updated"]} modules and {stats["lessons_updated"]} lessons updated, '
+            f'{stats["deleted"]} rows pruned.'
+        ))
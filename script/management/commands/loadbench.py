@@ -0,0 +1,442 @@
+import json
+import random
+import re
+import threading
+import time
+from datetime import timedelta
+from importlib import import_module
+
+import httpx
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max, Min, Q
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from script import urls
+from script.caching import bump_catalog_version
+from script.search import remove_course_documents
+from script.models import Course, Enrollment, Lesson, LessonProgress, Module, User
+
+EMAIL_DOMAIN = 'loadbench.invalid'
+TITLE_PREFIX = 'Loadbench'
+# slugify() strips leading underscores, so no real course can have a slug starting with this
+SLUG_PREFIX = '_loadbench-'
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def delete_in_ranges(queryset, batch_size):
+    """Delete the matching rows with one raw DELETE per primary key range, bypassing signals"""
+    bounds = queryset.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        return 0
+    deleted = 0
+    for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+        with transaction.atomic():
+            deleted += queryset.filter(id__gte=start, id__lt=start + batch_size)._raw_delete(queryset.db)
+    return deleted
+
+
+def in_batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Worker:
+    """One simulated visitor: a synthetic user with a session and their own HTTP client"""
+
+    def __init__(self, rng, user_ids, base_url=None):
+        self.rng = rng
+        self.base_url = base_url
+        enrollment = (
+            Enrollment.objects.filter(user_id__gte=rng.randint(*user_ids), user__email__endswith=f'@{EMAIL_DOMAIN}')
+            .order_by('user_id').select_related('user').first()
+        )
+        if enrollment is None:
+            enrollment = Enrollment.objects.filter(user_id=user_ids[0]).select_related('user').first()
+        self.user = enrollment.user
+        self.course_id = enrollment.course_id
+        self.lesson_ids = list(
+            Lesson.objects.filter(module__course_id=self.course_id).values_list('id', flat=True)
+        )
+        self.course_ids = list(
+            Course.objects.filter(slug__startswith=SLUG_PREFIX).values_list('id', flat=True)[:1000]
+        )
+        connection.close()
+
+        if base_url:
+            # A plain secret is accepted as both the CSRF cookie and the header token
+            csrf = get_random_string(32)
+            self.client = httpx.Client(base_url=base_url, headers={'X-CSRFToken': csrf})
+            self.client.cookies[settings.CSRF_COOKIE_NAME] = csrf
+        else:
+            self.client = Client()
+        self.log_in()
+
+    def log_in(self):
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session['user_id'] = self.user.id
+        session['user_name'] = f'{self.user.firstname} {self.user.lastname}'
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    def send(self, method, url, data=None, body=None):
+        if self.base_url:
+            if body is not None:
+                return self.client.post(url, content=body, headers={'Content-Type': 'application/json'})
+            if method == 'post':
+                return self.client.post(url, data=data)
+            return self.client.get(url, params=data)
+        if body is not None:
+            return self.client.post(url, body, content_type='application/json', secure=True)
+        return getattr(self.client, method)(url, data, secure=True)
+
+    def request(self, route):
+        lesson_id = self.rng.choice(self.lesson_ids)
+        if route == 'enroll_course':
+            args = ('get', reverse(route, args=[self.rng.choice(self.course_ids)]))
+        elif route == 'course_detail':
+            args = ('get', reverse(route, args=[self.course_id]))
+        elif route == 'lesson_detail':
+            args = ('get', reverse(route, args=[self.course_id, lesson_id]))
+        elif route == 'update_lesson_progress':
+            args = ('post', reverse(route, args=[lesson_id]), {'progress_percentage': self.rng.randint(1, 100)})
+        elif route == 'update_lesson_progress_batch':
+            body = json.dumps([{'lesson_id': lesson_id, 'progress_percentage': self.rng.randint(1, 100)}])
+            args = ('post', reverse(route), None, body)
+        elif route == 'search':
+            args = ('get', reverse(route), {'q': 'lesson'})
+        else:
+            args = ('get', reverse(route))
+
+        started = time.perf_counter()
+        response = self.send(*args)
+        elapsed = time.perf_counter() - started
+
+        match = QUERIES.search(response.headers.get('Server-Timing', ''))
+        if route == 'logout':
+            self.log_in()
+        return elapsed, response.status_code, int(match.group(1)) if match else None
+
+    def close(self):
+        if self.base_url:
+            self.client.close()
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Seed a synthetic dataset, then measure latency, throughput and queries per request for every route'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=5000)
+        parser.add_argument('--modules-per-course', type=int, default=5)
+        parser.add_argument('--lessons', type=int, default=50000)
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--progress', type=int, default=10000000, help='Approximate LessonProgress rows')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--skip-seed', action='store_true', help='Reuse the synthetic data already present')
+        parser.add_argument('--purge', action='store_true', help='Delete the synthetic data and exit')
+        parser.add_argument('--route', action='append', dest='routes', help='Only benchmark these URL names')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per route')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--base-url',
+            help='Drive a running server (e.g. local gunicorn) instead of the test client; '
+                 'its host must be in ALLOWED_HOSTS, it must share this database and run '
+                 'with QUERY_INSTRUMENTATION and QUERY_SERVER_TIMING on for query counts',
+        )
+        parser.add_argument('--output', default='loadbench.json', help='Where to write the results')
+        parser.add_argument('--baseline', help='Earlier results to compare against')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 slowdown before failing')
+        parser.add_argument('--random-seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['purge']:
+            self.purge(options['batch_size'])
+            return
+
+        rng = random.Random(options['random_seed'])
+        if not options['skip_seed']:
+            if User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').exists():
+                self.stdout.write('Synthetic data already present; reusing it (--purge to start over).')
+            else:
+                self.seed(rng, options)
+
+        routes = options['routes'] or [pattern.name for pattern in urls.urlpatterns]
+        unknown = set(routes) - {pattern.name for pattern in urls.urlpatterns}
+        if unknown:
+            raise CommandError(f'Unknown routes: {", ".join(sorted(unknown))}')
+
+        if options['base_url']:
+            results = self.run(routes, rng, options)
+        else:
+            with override_settings(ALLOWED_HOSTS=['*'], QUERY_INSTRUMENTATION=True, QUERY_SERVER_TIMING=True):
+                results = self.run(routes, rng, options)
+
+        report = {
+            'created': timezone.now().isoformat(),
+            'target': options['base_url'] or 'test-client',
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'dataset': {
+                'courses': Course.objects.filter(slug__startswith=SLUG_PREFIX).count(),
+                'users': User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').count(),
+            },
+            'routes': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f'Wrote {options["output"]}')
+
+        if options['baseline']:
+            self.compare(options['baseline'], results, options['tolerance'])
+
+    def seed(self, rng, options):
+        batch_size = options['batch_size']
+        lessons_per_course = max(1, options['lessons'] // options['courses'])
+        modules_per_course = max(1, min(options['modules_per_course'], lessons_per_course))
+        started = time.perf_counter()
+
+        self.stdout.write(f'Seeding {options["courses"]} courses...')
+        difficulties = [choice for choice, _ in Course.DIFFICULTY_CHOICES]
+        for batch in in_batches((
+            Course(
+                title=f'{TITLE_PREFIX} course {i}',
+                # bulk_create skips save(), which fills slugs in
+                slug=f'{SLUG_PREFIX}{i}',
+                description=f'Synthetic course {i} about JavaScript topic {i % 97}.',
+                difficulty=rng.choice(difficulties),
+                duration_hours=rng.randint(1, 40),
+                is_free=rng.random() < 0.7,
+                lesson_count=lessons_per_course,
+            ) for i in range(options['courses'])
+        ), batch_size):
+            Course.objects.bulk_create(batch)
+        course_ids = list(Course.objects.filter(slug__startswith=SLUG_PREFIX).values_list('id', flat=True))
+
+        for batch in in_batches((
+            Module(
+                course_id=course_id, title=f'Module {order + 1}', slug=f'module-{order + 1}', description='', order=order
+            )
+            for course_id in course_ids for order in range(modules_per_course)
+        ), batch_size):
+            Module.objects.bulk_create(batch)
+        modules = Module.objects.filter(course_id__in=course_ids).values_list('id', flat=True).order_by('id')
+
+        self.stdout.write(f'Seeding {lessons_per_course * len(course_ids)} lessons...')
+        per_module = lessons_per_course // modules_per_course
+        extra = lessons_per_course % modules_per_course
+
+        def lessons():
+            for index, module_id in enumerate(modules.iterator(chunk_size=batch_size)):
+                count = per_module + (1 if index % modules_per_course < extra else 0)
+                for order in range(count):
+                    yield Lesson(
+                        module_id=module_id,
+                        title=f'Lesson {order + 1}',
+                        slug=f'lesson-{order + 1}',
+                        content='Synthetic lesson content. ' * 20,
+                        duration_minutes=rng.randint(3, 30),
+                        order=order,
+                    )
+
+        for batch in in_batches(lessons(), batch_size):
+            Lesson.objects.bulk_create(batch)
+        course_lessons = {}
+        for lesson_id, course_id in (
+            Lesson.objects.filter(module__course_id__in=course_ids)
+            .order_by('module__course_id', 'module__order', 'order')
+            .values_list('id', 'module__course_id').iterator(chunk_size=batch_size)
+        ):
+            course_lessons.setdefault(course_id, []).append(lesson_id)
+
+        self.stdout.write(f'Seeding {options["users"]} users...')
+        password = make_password('loadbench')
+        for batch in in_batches((
+            User(firstname='Load', lastname=f'User {i}', email=f'user{i}@{EMAIL_DOMAIN}', password=password)
+            for i in range(options['users'])
+        ), batch_size):
+            User.objects.bulk_create(batch)
+
+        # Every enrolled course gets a progress row per lesson, as enroll_user does
+        enrollments_per_user = max(1, round(options['progress'] / max(1, options['users']) / lessons_per_course))
+        enrollments_per_user = min(enrollments_per_user, len(course_ids))
+        self.stdout.write(
+            f'Seeding {enrollments_per_user} enrollments per user, '
+            f'~{enrollments_per_user * lessons_per_course * options["users"]} progress rows...'
+        )
+        now = timezone.now()
+        user_ids = User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').values_list('id', flat=True)
+        enrollments, progress = [], []
+
+        def flush():
+            with transaction.atomic():
+                Enrollment.objects.bulk_create(enrollments, batch_size=batch_size)
+                LessonProgress.objects.bulk_create(progress, batch_size=batch_size)
+            enrollments.clear()
+            progress.clear()
+
+        for user_id in user_ids.iterator(chunk_size=batch_size):
+            for course_id in rng.sample(course_ids, enrollments_per_user):
+                lesson_ids = course_lessons.get(course_id, [])
+                completed = rng.randint(0, len(lesson_ids))
+                enrollments.append(Enrollment(
+                    user_id=user_id,
+                    course_id=course_id,
+                    completed_lessons=completed,
+                    total_lessons=len(lesson_ids),
+                    completed_at=now if lesson_ids and completed == len(lesson_ids) else None,
+                ))
+                for position, lesson_id in enumerate(lesson_ids):
+                    done = position < completed
+                    progress.append(LessonProgress(
+                        user_id=user_id,
+                        lesson_id=lesson_id,
+                        is_completed=done,
+                        completed_at=now - timedelta(minutes=rng.randint(0, 60 * 24 * 90)) if done else None,
+                        progress_percentage=100 if done else (rng.randint(1, 99) if position == completed else 0),
+                    ))
+            if len(progress) >= batch_size * 10:
+                flush()
+        flush()
+
+        # bulk_create skips the signals that keep these current
+        call_command('rebuild_search_index', stdout=self.stdout)
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'Seeded in {time.perf_counter() - started:.1f}s.'))
+
+    def purge(self, batch_size):
+        started = time.perf_counter()
+        user_ids = User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').values('id')
+        course_ids = list(Course.objects.filter(slug__startswith=SLUG_PREFIX).values_list('id', flat=True))
+        lesson_ids = Lesson.objects.filter(module__course_id__in=course_ids).values('id')
+
+        # Raw DELETEs in primary key ranges, children first: the ORM would load every
+        # row to run the post_delete receivers, which refresh caches once per row
+        deleted = 0
+        for queryset in (
+            LessonProgress.objects.filter(Q(user_id__in=user_ids) | Q(lesson_id__in=lesson_ids)),
+            Enrollment.objects.filter(Q(user_id__in=user_ids) | Q(course_id__in=course_ids)),
+            Lesson.objects.filter(module__course_id__in=course_ids),
+            Module.objects.filter(course_id__in=course_ids),
+            Course.objects.filter(id__in=course_ids),
+            User.objects.filter(id__in=user_ids),
+        ):
+            deleted += delete_in_ranges(queryset, batch_size)
+
+        # The receivers did not run, so clean up after them once
+        remove_course_documents(course_ids)
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {deleted} synthetic rows in {time.perf_counter() - started:.1f}s.'
+        ))
+
+    def run(self, routes, rng, options):
+        bounds = User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            raise CommandError('No synthetic data found; run without --skip-seed first.')
+        user_ids = (bounds['low'], bounds['high'])
+        workers = [
+            Worker(random.Random(rng.random()), user_ids, options['base_url'])
+            for _ in range(options['concurrency'])
+        ]
+        results = {}
+        try:
+            for route in routes:
+                results[route] = self.run_route(route, workers, options['requests'])
+                self.print_route(route, results[route])
+        finally:
+            for worker in workers:
+                worker.close()
+        return results
+
+    def run_route(self, route, workers, requests):
+        samples = []
+        lock = threading.Lock()
+        remaining = iter(range(requests))
+
+        def drive(worker):
+            try:
+                while True:
+                    with lock:
+                        if next(remaining, None) is None:
+                            return
+                    sample = worker.request(route)
+                    with lock:
+                        samples.append(sample)
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=drive, args=(worker,)) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        times = sorted(sample[0] for sample in samples)
+        statuses = {}
+        for _, status, _ in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        queries = [sample[2] for sample in samples if sample[2] is not None]
+        return {
+            'p50_ms': round(percentile(times, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(times, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(times, 0.99) * 1000, 2),
+            'rps': round(len(samples) / elapsed, 1) if elapsed else 0,
+            'queries': round(sum(queries) / len(queries), 2) if queries else None,
+            'queries_max': max(queries) if queries else None,
+            'statuses': statuses,
+        }
+
+    def print_route(self, route, result):
+        self.stdout.write(
+            f'{route:>30}: p50 {result["p50_ms"]:8.2f}ms  p95 {result["p95_ms"]:8.2f}ms  '
+            f'p99 {result["p99_ms"]:8.2f}ms  {result["rps"]:8.1f} req/s  '
+            f'queries {result["queries"]} (max {result["queries_max"]})  {result["statuses"]}'
+        )
+
+    def compare(self, path, results, tolerance):
+        with open(path) as f:
+            baseline = json.load(f)['routes']
+
+        regressions = []
+        self.stdout.write(f'Compared with {path}:')
+        for route, result in results.items():
+            before = baseline.get(route)
+            if before is None:
+                self.stdout.write(f'{route:>30}: new route')
+                continue
+            change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0
+            # Averages move with cache hits; the worst request's query count should not
+            more_queries = (result['queries_max'] or 0) > (before.get('queries_max') or 0)
+            line = (
+                f'{route:>30}: p95 {before["p95_ms"]:.2f} -> {result["p95_ms"]:.2f}ms ({change:+.0%}), '
+                f'max queries {before.get("queries_max")} -> {result["queries_max"]}'
+            )
+            if change > tolerance or more_queries:
+                regressions.append(route)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(f'Regressed: {", ".join(regressions)}')
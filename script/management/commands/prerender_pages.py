@@ -0,0 +1,42 @@
+import gzip
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from script.caching import STATIC_PAGES
+from script.middleware import prerendered_path
+
+
+class Command(BaseCommand):
+    help = 'Render the static pages with the anonymous navbar to HTML files served by WhiteNoise'
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        for url_name, _ in STATIC_PAGES:
+            url = reverse(url_name)
+            request = factory.get(url)
+            request.session = {}
+
+            # Call the undecorated view so the page cache is left alone
+            view = resolve(url).func
+            view = getattr(view, '__wrapped__', view)
+            content = view(request).content
+
+            path = prerendered_path(settings.PRERENDER_ROOT, url)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._write(path, content)
+            self._write(path + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+            self.stdout.write(f'Prerendered {url} ({len(content)} bytes)')
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {len(STATIC_PAGES)} pages to {settings.PRERENDER_ROOT}'))
+
+    @staticmethod
+    def _write(path, data):
+        # Replace atomically so a running server never reads a half written page
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions in small chunks so the session table is never locked for long'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0.05, help='Seconds to pause between chunks')
+
+    def handle(self, *args, **options):
+        if settings.SESSION_MODE == 'signed_cookies':
+            self.stdout.write('Sessions live in signed cookies; nothing to purge.')
+            return
+
+        chunk_size = options['chunk_size']
+        now = timezone.now()
+        purged = 0
+
+        while True:
+            # Each chunk is its own short autocommit statement keyed by primary key
+            keys = list(
+                Session.objects.filter(expire_date__lt=now)
+                .order_by()
+                .values_list('session_key', flat=True)[:chunk_size]
+            )
+            if not keys:
+                break
+            purged += Session.objects.filter(pk__in=keys).delete()[0]
+            if len(keys) < chunk_size:
+                break
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} expired sessions.'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from script.search import rebuild_index, search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for courses and lessons'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        backend = search_backend()
+        if backend is None:
+            self.stdout.write(self.style.WARNING('This database has no full-text index; nothing to do.'))
+            return
+        count = rebuild_index(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} documents ({backend}).'))
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from script.models import Enrollment, Lesson, LessonProgress
+from script.services import completion_time
+
+
+class Command(BaseCommand):
+    help = 'Repair drift in the denormalized Enrollment progress counters, one chunk at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_id = 0
+        checked = repaired = 0
+
+        while True:
+            chunk = list(
+                Enrollment.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .only('id', 'user_id', 'course_id', 'completed_lessons', 'total_lessons', 'completed_at')[:chunk_size]
+            )
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            checked += len(chunk)
+
+            course_ids = {enrollment.course_id for enrollment in chunk}
+            user_ids = {enrollment.user_id for enrollment in chunk}
+
+            totals = dict(
+                Lesson.objects.filter(module__course_id__in=course_ids)
+                .order_by()
+                .values_list('module__course_id')
+                .annotate(n=Count('id'))
+            )
+            completed = {
+                (row['user_id'], row['lesson__module__course_id']): row['n']
+                for row in LessonProgress.objects.filter(
+                    user_id__in=user_ids,
+                    lesson__module__course_id__in=course_ids,
+                    is_completed=True,
+                ).order_by().values('user_id', 'lesson__module__course_id').annotate(n=Count('id'))
+            }
+
+            drifted = []
+            now = timezone.now()
+            for enrollment in chunk:
+                total = totals.get(enrollment.course_id, 0)
+                done = completed.get((enrollment.user_id, enrollment.course_id), 0)
+                completed_at = completion_time(enrollment.completed_at, done, total, now)
+                if (enrollment.total_lessons, enrollment.completed_lessons, enrollment.completed_at) != (total, done, completed_at):
+                    enrollment.total_lessons = total
+                    enrollment.completed_lessons = done
+                    enrollment.completed_at = completed_at
+                    enrollment.updated_at = now
+                    drifted.append(enrollment)
+
+            if drifted and not options['dry_run']:
+                with transaction.atomic():
+                    Enrollment.objects.bulk_update(drifted, ['completed_lessons', 'total_lessons', 'completed_at', 'updated_at'])
+            repaired += len(drifted)
+
+        action = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} enrollments. {action} {repaired} with drifted counters.'
+        ))
@@ -0,0 +1,144 @@
+import multiprocessing
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import override_settings
+
+from script.models import Course, Enrollment, Lesson, LessonProgress, Module, User
+from script.services import enroll_user, record_lesson_progress
+
+
+class Command(BaseCommand):
+    help = 'Hammer record_lesson_progress from many threads or processes and report lock errors and latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent writers (request threads) per process')
+        parser.add_argument(
+            '--processes', type=int, default=0,
+            help='Fork this many worker processes, like gunicorn workers (0 runs the threads in this process)',
+        )
+        parser.add_argument(
+            '--no-serialize', action='store_true',
+            help='Run with SQLITE_SERIALIZE_WRITES=False, relying on IMMEDIATE transactions and busy_timeout alone',
+        )
+        parser.add_argument('--updates', type=int, default=50, help='Progress updates per thread')
+        parser.add_argument('--lessons', type=int, default=20)
+        parser.add_argument('--keep', action='store_true', help='Keep the generated course and users')
+
+    def handle(self, *args, **options):
+        tag = f'stress-{time.time_ns()}'
+        course = Course.objects.create(title=tag, description='', difficulty='junior', duration_hours=1)
+        module = Module.objects.create(course=course, title=tag, description='', order=1)
+        Lesson.objects.bulk_create(
+            Lesson(module=module, title=f'{tag} {i}', slug=f'lesson-{i}', content='', order=i) for i in range(options['lessons'])
+        )
+        lessons = list(Lesson.objects.filter(module=module).select_related('module'))
+        users = [
+            User.objects.create(firstname='Stress', lastname=str(i), email=f'{tag}-{i}@example.com')
+            for i in range(options['threads'] * max(1, options['processes']))
+        ]
+        for user in users:
+            enroll_user(user, course)
+
+        try:
+            with override_settings(SQLITE_SERIALIZE_WRITES=False) if options['no_serialize'] else nullcontext():
+                if options['processes']:
+                    elapsed, times, errors = self.run_processes(users, lessons, options['updates'], options['processes'])
+                else:
+                    elapsed, times, errors = self.run(users, lessons, options['updates'])
+            self.report(connection.vendor, elapsed, times, errors, options['processes'])
+            self.check_counters(users, course, lessons)
+        finally:
+            if not options['keep']:
+                User.objects.filter(id__in=[user.id for user in users]).delete()
+                course.delete()
+
+        if errors:
+            raise CommandError(f'{len(errors)} writes failed: {errors[0]}')
+
+    def run(self, users, lessons, updates):
+        times = []
+        errors = []
+        lock = threading.Lock()
+
+        def writer(user):
+            rng = random.Random(user.id)
+            try:
+                for _ in range(updates):
+                    lesson = rng.choice(lessons)
+                    started = time.perf_counter()
+                    try:
+                        record_lesson_progress(user, lesson, rng.randint(1, 100), is_completed=rng.random() < 0.2)
+                    except OperationalError as exc:
+                        with lock:
+                            errors.append(exc)
+                        continue
+                    with lock:
+                        times.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(users)) as executor:
+            list(executor.map(writer, users))
+        return time.perf_counter() - started, times, errors
+
+    def run_processes(self, users, lessons, updates, processes):
+        # Forked children inherit settings and models; each opens its own connection
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        connections.close_all()
+        workers = [
+            context.Process(target=self.process_writer, args=(users[i::processes], lessons, updates, results))
+            for i in range(processes)
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        times, errors = [], []
+        for _ in workers:
+            worker_times, worker_errors = results.get(timeout=600)
+            times += worker_times
+            errors += worker_errors
+        for worker in workers:
+            worker.join()
+        return time.perf_counter() - started, times, errors
+
+    def process_writer(self, users, lessons, updates, results):
+        try:
+            _, times, errors = self.run(users, lessons, updates)
+            results.put((times, [str(exc) for exc in errors]))
+        except Exception as exc:
+            results.put(([], [repr(exc)]))
+        finally:
+            connections.close_all()
+
+    def report(self, vendor, elapsed, times, errors, processes=0):
+        def ms(seconds):
+            return f'{seconds * 1000:.1f}ms'
+
+        times.sort()
+        p95 = times[min(len(times) - 1, int(len(times) * 0.95))] if times else 0
+        where = f' across {processes} processes' if processes else ''
+        self.stdout.write(
+            f'{vendor}{where}: {len(times)} writes in {elapsed:.2f}s ({len(times) / elapsed:.0f}/s), '
+            f'p50 {ms(statistics.median(times) if times else 0)} p95 {ms(p95)}, {len(errors)} lock errors'
+        )
+
+    def check_counters(self, users, course, lessons):
+        # Concurrent completions must not double count
+        for enrollment in Enrollment.objects.filter(user__in=users, course=course):
+            completed = LessonProgress.objects.filter(
+                user_id=enrollment.user_id, lesson__in=lessons, is_completed=True
+            ).count()
+            if enrollment.completed_lessons != completed:
+                raise CommandError(
+                    f'User {enrollment.user_id} has {enrollment.completed_lessons} completed lessons counted, '
+                    f'{completed} recorded'
+                )
@@ -0,0 +1,118 @@
+import re
+import shutil
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+VENDOR_ROOT = Path(apps.get_app_config('script').path) / 'static' / 'vendor'
+
+# Font Awesome font files and the style classes that select them
+FONT_STYLES = {
+    'fa-solid-900': {'fas', 'fa-solid'},
+    'fa-regular-400': {'far', 'fa-regular'},
+    'fa-brands-400': {'fab', 'fa-brands'},
+}
+
+ICON_CLASS_RE = re.compile(r'\bfa-[a-z0-9-]+|\bfa[srb]?\b')
+ICON_RULE_RE = re.compile(r'((?:\.fa-[a-z0-9-]+:before,?)+)\{content:"\\([0-9a-f]+)"\}')
+FONT_FACE_RE = re.compile(r'@font-face\{[^}]*\}')
+SOURCE_MAP_RE = re.compile(r'\n?(/\*# sourceMappingURL=[^*]*\*/|//# sourceMappingURL=\S+)\s*$')
+
+
+def _template_files():
+    dirs = [Path(d) for template in settings.TEMPLATES for d in template['DIRS']]
+    dirs += [Path(config.path) / 'templates' for config in apps.get_app_configs()
+             if config.name.startswith('script')]
+    dirs += [Path(apps.get_app_config('script').path) / 'static' / 'js']
+    for directory in dirs:
+        yield from (path for path in directory.rglob('*') if path.suffix in ('.html', '.js'))
+
+
+def used_icon_classes():
+    classes = set()
+    for path in _template_files():
+        classes.update(ICON_CLASS_RE.findall(path.read_text(encoding='utf-8')))
+    return classes
+
+
+def used_font_files(used):
+    # A bare "fa" class renders with the solid font
+    return [name for name, styles in FONT_STYLES.items()
+            if styles & used or (name == 'fa-solid-900' and 'fa' in used)]
+
+
+def subset_icon_css(css, used):
+    """Keep the Font Awesome rules for icons we use and return the css with their code points"""
+    font_files = used_font_files(used)
+    codepoints = set()
+
+    def keep_used(match):
+        selectors = [s for s in match.group(1).split(',') if s and s[1:-len(':before')] in used]
+        if not selectors:
+            return ''
+        codepoints.add(int(match.group(2), 16))
+        return f'{",".join(selectors)}{{content:"\\{match.group(2)}"}}'
+
+    css = ICON_RULE_RE.sub(keep_used, css)
+
+    # Only the woff2 files of the current fonts are shipped
+    def keep_font_face(match):
+        rule = match.group(0)
+        if '"FontAwesome"' in rule or 'Font Awesome 5' in rule:
+            return ''
+        if not any(f'/{font_name}.woff2' in rule for font_name in font_files):
+            return ''
+        return re.sub(r',url\([^)]*\.ttf\) format\("truetype"\)', '', rule)
+
+    return FONT_FACE_RE.sub(keep_font_face, css), codepoints
+
+
+class Command(BaseCommand):
+    help = ('Vendor Bootstrap and a Font Awesome subset holding only the icons our templates use '
+            'into script/static/vendor')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bootstrap', required=True, help='Bootstrap dist directory (with css/ and js/)')
+        parser.add_argument('--fontawesome', required=True, help='Font Awesome Free directory (with css/ and webfonts/)')
+
+    def handle(self, *args, **options):
+        try:
+            from fontTools import subset
+        except ImportError:
+            raise CommandError('Subsetting the icon fonts needs fonttools and brotli: pip install fonttools brotli')
+
+        bootstrap = Path(options['bootstrap'])
+        fontawesome = Path(options['fontawesome'])
+
+        # Source map comments would point collectstatic at files we do not ship
+        for source, target in [
+            (bootstrap / 'css' / 'bootstrap.min.css', VENDOR_ROOT / 'bootstrap' / 'bootstrap.min.css'),
+            (bootstrap / 'js' / 'bootstrap.bundle.min.js', VENDOR_ROOT / 'bootstrap' / 'bootstrap.bundle.min.js'),
+        ]:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(SOURCE_MAP_RE.sub('', source.read_text(encoding='utf-8')) + '\n', encoding='utf-8')
+
+        used = used_icon_classes()
+        css, codepoints = subset_icon_css((fontawesome / 'css' / 'all.min.css').read_text(encoding='utf-8'), used)
+        css_path = VENDOR_ROOT / 'fontawesome' / 'css' / 'icons.min.css'
+        css_path.parent.mkdir(parents=True, exist_ok=True)
+        css_path.write_text(css + '\n', encoding='utf-8')
+
+        fonts_dir = VENDOR_ROOT / 'fontawesome' / 'webfonts'
+        shutil.rmtree(fonts_dir, ignore_errors=True)
+        fonts_dir.mkdir(parents=True)
+        subset_options = subset.Options()
+        subset_options.flavor = 'woff2'
+        subset_options.layout_features = []
+        for font_name in used_font_files(used):
+            font = subset.load_font(str(fontawesome / 'webfonts' / f'{font_name}.woff2'), subset_options)
+            subsetter = subset.Subsetter(subset_options)
+            subsetter.populate(unicodes=codepoints)
+            subsetter.subset(font)
+            subset.save_font(font, str(fonts_dir / f'{font_name}.woff2'), subset_options)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Vendored Bootstrap and {len(codepoints)} Font Awesome icons into {VENDOR_ROOT}'
+        ))
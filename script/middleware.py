@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.signing import BadSignature
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import SimpleLazyObject
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .auth import get_hub_user
+from .caching import STATIC_PAGES
+from .instrumentation import collect_metrics
+from .routers import PIN_COOKIE, end_request, start_request
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+request_logger = logging.getLogger('script.requests')
+
+
+class HubUserMiddleware:
+    """Attach the session's User as a lazily loaded request.hub_user"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.hub_user = SimpleLazyObject(lambda: get_hub_user(request))
+        return self.get_response(request)
+
+
+class QueryBudgetMiddleware:
+    """Measure queries, database time and template time for every request
+
+    The numbers go out as a Server-Timing header and one JSON log line. Any
+    SQL shape run more than QUERY_REPEAT_THRESHOLD times, usually an N+1
+    loop, is logged as a warning.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_INSTRUMENTATION:
+            return self.get_response(request)
+
+        with collect_metrics() as metrics:
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        view = match.view_name if match else request.path
+        for count, shape in metrics.repeated(settings.QUERY_REPEAT_THRESHOLD):
+            request_logger.warning('%s ran the same query %d times: %s', view, count, shape)
+
+        if settings.QUERY_SERVER_TIMING:
+            response['Server-Timing'] = metrics.server_timing()
+        request_logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_time * 1000, 1),
+            'template_ms': round(metrics.template_time * 1000, 1),
+            'total_ms': round(metrics.total_time * 1000, 1),
+        }))
+        return response
+
+
+class ReplicaPinMiddleware:
+    """Pin clients that just wrote to the primary database for REPLICA_PIN_SECONDS
+
+    Any unsafe request or ORM write sets a short-lived signed cookie; while it
+    is valid, views marked read_from_replica read from the primary so the
+    client sees its own writes despite replication lag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        unsafe = request.method not in SAFE_METHODS
+        routing, token = start_request(pinned=unsafe or self.is_pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+
+        if unsafe or routing.wrote:
+            response.set_signed_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def is_pinned(self, request):
+        try:
+            request.get_signed_cookie(PIN_COOKIE, max_age=settings.REPLICA_PIN_SECONDS)
+        except (KeyError, BadSignature):
+            return False
+        return True
+
+
+class HubWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise that also serves the prerendered static pages to anonymous visitors
+
+    Requests carrying a session or messages cookie may need the logged in
+    navbar or a flash message, so they fall through to the regular view.
+    """
+
+    def __init__(self, get_response=None, settings=settings):
+        self.prerender_max_age = settings.PRERENDER_MAX_AGE
+        self.prerendered_urls = [reverse(url_name) for url_name, _ in STATIC_PAGES]
+        super().__init__(get_response, settings)
+
+        self.prerendered_files = {}
+        for url in self.prerendered_urls:
+            path = prerendered_path(settings.PRERENDER_ROOT, url)
+            if os.path.isfile(path):
+                self.prerendered_files[url] = self.get_static_file(path, url)
+
+    def add_cache_headers(self, headers, path, url):
+        if url in self.prerendered_urls:
+            headers['Cache-Control'] = f'max-age={self.prerender_max_age}, public'
+        else:
+            super().add_cache_headers(headers, path, url)
+
+    def __call__(self, request):
+        static_file = self.prerendered_files.get(request.path_info)
+        if static_file is not None and request.method in ('GET', 'HEAD') and not (
+            settings.SESSION_COOKIE_NAME in request.COOKIES or CookieStorage.cookie_name in request.COOKIES
+        ):
+            response = self.serve(static_file, request)
+            # The same URL renders a personalised navbar once a session cookie exists
+            patch_vary_headers(response, ['Cookie'])
+            return response
+        return super().__call__(request)
+
+
+def prerendered_path(root, url):
+    return os.path.join(root, url.strip('/'), 'index.html')
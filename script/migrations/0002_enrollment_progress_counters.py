@@ -0,0 +1,52 @@
+# Generated by Django 5.1.7 on 2026-10-17 22:05
+
+from django.db import migrations, models
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def backfill_progress_counters(apps, schema_editor):
+    Enrollment = apps.get_model('script', 'Enrollment')
+    Lesson = apps.get_model('script', 'Lesson')
+    LessonProgress = apps.get_model('script', 'LessonProgress')
+
+    total = Lesson.objects.filter(
+        module__course=OuterRef('course')
+    ).order_by().values('module__course').annotate(n=Count('id')).values('n')
+    completed = LessonProgress.objects.filter(
+        user=OuterRef('user'),
+        lesson__module__course=OuterRef('course'),
+        is_completed=True,
+    ).order_by().values('user').annotate(n=Count('id')).values('n')
+
+    Enrollment.objects.update(
+        total_lessons=Coalesce(Subquery(total, output_field=IntegerField()), 0),
+        completed_lessons=Coalesce(Subquery(completed, output_field=IntegerField()), 0),
+    )
+    # completed_at follows the counters, as in services._recount_enrollments
+    Enrollment.objects.update(completed_at=Case(
+        When(total_lessons__gt=0, completed_lessons__gte=F('total_lessons'), then=Coalesce('completed_at', Value(timezone.now()))),
+        default=None,
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('script', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_lessons',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='total_lessons',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_progress_counters, migrations.RunPython.noop),
+    ]
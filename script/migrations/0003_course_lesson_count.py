@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-17 22:06
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_lesson_count(apps, schema_editor):
+    Course = apps.get_model('script', 'Course')
+    Lesson = apps.get_model('script', 'Lesson')
+
+    total = Lesson.objects.filter(
+        module__course=OuterRef('pk')
+    ).order_by().values('module__course').annotate(n=Count('id')).values('n')
+    Course.objects.update(lesson_count=Coalesce(Subquery(total, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('script', '0002_enrollment_progress_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lesson_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_lesson_count, migrations.RunPython.noop),
+    ]
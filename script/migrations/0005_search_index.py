@@ -0,0 +1,53 @@
+from django.db import migrations
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE script_search_index USING fts5("
+    "kind UNINDEXED, object_id UNINDEXED, course_id UNINDEXED, title, body, "
+    "tokenize = 'porter unicode61')",
+    "INSERT INTO script_search_index (rowid, kind, object_id, course_id, title, body) "
+    "SELECT id * 2, 'course', id, id, title, description FROM script_course",
+    "INSERT INTO script_search_index (rowid, kind, object_id, course_id, title, body) "
+    "SELECT l.id * 2 + 1, 'lesson', l.id, m.course_id, l.title, l.content "
+    "FROM script_lesson l JOIN script_module m ON m.id = l.module_id",
+]
+
+POSTGRES_CREATE = [
+    "CREATE TABLE script_search_index ("
+    "kind varchar(10) NOT NULL, object_id bigint NOT NULL, course_id bigint NOT NULL, "
+    "title text NOT NULL, body text NOT NULL, "
+    "document tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', body), 'B')"
+    ") STORED, "
+    "PRIMARY KEY (kind, object_id))",
+    "CREATE INDEX script_search_index_document ON script_search_index USING GIN (document)",
+    "INSERT INTO script_search_index (kind, object_id, course_id, title, body) "
+    "SELECT 'course', id, id, title, description FROM script_course",
+    "INSERT INTO script_search_index (kind, object_id, course_id, title, body) "
+    "SELECT 'lesson', l.id, m.course_id, l.title, l.content "
+    "FROM script_lesson l JOIN script_module m ON m.id = l.module_id",
+]
+
+
+def create_search_index(apps, schema_editor):
+    statements = {
+        'sqlite': SQLITE_CREATE,
+        'postgresql': POSTGRES_CREATE,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS script_search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('script', '0004_course_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-17 22:26
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('script', '0006_course_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contact',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
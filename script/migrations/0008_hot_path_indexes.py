@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-17 22:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('script', '0007_contact_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user', 'course'], name='enrollment_user_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['module', 'order', 'id'], name='lesson_module_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lessonprogress',
+            index=models.Index(condition=models.Q(('is_completed', True)), fields=['user', '-completed_at'], name='progress_user_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='module',
+            index=models.Index(fields=['course', 'order', 'id'], name='module_course_order_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def fill_slugs(apps, schema_editor):
+    # Existing rows get slugs from their titles, unique within their parent
+    for model_name, parent, fallback in (('Course', None, 'course'), ('Module', 'course_id', 'module'), ('Lesson', 'module_id', 'lesson')):
+        model = apps.get_model('script', model_name)
+        taken = {}
+        batch = []
+        for obj in model.objects.order_by('id').iterator(chunk_size=1000):
+            used = taken.setdefault(getattr(obj, parent) if parent else None, set())
+            base = slugify(obj.title)[:210] or fallback
+            slug, n = base, 2
+            while slug in used:
+                slug, n = f'{base}-{n}', n + 1
+            used.add(slug)
+            obj.slug = slug
+            batch.append(obj)
+            if len(batch) >= 1000:
+                model.objects.bulk_update(batch, ['slug'])
+                batch = []
+        model.objects.bulk_update(batch, ['slug'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('script', '0008_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='slug',
+            field=models.SlugField(max_length=220, default='', db_index=False),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='module',
+            name='slug',
+            field=models.SlugField(max_length=220, default='', db_index=False),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='slug',
+            field=models.SlugField(max_length=220, default='', db_index=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='course',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=220, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='module',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=220),
+        ),
+        migrations.AlterField(
+            model_name='lesson',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=220),
+        ),
+        migrations.AddConstraint(
+            model_name='module',
+            constraint=models.UniqueConstraint(fields=['course', 'slug'], name='module_course_slug_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='lesson',
+            constraint=models.UniqueConstraint(fields=['module', 'slug'], name='lesson_module_slug_uniq'),
+        ),
+    ]
@@ -1,7 +1,23 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import AbstractUser
-from django.contrib.auth.hashers import make_password, check_password
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from django.utils.text import slugify
+
+from .hashing import hash_password, verify_password
+
+SLUG_LENGTH = 220
+
+
+def unique_slug(queryset, value, fallback):
+    """Slugify value, adding -2, -3, ... until no row of queryset uses it"""
+    base = slugify(value)[:SLUG_LENGTH - 10] or fallback
+    taken = set(queryset.filter(slug__startswith=base).values_list('slug', flat=True))
+    slug, n = base, 2
+    while slug in taken:
+        slug, n = f'{base}-{n}', n + 1
+    return slug
 
 # Create your models here.
 
@@ -17,17 +33,23 @@ class User(models.Model):
         return f"{self.firstname} {self.lastname}"
     
     def set_password(self, raw_password):
-        self.password = make_password(raw_password)
+        self.password = hash_password(raw_password)
     
     def check_password(self, raw_password):
-        return check_password(raw_password, self.password)
+        is_correct, needs_rehash = verify_password(raw_password, self.password)
+        # Upgrade hashes made by an older hasher or with fewer iterations
+        if is_correct and needs_rehash and self.pk:
+            self.set_password(raw_password)
+            self.save(update_fields=['password'])
+        return is_correct
 
 class Contact(models.Model):
     name = models.CharField(max_length=100)
     email = models.EmailField()
     subject = models.CharField(max_length=200, blank=True)
     message = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set from the submission time, since queued submissions are inserted later
+    created_at = models.DateTimeField(default=timezone.now)
     
     def __str__(self):
         return f"{self.name} - {self.subject}"
@@ -35,6 +57,22 @@ class Contact(models.Model):
     class Meta:
         ordering = ['-created_at']
 
+class CourseQuerySet(models.QuerySet):
+    def with_lesson_stats(self):
+        """Annotate lesson totals and duration for every course in one grouped query"""
+        return self.annotate(
+            total_lessons=models.Count('modules__lessons'),
+            total_duration_minutes=Coalesce(models.Sum('modules__lessons__duration_minutes'), 0),
+        )
+    
+    def with_enrollment_count(self):
+        enrollments = Enrollment.objects.filter(
+            course=models.OuterRef('pk')
+        ).order_by().values('course').annotate(n=models.Count('id')).values('n')
+        return self.annotate(
+            enrollment_count=Coalesce(models.Subquery(enrollments, output_field=models.IntegerField()), 0)
+        )
+
 class Course(models.Model):
     DIFFICULTY_CHOICES = [
         ('junior', 'Junior'),
@@ -43,27 +81,46 @@ class Course(models.Model):
     ]
     
     title = models.CharField(max_length=200)
+    # Stable key for course tree import/export, filled from the title when blank
+    slug = models.SlugField(max_length=SLUG_LENGTH, unique=True, blank=True)
     description = models.TextField()
     difficulty = models.CharField(max_length=20, choices=DIFFICULTY_CHOICES)
     image = models.ImageField(upload_to='course_images/', blank=True, null=True)
+    # Resized WebP/JPEG copies of image, written by script.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     duration_hours = models.IntegerField(default=0)
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     is_free = models.BooleanField(default=True)
+    # Stored lesson total, kept in sync by Lesson/Module signals
+    lesson_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CourseQuerySet.as_manager()
+    
     def __str__(self):
         return self.title
     
     def get_total_lessons(self):
-        total = 0
-        for module in self.modules.all():
-            total += module.lessons.count()
-        return total
+        return self.lesson_count
+    
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = unique_slug(Course.objects.all(), self.title, 'course')
+        super().save(*args, **kwargs)
+    
+    class Meta:
+        indexes = [
+            # Catalog listings, newest first, keyset paginated on (created_at, id)
+            models.Index(fields=['difficulty', '-created_at', '-id'], name='course_difficulty_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='course_created_idx'),
+        ]
 
 class Module(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='modules')
     title = models.CharField(max_length=200)
+    # Unique within the course
+    slug = models.SlugField(max_length=SLUG_LENGTH, blank=True)
     description = models.TextField()
     order = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -71,12 +128,26 @@ class Module(models.Model):
     def __str__(self):
         return f"{self.course.title} - {self.title}"
     
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = unique_slug(Module.objects.filter(course_id=self.course_id), self.title, 'module')
+        super().save(*args, **kwargs)
+    
     class Meta:
         ordering = ['order']
+        indexes = [
+            # Outline walks and course pages list a course's modules in order
+            models.Index(fields=['course', 'order', 'id'], name='module_course_order_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'slug'], name='module_course_slug_uniq'),
+        ]
 
 class Lesson(models.Model):
     module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='lessons')
     title = models.CharField(max_length=200)
+    # Unique within the module
+    slug = models.SlugField(max_length=SLUG_LENGTH, blank=True)
     content = models.TextField()
     video_url = models.URLField(blank=True, null=True)
     duration_minutes = models.IntegerField(default=0)
@@ -86,8 +157,19 @@ class Lesson(models.Model):
     def __str__(self):
         return f"{self.module.title} - {self.title}"
     
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = unique_slug(Lesson.objects.filter(module_id=self.module_id), self.title, 'lesson')
+        super().save(*args, **kwargs)
+    
     class Meta:
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['module', 'order', 'id'], name='lesson_module_order_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['module', 'slug'], name='lesson_module_slug_uniq'),
+        ]
 
 class Enrollment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='enrollments')
@@ -95,12 +177,28 @@ class Enrollment(models.Model):
     enrolled_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    # Denormalized progress counters, kept in sync by script.services
+    completed_lessons = models.PositiveIntegerField(default=0)
+    total_lessons = models.PositiveIntegerField(default=0)
+    # Incremental exports filter on this; queryset updates set it explicitly
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.user.firstname} - {self.course.title}"
     
+    @property
+    def progress_percentage(self):
+        if not self.total_lessons:
+            return 0
+        return min(self.completed_lessons, self.total_lessons) / self.total_lessons * 100
+    
     class Meta:
         unique_together = ['user', 'course']
+        indexes = [
+            # Dashboard and My Courses list a user's active enrollments
+            models.Index(fields=['user', 'course'], condition=Q(is_active=True), name='enrollment_user_active_idx'),
+            models.Index(fields=['updated_at', 'id'], name='enrollment_updated_idx'),
+        ]
 
 class LessonProgress(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lesson_progress')
@@ -108,9 +206,16 @@ class LessonProgress(models.Model):
     is_completed = models.BooleanField(default=False)
     completed_at = models.DateTimeField(blank=True, null=True)
     progress_percentage = models.IntegerField(default=0)  # 0-100
+    # Incremental exports filter on this; queryset updates and upserts set it explicitly
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.user.firstname} - {self.lesson.title}"
     
     class Meta:
-        unique_together = ['user', 'lesson']
\ No newline at end of file
+        unique_together = ['user', 'lesson']
+        indexes = [
+            # Recent completions on the dashboard, newest first
+            models.Index(fields=['user', '-completed_at'], condition=Q(is_completed=True), name='progress_user_completed_idx'),
+            models.Index(fields=['updated_at', 'id'], name='progress_updated_idx'),
+        ]
\ No newline at end of file
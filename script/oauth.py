@@ -0,0 +1,64 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from django.conf import settings
+
+
+class OAuthHTTP:
+    """Per-process keep-alive HTTP client for the identity providers
+
+    One pooled httpx.Client is shared by every request thread, so callbacks
+    reuse TLS connections to the providers, and the OAUTH_HTTP_* timeouts
+    bound how long a slow provider can hold a worker thread. Independent
+    calls can run side by side on a small thread pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._client = None
+        self._executor = None
+
+    def _ensure_client(self):
+        # Created lazily, and again in a forked worker
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._client = httpx.Client(
+                timeout=httpx.Timeout(settings.OAUTH_HTTP_TIMEOUT, connect=settings.OAUTH_HTTP_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.OAUTH_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.OAUTH_HTTP_MAX_CONNECTIONS,
+                ),
+            )
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.OAUTH_HTTP_MAX_CONNECTIONS, thread_name_prefix='oauth-http'
+            )
+            self._pid = os.getpid()
+
+    def close(self):
+        """Drop the pooled connections; the next call builds a client from current settings"""
+        with self._lock:
+            if self._pid == os.getpid():
+                self._client.close()
+                self._executor.shutdown(wait=False)
+            self._pid = self._client = self._executor = None
+
+    def fetch_json(self, method, url, **kwargs):
+        self._ensure_client()
+        response = self._client.request(method, url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_json_concurrently(self, *calls):
+        """Run (method, url, kwargs) calls side by side and return their JSON bodies in order"""
+        self._ensure_client()
+        futures = [self._executor.submit(self.fetch_json, method, url, **kwargs) for method, url, kwargs in calls]
+        return [future.result() for future in futures]
+
+
+oauth_http = OAuthHTTP()
@@ -0,0 +1,79 @@
+import time
+
+from django.core.cache import cache
+
+from .models import Lesson
+
+OUTLINE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class CourseOutline:
+    """Ordered lesson ids of a course with O(1) position lookups"""
+
+    def __init__(self, course_id, lesson_ids):
+        self.course_id = course_id
+        self.lesson_ids = list(lesson_ids)
+        self.positions = {lesson_id: index for index, lesson_id in enumerate(self.lesson_ids)}
+
+    def __len__(self):
+        return len(self.lesson_ids)
+
+    def __contains__(self, lesson_id):
+        return lesson_id in self.positions
+
+    def position(self, lesson_id):
+        return self.positions.get(lesson_id)
+
+    def first_id(self):
+        return self.lesson_ids[0] if self.lesson_ids else None
+
+    def prev_id(self, lesson_id):
+        index = self.positions[lesson_id]
+        return self.lesson_ids[index - 1] if index > 0 else None
+
+    def next_id(self, lesson_id):
+        index = self.positions[lesson_id]
+        return self.lesson_ids[index + 1] if index < len(self.lesson_ids) - 1 else None
+
+
+def _version_key(course_id):
+    return f'course_outline_version:{course_id}'
+
+
+def _new_version():
+    # Time based so a lost version key never resurrects an older outline
+    return time.time_ns()
+
+
+def get_outline_version(course_id):
+    key = _version_key(course_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_course_outline(course_id):
+    key = _version_key(course_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), None)
+
+
+def build_course_outline(course_id):
+    lesson_ids = Lesson.objects.filter(module__course_id=course_id).order_by(
+        'module__order', 'module_id', 'order', 'id'
+    ).values_list('id', flat=True)
+    return CourseOutline(course_id, lesson_ids)
+
+
+def get_course_outline(course_id):
+    """Return the cached outline for a course, building it in one query on a miss"""
+    key = f'course_outline:{course_id}:{get_outline_version(course_id)}'
+    outline = cache.get(key)
+    if outline is None:
+        outline = build_course_outline(course_id)
+        cache.set(key, outline, OUTLINE_CACHE_TIMEOUT)
+    return outline
@@ -0,0 +1,94 @@
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+
+from .services import serialized_writes, upsert_lesson_progress
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressBuffer:
+    """In-process write-behind buffer for percentage-only LessonProgress updates
+
+    Updates are coalesced per (user_id, lesson_id), keeping the highest
+    percentage, and written with one upsert per flush. A daemon thread
+    flushes every PROGRESS_FLUSH_INTERVAL seconds, a full buffer flushes
+    immediately and whatever is left is flushed when the process exits.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._flusher_pid = None
+        self._wakeup = threading.Event()
+
+    def add(self, user_id, lesson_id, progress_percentage):
+        key = (user_id, lesson_id)
+        with self._lock:
+            self._pending[key] = max(self._pending.get(key, 0), progress_percentage)
+            size = len(self._pending)
+        self._ensure_flusher()
+        if size >= settings.PROGRESS_BUFFER_MAX:
+            self.flush()
+
+    def pending_percentage(self, user_id, lesson_id):
+        with self._lock:
+            return self._pending.get((user_id, lesson_id))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        rows = [(user_id, lesson_id, percentage, False) for (user_id, lesson_id), percentage in pending.items()]
+        try:
+            with serialized_writes():
+                upsert_lesson_progress(rows)
+        except IntegrityError:
+            # A user or lesson was deleted meanwhile; write the rest one by one
+            for row in rows:
+                try:
+                    with serialized_writes(), transaction.atomic():
+                        upsert_lesson_progress([row])
+                except IntegrityError:
+                    logger.warning('Dropping buffered progress for user %s lesson %s', row[0], row[1])
+        except Exception:
+            # Put the updates back so the next flush retries them
+            with self._lock:
+                for key, percentage in pending.items():
+                    self._pending[key] = max(self._pending.get(key, 0), percentage)
+            raise
+        return len(rows)
+
+    def _ensure_flusher(self):
+        # Started lazily, and again in a forked worker
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._run, name='progress-buffer-flusher', daemon=True).start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.PROGRESS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Flushing buffered lesson progress failed')
+            finally:
+                connection.close()
+
+
+progress_buffer = ProgressBuffer()
+atexit.register(progress_buffer.flush)
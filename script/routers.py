@@ -0,0 +1,78 @@
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+PIN_COOKIE = 'hub_primary'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_request_routing = ContextVar('request_routing', default=None)
+
+
+class RequestRouting:
+    """Routing state for one request, shared by ReplicaPinMiddleware and the router"""
+
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def start_request(pinned):
+    routing = RequestRouting(pinned)
+    return routing, _request_routing.set(routing)
+
+
+def end_request(token):
+    _request_routing.reset(token)
+
+
+def read_from_replica(view_func):
+    """Send the view's reads to a replica unless the client is pinned to the primary"""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        token = _replica_reads.set(True)
+        try:
+            response = view_func(request, *args, **kwargs)
+            # TemplateResponses (the admin changelist) run their queries when rendered
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+            return response
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Reads from views marked read_from_replica go to DATABASE_REPLICAS, everything else to default"""
+
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or not _replica_reads.get():
+            return None
+        routing = _request_routing.get()
+        if routing is not None and (routing.pinned or routing.wrote):
+            return 'default'
+        # A session written at login must be readable on the very next request
+        if model._meta.app_label == 'sessions':
+            return 'default'
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        routing = _request_routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
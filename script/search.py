@@ -0,0 +1,235 @@
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Course, Lesson
+
+SEARCH_TABLE = 'script_search_index'
+
+KIND_COURSE = 'course'
+KIND_LESSON = 'lesson'
+
+# Control characters mark the snippet highlights so they survive HTML escaping
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchResult:
+    def __init__(self, kind, object_id, course_id, title, snippet, rank):
+        self.kind = kind
+        self.object_id = object_id
+        self.course_id = course_id
+        self.title = title
+        self.snippet = mark_safe(
+            escape(snippet or '').replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+        )
+        self.rank = rank
+
+    @property
+    def is_lesson(self):
+        return self.kind == KIND_LESSON
+
+
+def search_backend(using=DEFAULT_DB_ALIAS):
+    """The inverted index in use: SQLite FTS5, PostgreSQL tsvector or None"""
+    vendor = connections[using].vendor
+    if vendor in ('sqlite', 'postgresql'):
+        return vendor
+    return None
+
+
+def _connection(write=False):
+    # Index reads follow the router like ORM reads, so read_from_replica views search a replica
+    alias = router.db_for_write(Course) if write else router.db_for_read(Course)
+    return connections[alias]
+
+
+def _rowid(kind, object_id):
+    # FTS5 rows are addressed by rowid, so derive a stable one per document
+    return object_id * 2 + (1 if kind == KIND_LESSON else 0)
+
+
+def _upsert(kind, object_id, course_id, title, body):
+    connection = _connection(write=True)
+    backend = search_backend(connection.alias)
+    with connection.cursor() as cursor:
+        if backend == 'sqlite':
+            rowid = _rowid(kind, object_id)
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [rowid])
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, kind, object_id, course_id, title, body) '
+                f'VALUES (%s, %s, %s, %s, %s, %s)',
+                [rowid, kind, object_id, course_id, title, body],
+            )
+        elif backend == 'postgresql':
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (kind, object_id, course_id, title, body) '
+                f'VALUES (%s, %s, %s, %s, %s) '
+                f'ON CONFLICT (kind, object_id) DO UPDATE SET '
+                f'course_id = excluded.course_id, title = excluded.title, body = excluded.body',
+                [kind, object_id, course_id, title, body],
+            )
+
+
+def remove_document(kind, object_id):
+    connection = _connection(write=True)
+    backend = search_backend(connection.alias)
+    with connection.cursor() as cursor:
+        if backend == 'sqlite':
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [_rowid(kind, object_id)])
+        elif backend == 'postgresql':
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE kind = %s AND object_id = %s', [kind, object_id]
+            )
+
+
+def remove_course_documents(course_ids, chunk_size=500):
+    """Drop the documents of these courses and all their lessons, for raw bulk deletes"""
+    connection = _connection(write=True)
+    if search_backend(connection.alias) is None:
+        return
+    course_ids = list(course_ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(course_ids), chunk_size):
+            chunk = course_ids[start:start + chunk_size]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE course_id IN ({placeholders})', chunk)
+
+
+def index_course(course):
+    _upsert(KIND_COURSE, course.pk, course.pk, course.title, course.description)
+
+
+def index_lesson(lesson, course_id):
+    _upsert(KIND_LESSON, lesson.pk, course_id, lesson.title, lesson.content)
+
+
+def reindex_lessons(lessons):
+    """Reindex lessons whose course may have changed, e.g. after a module moved"""
+    for lesson in lessons.select_related('module'):
+        index_lesson(lesson, lesson.module.course_id)
+
+
+def rebuild_index(chunk_size=1000):
+    """Drop and recreate every document from the Course and Lesson tables"""
+    connection = _connection(write=True)
+    if search_backend(connection.alias) is None:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+    count = 0
+    for course in Course.objects.only('id', 'title', 'description').iterator(chunk_size=chunk_size):
+        index_course(course)
+        count += 1
+    lessons = Lesson.objects.only('id', 'title', 'content', 'module__course_id').select_related('module')
+    for lesson in lessons.iterator(chunk_size=chunk_size):
+        index_lesson(lesson, lesson.module.course_id)
+        count += 1
+    return count
+
+
+def _tokens(query):
+    return _TOKEN_RE.findall(query.lower())[:10]
+
+
+def _sqlite_match(tokens):
+    # Every token must match, the last one as a prefix for search-as-you-type
+    return ' '.join(f'"{token}"' for token in tokens[:-1]) + f' "{tokens[-1]}"*'
+
+
+def _tsquery(tokens):
+    return ' & '.join(f'{token}:*' for token in tokens)
+
+
+def search(query, kind=None, limit=20):
+    """Return ranked SearchResults with highlighted snippets, best match first"""
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+
+    connection = _connection()
+    backend = search_backend(connection.alias)
+    if backend == 'sqlite':
+        sql = (
+            f"SELECT kind, object_id, course_id, title, "
+            f"snippet({SEARCH_TABLE}, 4, %s, %s, '…', 16), "
+            f"bm25({SEARCH_TABLE}, 0, 0, 0, 10.0, 1.0) AS score "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s"
+        )
+        params = [_MARK_START, _MARK_END, _sqlite_match(tokens)]
+        if kind:
+            sql += ' AND kind = %s'
+            params.append(kind)
+        sql += ' ORDER BY score LIMIT %s'
+        params.append(limit)
+    elif backend == 'postgresql':
+        sql = (
+            f"SELECT kind, object_id, course_id, title, "
+            f"ts_headline('english', body, query, %s), "
+            f"ts_rank(document, query) AS score "
+            f"FROM {SEARCH_TABLE}, to_tsquery('english', %s) query WHERE document @@ query"
+        )
+        params = [f'StartSel={_MARK_START}, StopSel={_MARK_END}, MaxWords=30, MinWords=10', _tsquery(tokens)]
+        if kind:
+            sql += ' AND kind = %s'
+            params.append(kind)
+        sql += ' ORDER BY score DESC LIMIT %s'
+        params.append(limit)
+    else:
+        return _fallback_search(tokens, kind, limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [SearchResult(*row) for row in cursor.fetchall()]
+
+
+def search_ids(query, kind, limit=1000):
+    """Ids of the objects matching query, best match first; limit=None returns every match unranked"""
+    if limit is not None:
+        return [result.object_id for result in search(query, kind=kind, limit=limit)]
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+
+    connection = _connection()
+    backend = search_backend(connection.alias)
+    if backend == 'sqlite':
+        sql = f'SELECT object_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+        params = [_sqlite_match(tokens)]
+    elif backend == 'postgresql':
+        sql = f"SELECT object_id FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('english', %s)"
+        params = [_tsquery(tokens)]
+    else:
+        return [result.object_id for result in _fallback_search(tokens, kind, None)]
+    if kind:
+        sql += ' AND kind = %s'
+        params.append(kind)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_search(tokens, kind, limit):
+    results = []
+    if kind in (None, KIND_COURSE):
+        courses = Course.objects.all()
+        for token in tokens:
+            courses = courses.filter(title__icontains=token) | courses.filter(description__icontains=token)
+        results += [
+            SearchResult(KIND_COURSE, course.pk, course.pk, course.title, course.description[:200], 0)
+            for course in courses[:limit]
+        ]
+    if kind in (None, KIND_LESSON):
+        lessons = Lesson.objects.select_related('module')
+        for token in tokens:
+            lessons = lessons.filter(title__icontains=token) | lessons.filter(content__icontains=token)
+        results += [
+            SearchResult(KIND_LESSON, lesson.pk, lesson.module.course_id, lesson.title, lesson.content[:200], 0)
+            for lesson in lessons[:limit]
+        ]
+    return results[:limit]
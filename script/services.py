@@ -0,0 +1,208 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .caching import bump_catalog_version
+from .dashboard import invalidate_course_dashboards, invalidate_dashboard_summary
+from .models import Course, Enrollment, Lesson, LessonProgress
+
+_write_lock = threading.Lock()
+
+
+@contextmanager
+def serialized_writes():
+    """On SQLite, queue hot write transactions on a per-process lock
+
+    SQLite has a single writer, so threads wait here in order instead of
+    polling in its busy handler. Inside an outer transaction the write lock
+    may already be held and nothing is queued.
+    """
+    if connection.vendor != 'sqlite' or not settings.SQLITE_SERIALIZE_WRITES or connection.in_atomic_block:
+        yield
+        return
+    with _write_lock:
+        yield
+
+
+def enroll_user(user, course, lazy_progress=None):
+    """Enroll a user in a course in a single transaction"""
+    if lazy_progress is None:
+        lazy_progress = settings.LAZY_LESSON_PROGRESS
+
+    with transaction.atomic():
+        if lazy_progress:
+            lesson_ids = None
+            total_lessons = course.lesson_count
+        else:
+            lesson_ids = list(Lesson.objects.filter(module__course=course).values_list('id', flat=True))
+            total_lessons = len(lesson_ids)
+
+        enrollment, created = Enrollment.objects.get_or_create(
+            user=user,
+            course=course,
+            defaults={'total_lessons': total_lessons}
+        )
+
+        # In lazy mode progress rows are created when a lesson is first touched
+        if created and not lazy_progress:
+            LessonProgress.objects.bulk_create(
+                [LessonProgress(user=user, lesson_id=lesson_id) for lesson_id in lesson_ids],
+                batch_size=500,
+                ignore_conflicts=True,
+            )
+
+    return enrollment, created
+
+
+def increment_completed_lessons(user_id, course_id, count=1):
+    """Atomically add newly completed lessons to the user's enrollment counters"""
+    now = timezone.now()
+    enrollments = Enrollment.objects.filter(user_id=user_id, course_id=course_id)
+    enrollments.update(completed_lessons=F('completed_lessons') + count, updated_at=now)
+    enrollments.filter(
+        completed_at__isnull=True,
+        total_lessons__gt=0,
+        completed_lessons__gte=F('total_lessons'),
+    ).update(completed_at=now)
+    invalidate_dashboard_summary(user_id)
+
+
+def record_lesson_progress(user, lesson, progress_percentage, is_completed=False):
+    """Store a progress update and count the lesson the first time it is completed"""
+    with serialized_writes(), transaction.atomic():
+        progress, created = LessonProgress.objects.get_or_create(
+            user=user,
+            lesson=lesson,
+            defaults={'progress_percentage': progress_percentage}
+        )
+        now = timezone.now()
+        rows = LessonProgress.objects.filter(pk=progress.pk)
+        rows.update(progress_percentage=progress_percentage, updated_at=now)
+
+        # Only the update that flips is_completed bumps the counters
+        if is_completed and rows.filter(is_completed=False).update(
+            is_completed=True,
+            completed_at=now
+        ):
+            increment_completed_lessons(user.id, lesson.module.course_id)
+
+
+def completion_time(completed_at, completed_lessons, total_lessons, now):
+    """The completed_at an enrollment with these counters should have"""
+    if total_lessons > 0 and completed_lessons >= total_lessons:
+        return completed_at or now
+    return None
+
+
+def _recount_enrollments(enrollments):
+    # Completed lessons of each enrollment's own user and course, then completed_at to match
+    completed = LessonProgress.objects.filter(
+        user=OuterRef('user'),
+        lesson__module__course=OuterRef('course'),
+        is_completed=True,
+    ).order_by().values('user').annotate(n=Count('id')).values('n')
+    now = timezone.now()
+    enrollments.update(completed_lessons=Coalesce(Subquery(completed, output_field=IntegerField()), 0), updated_at=now)
+    # The same rule as completion_time, in SQL
+    enrollments.update(completed_at=Case(
+        When(total_lessons__gt=0, completed_lessons__gte=F('total_lessons'), then=Coalesce('completed_at', Value(now))),
+        default=None,
+    ))
+
+
+def refresh_lesson_counts(course_id):
+    """Recount the lessons of a course and store the total on the course and its enrollments
+
+    Completed lessons are recounted too, so enrollments finish or reopen as
+    lessons are added to or removed from the course.
+    """
+    lesson_count = Lesson.objects.filter(module__course_id=course_id).count()
+    Course.objects.filter(pk=course_id).update(lesson_count=lesson_count)
+    enrollments = Enrollment.objects.filter(course_id=course_id)
+    enrollments.update(total_lessons=lesson_count)
+    _recount_enrollments(enrollments)
+    # Catalog cards and dashboards show the lesson count
+    bump_catalog_version()
+    invalidate_course_dashboards(course_id)
+
+
+def upsert_lesson_progress(rows, batch_size=500):
+    """Insert or advance LessonProgress rows in a single statement per batch
+
+    rows is an iterable of (user_id, lesson_id, progress_percentage, is_completed).
+    Progress only moves forward and completed_at is set the first time only.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+
+    meta = LessonProgress._meta
+    table = connection.ops.quote_name(meta.db_table)
+    greatest = 'GREATEST' if connection.vendor == 'postgresql' else 'MAX'
+    now = timezone.now()
+
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(batch))
+        params = []
+        for user_id, lesson_id, progress_percentage, is_completed in batch:
+            params.extend([user_id, lesson_id, progress_percentage, is_completed, now if is_completed else None, now])
+
+        sql = (
+            f'INSERT INTO {table} (user_id, lesson_id, progress_percentage, is_completed, completed_at, updated_at) '
+            f'VALUES {placeholders} '
+            f'ON CONFLICT (user_id, lesson_id) DO UPDATE SET '
+            f'progress_percentage = {greatest}({table}.progress_percentage, excluded.progress_percentage), '
+            f'is_completed = ({table}.is_completed OR excluded.is_completed), '
+            f'completed_at = COALESCE({table}.completed_at, excluded.completed_at), '
+            f'updated_at = excluded.updated_at'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+
+def recount_completed_lessons(user_id, course_ids):
+    """Recount completed lessons for a user's enrollments in the given courses"""
+    _recount_enrollments(Enrollment.objects.filter(user_id=user_id, course_id__in=course_ids))
+    invalidate_dashboard_summary(user_id)
+
+
+def apply_progress_batch(user_id, updates):
+    """Apply many (lesson_id, progress_percentage, is_completed) updates for one user
+
+    Returns (applied, missing): how many distinct lessons were written, and
+    the ids of lessons that do not exist and were skipped.
+    """
+    # Coalesce repeated lessons within the batch
+    merged = {}
+    for lesson_id, progress_percentage, is_completed in updates:
+        previous = merged.get(lesson_id, (0, False))
+        merged[lesson_id] = (max(previous[0], progress_percentage), previous[1] or is_completed)
+
+    course_ids = dict(
+        Lesson.objects.filter(id__in=merged).values_list('id', 'module__course_id')
+    )
+    missing = [lesson_id for lesson_id in merged if lesson_id not in course_ids]
+
+    with serialized_writes(), transaction.atomic():
+        upsert_lesson_progress(
+            (user_id, lesson_id, progress_percentage, is_completed)
+            for lesson_id, (progress_percentage, is_completed) in merged.items()
+            if lesson_id in course_ids
+        )
+
+        # Counters are recounted rather than incremented so concurrent batches cannot drift
+        completed_courses = {
+            course_ids[lesson_id]
+            for lesson_id, (_, is_completed) in merged.items()
+            if is_completed and lesson_id in course_ids
+        }
+        if completed_courses:
+            recount_completed_lessons(user_id, completed_courses)
+
+    return len(merged) - len(missing), missing
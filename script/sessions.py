@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+
+
+class LocalSessionTier:
+    """Small per-process LRU of recently loaded sessions with a short TTL
+
+    Other processes learn about a changed session through the shared cache,
+    so a stale local copy lives at most SESSION_LOCAL_CACHE_TTL seconds.
+    """
+
+    def __init__(self, max_entries=10000):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.max_entries = max_entries
+
+    def get(self, session_key):
+        with self._lock:
+            entry = self._entries.get(session_key)
+            if entry is None:
+                return None
+            expires, data = entry
+            if expires < time.monotonic():
+                del self._entries[session_key]
+                return None
+            self._entries.move_to_end(session_key)
+            return dict(data)
+
+    def set(self, session_key, data):
+        ttl = settings.SESSION_LOCAL_CACHE_TTL
+        if not ttl or not session_key:
+            return
+        with self._lock:
+            self._entries[session_key] = (time.monotonic() + ttl, dict(data))
+            self._entries.move_to_end(session_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, session_key):
+        with self._lock:
+            self._entries.pop(session_key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_sessions = LocalSessionTier()
+
+
+class SessionStore(cached_db.SessionStore):
+    """cached_db sessions with a process-local tier in front of the shared cache"""
+
+    def load(self):
+        data = local_sessions.get(self.session_key) if self.session_key else None
+        if data is None:
+            data = super().load()
+            if data:
+                local_sessions.set(self.session_key, data)
+        return data
+
+    async def aload(self):
+        data = local_sessions.get(self.session_key) if self.session_key else None
+        if data is None:
+            data = await super().aload()
+            if data:
+                local_sessions.set(self.session_key, data)
+        return data
+
+    def save(self, must_create=False):
+        super().save(must_create)
+        local_sessions.set(self.session_key, self._session)
+
+    async def asave(self, must_create=False):
+        await super().asave(must_create)
+        local_sessions.set(self.session_key, self._session)
+
+    def delete(self, session_key=None):
+        local_sessions.delete(session_key or self.session_key)
+        super().delete(session_key)
+
+    async def adelete(self, session_key=None):
+        local_sessions.delete(session_key or self.session_key)
+        await super().adelete(session_key)
@@ -0,0 +1,140 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .auth import invalidate_hub_user
+from .caching import bump_catalog_version
+from .dashboard import invalidate_dashboard_summary
+from .images import delete_variants, schedule_image_variants
+from .models import Course, Enrollment, Lesson, LessonProgress, Module, User
+from .outline import invalidate_course_outline
+from .search import KIND_COURSE, KIND_LESSON, index_course, index_lesson, reindex_lessons, remove_document
+from .services import refresh_lesson_counts
+
+
+@receiver(pre_save, sender=Module)
+def remember_module_course(sender, instance, **kwargs):
+    # A module moved to another course changes the outline of both courses
+    instance._previous_course_id = None
+    if instance.pk:
+        instance._previous_course_id = Module.objects.filter(pk=instance.pk).values_list(
+            'course_id', flat=True
+        ).first()
+
+
+@receiver(pre_save, sender=Course)
+def remember_course_image(sender, instance, **kwargs):
+    instance._previous_image = None
+    if instance.pk:
+        instance._previous_image = Course.objects.filter(pk=instance.pk).values_list('image', flat=True).first()
+
+
+@receiver(pre_save, sender=Lesson)
+def remember_lesson_course(sender, instance, **kwargs):
+    instance._previous_course_id = None
+    if instance.pk:
+        instance._previous_course_id = Lesson.objects.filter(pk=instance.pk).values_list(
+            'module__course_id', flat=True
+        ).first()
+
+
+def _lesson_course_id(lesson):
+    return Module.objects.filter(pk=lesson.module_id).values_list('course_id', flat=True).first()
+
+
+@receiver(post_save, sender=Module)
+def module_saved(sender, instance, **kwargs):
+    invalidate_course_outline(instance.course_id)
+    previous = getattr(instance, '_previous_course_id', None)
+    if previous and previous != instance.course_id:
+        invalidate_course_outline(previous)
+        refresh_lesson_counts(previous)
+        refresh_lesson_counts(instance.course_id)
+        reindex_lessons(instance.lessons.all())
+
+
+@receiver(post_delete, sender=Module)
+def module_deleted(sender, instance, **kwargs):
+    invalidate_course_outline(instance.course_id)
+
+
+@receiver(post_save, sender=Lesson)
+def lesson_saved(sender, instance, created, **kwargs):
+    course_id = _lesson_course_id(instance)
+    if course_id:
+        invalidate_course_outline(course_id)
+        index_lesson(instance, course_id)
+        if created:
+            refresh_lesson_counts(course_id)
+    previous = getattr(instance, '_previous_course_id', None)
+    if previous and previous != course_id:
+        invalidate_course_outline(previous)
+        refresh_lesson_counts(previous)
+        if course_id:
+            refresh_lesson_counts(course_id)
+
+
+class _LessonCountRefresh:
+    """On-commit callback that refreshes the lesson counts of each course once"""
+
+    def __init__(self):
+        self.course_ids = set()
+
+    def __call__(self):
+        # Close the batch so a later delete schedules a new one
+        course_ids, self.course_ids = self.course_ids, None
+        for course_id in course_ids:
+            with transaction.atomic():
+                refresh_lesson_counts(course_id)
+
+
+def _refresh_lesson_counts_on_commit(course_id):
+    # A cascade or bulk delete removes many lessons in one transaction; share one
+    # pending callback so each course is recounted once, not once per lesson
+    connection = transaction.get_connection()
+    for _, callback, _ in connection.run_on_commit:
+        if isinstance(callback, _LessonCountRefresh) and callback.course_ids is not None:
+            callback.course_ids.add(course_id)
+            return
+    callback = _LessonCountRefresh()
+    callback.course_ids.add(course_id)
+    transaction.on_commit(callback)
+
+
+@receiver(post_delete, sender=Lesson)
+def lesson_deleted(sender, instance, **kwargs):
+    remove_document(KIND_LESSON, instance.pk)
+    course_id = _lesson_course_id(instance)
+    if course_id:
+        invalidate_course_outline(course_id)
+        _refresh_lesson_counts_on_commit(course_id)
+
+
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance, **kwargs):
+    index_course(instance)
+    if (instance.image.name or '') != (getattr(instance, '_previous_image', None) or ''):
+        schedule_image_variants(instance.pk)
+    bump_catalog_version()
+
+
+@receiver(post_delete, sender=Course)
+def course_deleted(sender, instance, **kwargs):
+    invalidate_course_outline(instance.pk)
+    remove_document(KIND_COURSE, instance.pk)
+    transaction.on_commit(lambda: delete_variants(instance.image_variants))
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate_hub_user(instance.pk)
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_save, sender=LessonProgress)
+@receiver(post_delete, sender=LessonProgress)
+def enrollment_changed(sender, instance, **kwargs):
+    invalidate_dashboard_summary(instance.user_id)
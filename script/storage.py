@@ -0,0 +1,14 @@
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class HubStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """Content-hashed static files with gzip and brotli variants written by collectstatic
+
+    Until collectstatic has written a manifest (a fresh checkout, the test
+    runner) URLs fall back to the plain file names instead of raising.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
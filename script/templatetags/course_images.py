@@ -0,0 +1,38 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+register = template.Library()
+
+DEFAULT_SIZES = '(min-width: 992px) 33vw, (min-width: 768px) 50vw, 100vw'
+
+
+def _srcset(variants, image_format):
+    return ', '.join(
+        f"{default_storage.url(variant['name'])} {variant['width']}w"
+        for variant in variants if variant['format'] == image_format
+    )
+
+
+@register.simple_tag
+def course_image(course, sizes=DEFAULT_SIZES, css_class='', style='', loading='lazy'):
+    """Render a course image as a <picture> with WebP and JPEG srcsets when derivatives exist"""
+    if not course.image:
+        return ''
+    variants = course.image_variants.get('variants', [])
+    if course.image_variants.get('source') != course.image.name or not variants:
+        return format_html(
+            '<img src="{}" class="{}" style="{}" alt="{}" loading="{}">',
+            course.image.url, css_class, style, course.title, loading,
+        )
+
+    fallback = max((v for v in variants if v['format'] == 'jpg'), key=lambda v: v['width'])
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" class="{}" style="{}" alt="{}" loading="{}" decoding="async">'
+        '</picture>',
+        _srcset(variants, 'webp'), sizes,
+        default_storage.url(fallback['name']), _srcset(variants, 'jpg'), sizes,
+        css_class, style, course.title, loading,
+    )
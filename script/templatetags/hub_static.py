@@ -0,0 +1,22 @@
+from functools import lru_cache
+
+from django import template
+from django.contrib.staticfiles import finders
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+
+@lru_cache(maxsize=None)
+def _read_static(path):
+    absolute_path = finders.find(path)
+    if absolute_path is None:
+        raise template.TemplateSyntaxError(f'Static file {path!r} not found')
+    with open(absolute_path, encoding='utf-8') as f:
+        return f.read()
+
+
+@register.simple_tag
+def inline_static(path):
+    """Return the contents of a static file, e.g. critical CSS for a <style> block"""
+    return mark_safe(_read_static(path))
@@ -1,10 +1,76 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User as StaffUserModel
+from django.contrib.messages import get_messages
+from django.contrib.sessions.backends.db import SessionStore as DatabaseSessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.db import DataError, connection, connections
+from django.db.models import QuerySet
+from django.http import HttpResponse, QueryDict
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, TransactionTestCase
 from django.test import Client
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from .models import User, Contact
+from django.utils import timezone
+from PIL import Image
+from . import urls
+from .models import User, Contact, Course, Module, Lesson, Enrollment, LessonProgress
+from .auth import get_hub_user
+from .middleware import HubWhiteNoiseMiddleware, QueryBudgetMiddleware
+from .caching import cache_catalog_page, get_catalog_version
+from .course_io import CourseImportError, export_courses, import_course, import_courses, iter_documents, write_json, write_jsonl
+from .contact_queue import DEAD_LETTER_NAME, drain_contact_queue, enqueue_contact
+from .dashboard import get_dashboard_summary
+from .exports import export_rows, export_until
+from .hashing import HashingBusy, HashingPool, hashing_pool
+from .images import refresh_course_image_variants
+from .instrumentation import collect_metrics, fingerprint
+from .oauth import oauth_http
+from .outline import build_course_outline, get_course_outline
+from .progress_buffer import ProgressBuffer, progress_buffer
+from .routers import PIN_COOKIE, ReplicaRouter
+from .search import KIND_COURSE, KIND_LESSON, rebuild_index, search, search_ids
+from .sessions import local_sessions
+from .services import apply_progress_batch, enroll_user, record_lesson_progress
+
+# Tests get a private in-memory cache instead of the shared on-disk one
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class HubTestCase(TestCase):
+    pass
+
+
+@override_settings(CACHES=TEST_CACHES)
+class HubTransactionTestCase(TransactionTestCase):
+    pass
+
 
 # Create your tests here.
-class UserModelTest(TestCase):
+class UserModelTest(HubTestCase):
     def setUp(self):
         self.user = User.objects.create(
             firstname="John",
@@ -23,7 +89,7 @@ class UserModelTest(TestCase):
     def test_user_str_representation(self):
         self.assertEqual(str(self.user), "John Doe")
 
-class ContactModelTest(TestCase):
+class ContactModelTest(HubTestCase):
     def setUp(self):
         self.contact = Contact.objects.create(
             name="Jane Smith",
@@ -41,7 +107,7 @@ class ContactModelTest(TestCase):
     def test_contact_str_representation(self):
         self.assertEqual(str(self.contact), "Jane Smith - Test Message")
 
-class RegistrationViewTest(TestCase):
+class RegistrationViewTest(HubTestCase):
     def setUp(self):
         self.client = Client()
 
@@ -62,7 +128,7 @@ class RegistrationViewTest(TestCase):
         self.assertEqual(response.status_code, 302)  # Redirect after successful registration
         self.assertTrue(User.objects.filter(email='test@example.com').exists())
 
-class LoginViewTest(TestCase):
+class LoginViewTest(HubTestCase):
     def setUp(self):
         self.client = Client()
         self.user = User.objects.create(
@@ -86,7 +152,7 @@ class LoginViewTest(TestCase):
         response = self.client.post(reverse('login'), data)
         self.assertEqual(response.status_code, 302)  # Redirect after successful login
 
-class ContactViewTest(TestCase):
+class ContactViewTest(HubTestCase):
     def setUp(self):
         self.client = Client()
 
@@ -95,6 +161,7 @@ class ContactViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'contact.html')
 
+    @override_settings(CONTACT_SPOOL_DIR=tempfile.mkdtemp(), CONTACT_DRAIN_INTERVAL=0)
     def test_contact_form_submission(self):
         data = {
             'name': 'Test User',
@@ -104,4 +171,1678 @@ class ContactViewTest(TestCase):
         }
         response = self.client.post(reverse('contact'), data)
         self.assertEqual(response.status_code, 302)  # Redirect after successful submission
+        drain_contact_queue()
         self.assertTrue(Contact.objects.filter(email='test@example.com').exists())
+
+class EnrollmentServiceTest(HubTestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create(
+            firstname="Test",
+            lastname="Learner",
+            email="learner@example.com"
+        )
+        self.course = Course.objects.create(
+            title="JavaScript Fundamentals",
+            description="Learn the basics.",
+            difficulty="junior"
+        )
+        module = Module.objects.create(course=self.course, title="Basics", description="Intro", order=1)
+        for i in range(3):
+            Lesson.objects.create(module=module, title=f"Lesson {i}", content="Content", order=i)
+
+    def test_enroll_creates_progress_rows(self):
+        enrollment, created = enroll_user(self.user, self.course, lazy_progress=False)
+        self.assertTrue(created)
+        self.assertEqual(LessonProgress.objects.filter(user=self.user).count(), 3)
+
+    def test_enroll_is_idempotent(self):
+        enroll_user(self.user, self.course, lazy_progress=False)
+        enrollment, created = enroll_user(self.user, self.course, lazy_progress=False)
+        self.assertFalse(created)
+        self.assertEqual(Enrollment.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(LessonProgress.objects.filter(user=self.user).count(), 3)
+
+    def test_lazy_enroll_skips_progress_rows(self):
+        enroll_user(self.user, self.course, lazy_progress=True)
+        self.assertTrue(Enrollment.objects.filter(user=self.user, course=self.course).exists())
+        self.assertFalse(LessonProgress.objects.filter(user=self.user).exists())
+
+    @override_settings(LAZY_LESSON_PROGRESS=True)
+    def test_course_detail_with_lazy_progress(self):
+        session = self.client.session
+        session['user_id'] = self.user.id
+        session.save()
+        self.client.get(reverse('enroll_course', args=[self.course.id]), secure=True)
+        response = self.client.get(reverse('course_detail', args=[self.course.id]), secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['progress_percentage'], 0)
+
+class CourseOutlineTest(HubTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create(
+            firstname="Test",
+            lastname="Learner",
+            email="learner@example.com"
+        )
+        self.course = Course.objects.create(
+            title="Advanced JavaScript Patterns",
+            description="Patterns.",
+            difficulty="advanced"
+        )
+        second = Module.objects.create(course=self.course, title="Second", description="", order=2)
+        first = Module.objects.create(course=self.course, title="First", description="", order=1)
+        self.lessons = [
+            Lesson.objects.create(module=first, title="A", content="", order=1),
+            Lesson.objects.create(module=first, title="B", content="", order=2),
+            Lesson.objects.create(module=second, title="C", content="", order=1),
+        ]
+
+    def test_outline_orders_lessons_by_module_then_lesson(self):
+        outline = get_course_outline(self.course.id)
+        self.assertEqual(outline.lesson_ids, [lesson.id for lesson in self.lessons])
+        middle = self.lessons[1].id
+        self.assertEqual(outline.position(middle), 1)
+        self.assertEqual(outline.prev_id(middle), self.lessons[0].id)
+        self.assertEqual(outline.next_id(middle), self.lessons[2].id)
+        self.assertIsNone(outline.prev_id(self.lessons[0].id))
+        self.assertIsNone(outline.next_id(self.lessons[2].id))
+
+    def test_outline_is_cached(self):
+        get_course_outline(self.course.id)
+        with self.assertNumQueries(0):
+            get_course_outline(self.course.id)
+
+    def test_outline_invalidated_on_reorder_and_delete(self):
+        get_course_outline(self.course.id)
+        first = self.lessons[0]
+        first.order = 3
+        first.save()
+        outline = get_course_outline(self.course.id)
+        self.assertEqual(outline.lesson_ids, [self.lessons[1].id, first.id, self.lessons[2].id])
+        self.lessons[2].delete()
+        self.assertEqual(len(get_course_outline(self.course.id)), 2)
+
+    def test_lesson_detail_navigation(self):
+        session = self.client.session
+        session['user_id'] = self.user.id
+        session.save()
+        enroll_user(self.user, self.course)
+        lesson = self.lessons[1]
+        response = self.client.get(reverse('lesson_detail', args=[self.course.id, lesson.id]), secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['current_index'], 1)
+        self.assertEqual(response.context['total_lessons'], 3)
+        self.assertEqual(response.context['prev_lesson_id'], self.lessons[0].id)
+        self.assertEqual(response.context['next_lesson_id'], self.lessons[2].id)
+
+class EnrollmentCounterTest(HubTestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            firstname="Test",
+            lastname="Learner",
+            email="learner@example.com"
+        )
+        self.course = Course.objects.create(
+            title="Understanding JavaScript Closures",
+            description="Closures.",
+            difficulty="intermediate"
+        )
+        self.module = Module.objects.create(course=self.course, title="Scope", description="", order=1)
+        self.lessons = [
+            Lesson.objects.create(module=self.module, title=f"Lesson {i}", content="", order=i)
+            for i in range(4)
+        ]
+        self.enrollment, _ = enroll_user(self.user, self.course)
+
+    def test_enrollment_starts_with_lesson_total(self):
+        self.assertEqual(self.enrollment.total_lessons, 4)
+        self.assertEqual(self.enrollment.completed_lessons, 0)
+
+    def test_completion_increments_counter_once(self):
+        record_lesson_progress(self.user, self.lessons[0], 100, is_completed=True)
+        record_lesson_progress(self.user, self.lessons[0], 100, is_completed=True)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.completed_lessons, 1)
+        self.assertEqual(self.enrollment.progress_percentage, 25)
+
+    def test_completing_every_lesson_completes_enrollment(self):
+        for lesson in self.lessons:
+            record_lesson_progress(self.user, lesson, 100, is_completed=True)
+        self.enrollment.refresh_from_db()
+        self.assertIsNotNone(self.enrollment.completed_at)
+
+    def test_adding_and_removing_lessons_updates_total(self):
+        Lesson.objects.create(module=self.module, title="Extra", content="", order=9)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.total_lessons, 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lessons[0].delete()
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.total_lessons, 4)
+
+    def test_lesson_changes_reopen_and_finish_enrollment(self):
+        for lesson in self.lessons:
+            record_lesson_progress(self.user, lesson, 100, is_completed=True)
+        extra = Lesson.objects.create(module=self.module, title="Extra", content="", order=9)
+        self.enrollment.refresh_from_db()
+        self.assertEqual((self.enrollment.completed_lessons, self.enrollment.total_lessons), (4, 5))
+        self.assertIsNone(self.enrollment.completed_at)
+
+        # Removing a completed lesson takes it off the completed count as well
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lessons[0].delete()
+        self.enrollment.refresh_from_db()
+        self.assertEqual((self.enrollment.completed_lessons, self.enrollment.total_lessons), (3, 4))
+        self.assertIsNone(self.enrollment.completed_at)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            extra.delete()
+        self.enrollment.refresh_from_db()
+        self.assertEqual((self.enrollment.completed_lessons, self.enrollment.total_lessons), (3, 3))
+        self.assertIsNotNone(self.enrollment.completed_at)
+
+    def test_cascade_delete_refreshes_each_course_once(self):
+        with mock.patch('script.signals.refresh_lesson_counts') as refresh, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.module.delete()
+        refresh.assert_called_once_with(self.course.pk)
+
+    def test_reconcile_repairs_drift(self):
+        record_lesson_progress(self.user, self.lessons[0], 100, is_completed=True)
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(completed_lessons=3, total_lessons=1)
+        out = StringIO()
+        call_command('reconcile_progress', chunk_size=1, stdout=out)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.completed_lessons, 1)
+        self.assertEqual(self.enrollment.total_lessons, 4)
+        self.assertIn('Repaired 1', out.getvalue())
+
+    def test_reconcile_repairs_completed_at(self):
+        for lesson in self.lessons:
+            record_lesson_progress(self.user, lesson, 100, is_completed=True)
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(completed_at=None)
+        call_command('reconcile_progress', stdout=StringIO())
+        self.enrollment.refresh_from_db()
+        self.assertIsNotNone(self.enrollment.completed_at)
+
+        LessonProgress.objects.filter(lesson=self.lessons[0]).update(is_completed=False)
+        out = StringIO()
+        call_command('reconcile_progress', stdout=out)
+        self.enrollment.refresh_from_db()
+        self.assertIsNone(self.enrollment.completed_at)
+        self.assertIn('Repaired 1', out.getvalue())
+
+class CourseLessonCountTest(HubTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.courses = []
+        for i in range(3):
+            course = Course.objects.create(title=f"Course {i}", description="", difficulty="junior")
+            for m in range(2):
+                module = Module.objects.create(course=course, title=f"Module {m}", description="", order=m)
+                for l in range(i + 1):
+                    Lesson.objects.create(module=module, title="Lesson", content="", duration_minutes=10, order=l)
+            self.courses.append(course)
+
+    def test_lesson_count_kept_in_sync(self):
+        course = self.courses[0]
+        course.refresh_from_db()
+        self.assertEqual(course.get_total_lessons(), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            course.modules.first().delete()
+        course.refresh_from_db()
+        self.assertEqual(course.get_total_lessons(), 1)
+
+    def test_with_lesson_stats(self):
+        with self.assertNumQueries(1):
+            stats = {
+                course.id: (course.total_lessons, course.total_duration_minutes)
+                for course in Course.objects.with_lesson_stats()
+            }
+        self.assertEqual(stats[self.courses[2].id], (6, 60))
+
+    def test_catalog_renders_counts_with_constant_queries(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('junior_courses'), secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Course 2")
+
+class ProgressBatchTest(HubTestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create(
+            firstname="Test",
+            lastname="Learner",
+            email="learner@example.com"
+        )
+        self.course = Course.objects.create(title="React Masterclass", description="", difficulty="advanced")
+        module = Module.objects.create(course=self.course, title="Hooks", description="", order=1)
+        self.lessons = [
+            Lesson.objects.create(module=module, title=f"Lesson {i}", content="", order=i)
+            for i in range(3)
+        ]
+        self.enrollment, _ = enroll_user(self.user, self.course, lazy_progress=True)
+
+    def test_batch_upserts_and_only_moves_forward(self):
+        apply_progress_batch(self.user.id, [(self.lessons[0].id, 60, False), (self.lessons[1].id, 20, False)])
+        apply_progress_batch(self.user.id, [(self.lessons[0].id, 40, False), (self.lessons[1].id, 30, False)])
+        progress = dict(LessonProgress.objects.filter(user=self.user).values_list('lesson_id', 'progress_percentage'))
+        self.assertEqual(progress, {self.lessons[0].id: 60, self.lessons[1].id: 30})
+
+    def test_completion_is_recorded_once(self):
+        apply_progress_batch(self.user.id, [(self.lessons[0].id, 100, True)])
+        first = LessonProgress.objects.get(user=self.user, lesson=self.lessons[0]).completed_at
+        apply_progress_batch(self.user.id, [(self.lessons[0].id, 100, True)])
+        progress = LessonProgress.objects.get(user=self.user, lesson=self.lessons[0])
+        self.assertTrue(progress.is_completed)
+        self.assertEqual(progress.completed_at, first)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.completed_lessons, 1)
+
+    def test_percentage_batch_query_count(self):
+        updates = [(lesson.id, 50, False) for lesson in self.lessons]
+        # Lesson lookup and one upsert, plus the savepoint pair of the transaction
+        with self.assertNumQueries(4):
+            apply_progress_batch(self.user.id, updates)
+
+    def test_batch_endpoint(self):
+        session = self.client.session
+        session['user_id'] = self.user.id
+        session.save()
+        payload = {'updates': [
+            {'lesson_id': self.lessons[0].id, 'progress_percentage': 100, 'is_completed': True},
+            {'lesson_id': 999999, 'progress_percentage': 10},
+        ]}
+        response = self.client.post(
+            reverse('update_lesson_progress_batch'),
+            data=json.dumps(payload),
+            content_type='application/json',
+            secure=True
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'success': True, 'applied': 1, 'missing': [999999]})
+
+    def test_batch_endpoint_parses_string_flags_and_counts_lessons(self):
+        session = self.client.session
+        session['user_id'] = self.user.id
+        session.save()
+        payload = [
+            {'lesson_id': self.lessons[0].id, 'progress_percentage': 40, 'is_completed': 'false'},
+            {'lesson_id': self.lessons[0].id, 'progress_percentage': 50, 'is_completed': '0'},
+            {'lesson_id': self.lessons[1].id, 'progress_percentage': 100, 'is_completed': 'true'},
+        ]
+        response = self.client.post(
+            reverse('update_lesson_progress_batch'), data=json.dumps(payload),
+            content_type='application/json', secure=True
+        )
+        self.assertEqual(response.json(), {'success': True, 'applied': 2, 'missing': []})
+        self.assertEqual(
+            list(LessonProgress.objects.filter(user=self.user, is_completed=True).values_list('lesson_id', flat=True)),
+            [self.lessons[1].id],
+        )
+
+    def test_batch_endpoint_requires_login(self):
+        response = self.client.post(reverse('update_lesson_progress_batch'), data='[]',
+                                    content_type='application/json', secure=True)
+        self.assertEqual(response.status_code, 401)
+
+@override_settings(PROGRESS_WRITE_BEHIND=True, PROGRESS_FLUSH_INTERVAL=3600, PROGRESS_BUFFER_MAX=1000)
+class ProgressWriteBehindTest(HubTestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create(
+            firstname="Test",
+            lastname="Learner",
+            email="learner@example.com"
+        )
+        course = Course.objects.create(title="Node.js Crash Course", description="", difficulty="intermediate")
+        module = Module.objects.create(course=course, title="Streams", description="", order=1)
+        self.lesson = Lesson.objects.create(module=module, title="Readable", content="", order=1)
+        self.enrollment, _ = enroll_user(self.user, course, lazy_progress=True)
+        session = self.client.session
+        session['user_id'] = self.user.id
+        session.save()
+
+    def tearDown(self):
+        progress_buffer.flush()
+
+    def test_buffer_coalesces_updates(self):
+        buffer = ProgressBuffer()
+        buffer.add(self.user.id, self.lesson.id, 30)
+        buffer.add(self.user.id, self.lesson.id, 70)
+        buffer.add(self.user.id, self.lesson.id, 50)
+        self.assertEqual(len(buffer), 1)
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(LessonProgress.objects.get(user=self.user, lesson=self.lesson).progress_percentage, 70)
+
+    def test_percentage_updates_are_buffered(self):
+        url = reverse('update_lesson_progress', args=[self.lesson.id])
+        for percentage in (10, 20, 30):
+            response = self.client.post(url, {'progress_percentage': percentage}, secure=True)
+            self.assertEqual(response.status_code, 200)
+        self.assertFalse(LessonProgress.objects.filter(user=self.user).exists())
+        self.assertEqual(progress_buffer.pending_percentage(self.user.id, self.lesson.id), 30)
+        progress_buffer.flush()
+        self.assertEqual(LessonProgress.objects.get(user=self.user, lesson=self.lesson).progress_percentage, 30)
+
+    def test_completion_writes_through(self):
+        url = reverse('update_lesson_progress', args=[self.lesson.id])
+        self.client.post(url, {'progress_percentage': 100, 'is_completed': 'true'}, secure=True)
+        self.assertTrue(LessonProgress.objects.get(user=self.user, lesson=self.lesson).is_completed)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.completed_lessons, 1)
+
+class HubUserTest(HubTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create(
+            firstname="Test",
+            lastname="Learner",
+            email="learner@example.com"
+        )
+
+    def login(self):
+        session = self.client.session
+        session['user_id'] = self.user.id
+        session.save()
+
+    def test_anonymous_user_is_redirected(self):
+        response = self.client.get(reverse('dashboard'), secure=True)
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+
+    def test_json_endpoint_returns_401(self):
+        response = self.client.post(reverse('update_lesson_progress', args=[1]), secure=True)
+        self.assertEqual(response.status_code, 401)
+
+    def test_user_loaded_once_per_request(self):
+        request = RequestFactory().get('/')
+        request.session = {'user_id': self.user.id}
+        with override_settings(HUB_USER_CACHE_TTL=0):
+            with self.assertNumQueries(1):
+                self.assertEqual(get_hub_user(request), self.user)
+                self.assertEqual(get_hub_user(request), self.user)
+
+    def test_cached_user_skips_query(self):
+        self.login()
+        self.client.get(reverse('my_courses'), secure=True)
+        request = RequestFactory().get('/')
+        request.session = {'user_id': self.user.id}
+        with self.assertNumQueries(0):
+            self.assertEqual(get_hub_user(request).email, "learner@example.com")
+
+    def test_cache_invalidated_on_save(self):
+        request = RequestFactory().get('/')
+        request.session = {'user_id': self.user.id}
+        get_hub_user(request)
+        self.user.firstname = "Renamed"
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.save()
+        # Until the save commits, the cache still points at the committed row
+        self.assertIsNotNone(cache.get(f'hub_user:{self.user.id}:version'))
+        for callback in callbacks:
+            callback()
+        request = RequestFactory().get('/')
+        request.session = {'user_id': self.user.id}
+        self.assertEqual(get_hub_user(request).firstname, "Renamed")
+
+    def test_cache_holds_no_password_and_follows_updated_at(self):
+        request = RequestFactory().get('/')
+        request.session = {'user_id': self.user.id}
+        get_hub_user(request)
+        version = cache.get(f'hub_user:{self.user.id}:version')
+        self.assertEqual(
+            set(cache.get(f'hub_user:{self.user.id}:{version}')), {'id', 'firstname', 'lastname', 'email', 'updated_at'}
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        request = RequestFactory().get('/')
+        request.session = {'user_id': self.user.id}
+        get_hub_user(request)
+        self.assertNotEqual(cache.get(f'hub_user:{self.user.id}:version'), version)
+
+    def test_deleted_user_gets_404(self):
+        self.login()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        response = self.client.get(reverse('dashboard'), secure=True)
+        self.assertEqual(response.status_code, 404)
+
+class CatalogPageCacheTest(HubTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        Course.objects.create(title="TypeScript Essentials", description="Types.", difficulty="junior")
+
+    def test_anonymous_page_served_from_cache(self):
+        self.client.get(reverse('junior_courses'), secure=True)
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('junior_courses'), secure=True)
+        self.assertContains(response, "TypeScript Essentials")
+
+    def test_course_save_invalidates_page(self):
+        self.client.get(reverse('home'), secure=True)
+        Course.objects.create(title="ES2023 New Features", description="New.", difficulty="junior")
+        response = self.client.get(reverse('home'), secure=True)
+        self.assertContains(response, "ES2023 New Features")
+
+    def test_pages_vary_on_navbar_state(self):
+        self.client.get(reverse('home'), secure=True)
+        user = User.objects.create(firstname="Ada", lastname="Lovelace", email="ada@example.com")
+        session = self.client.session
+        session['user_id'] = user.id
+        session['user_name'] = "Ada Lovelace"
+        session.save()
+        response = self.client.get(reverse('home'), secure=True)
+        self.assertContains(response, "Ada Lovelace")
+
+    def test_waits_for_rebuild_in_progress(self):
+        calls = []
+
+        @cache_catalog_page
+        def view(request):
+            calls.append(1)
+            return HttpResponse("page")
+
+        request = RequestFactory().get('/catalog/')
+        request.session = {}
+        get_catalog_version()
+
+        # Another worker holds the rebuild lock and stores the page while we wait
+        def other_worker_finishes(key):
+            cache.set(key, (b"rebuilt", 'text/html'), 60)
+            return cache.get(key)
+
+        with mock.patch.object(cache, 'add', return_value=False), \
+                mock.patch('script.caching._wait_for', side_effect=other_worker_finishes):
+            response = view(request)
+        self.assertEqual(response.content, b"rebuilt")
+        self.assertEqual(calls, [])
+
+class PrerenderedPagesTest(HubTestCase):
+    def setUp(self):
+        cache.clear()
+        self.root = tempfile.mkdtemp()
+        self.settings_override = override_settings(PRERENDER_ROOT=self.root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        call_command('prerender_pages', stdout=StringIO())
+        self.middleware = HubWhiteNoiseMiddleware(lambda request: HttpResponse("rendered by view"))
+
+    def test_anonymous_visitor_gets_prerendered_page(self):
+        request = RequestFactory().get(reverse('about'))
+        response = self.middleware(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"About", b"".join(response.streaming_content))
+        self.assertEqual(response['Cache-Control'], f'max-age={settings.PRERENDER_MAX_AGE}, public')
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_session_cookie_falls_through_to_view(self):
+        request = RequestFactory().get(reverse('about'))
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = 'abc'
+        response = self.middleware(request)
+        self.assertEqual(response.content, b"rendered by view")
+
+    def test_logged_in_render_is_cached(self):
+        user = User.objects.create(firstname="Ada", lastname="Lovelace", email="ada@example.com")
+        session = self.client.session
+        session['user_id'] = user.id
+        session['user_name'] = "Ada Lovelace"
+        session.save()
+        self.client.get(reverse('code_examples'), secure=True)
+        with self.assertNumQueries(0):  # the session comes from the cache too
+            response = self.client.get(reverse('code_examples'), secure=True)
+        self.assertContains(response, "Ada Lovelace")
+
+class CatalogTest(HubTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        for i in range(30):
+            Course.objects.create(
+                title=f"Course {i:02d}",
+                description="A course. " * 50,
+                difficulty=["junior", "intermediate", "advanced"][i % 3],
+                is_free=i % 2 == 0,
+                price=0 if i % 2 == 0 else 10 + i,
+                duration_hours=i,
+            )
+
+    def walk(self, url, params=None):
+        params = dict(params or {})
+        titles = []
+        while True:
+            response = self.client.get(url, params, secure=True)
+            self.assertEqual(response.status_code, 200)
+            titles.extend(course.title for course in response.context['courses'])
+            if not response.context['next_query']:
+                return titles
+            params = dict(QueryDict(response.context['next_query']).items())
+
+    def test_keyset_pagination_visits_every_course_once(self):
+        titles = self.walk(reverse('catalog'))
+        self.assertEqual(len(titles), 30)
+        self.assertEqual(len(set(titles)), 30)
+        self.assertEqual(titles[0], "Course 29")
+
+    def test_filters(self):
+        titles = self.walk(reverse('catalog'), {'difficulty': 'advanced', 'is_free': '0', 'max_price': '30'})
+        self.assertEqual(titles, ["Course 17", "Course 11", "Course 05"])
+
+    def test_non_finite_prices_are_ignored(self):
+        for value in ('NaN', 'sNaN', 'Infinity', '-inf', 'abc'):
+            titles = self.walk(reverse('catalog'), {'min_price': value, 'max_price': value})
+            self.assertEqual(len(titles), 30)
+
+    def test_difficulty_alias_paginates(self):
+        titles = self.walk(reverse('junior_courses'))
+        self.assertEqual(len(titles), 10)
+        cache.clear()
+        response = self.client.get(reverse('junior_courses'), secure=True)
+        self.assertTemplateUsed(response, 'junior_course.html')
+
+    def test_page_query_count_is_constant(self):
+        response = self.client.get(reverse('catalog'), secure=True)
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.client.get(reverse('catalog') + '?' + response.context['next_query'], secure=True)
+
+
+class SearchTest(HubTestCase):
+    def setUp(self):
+        self.closures = Course.objects.create(
+            title="Closures in Depth",
+            description="Scopes, lexical environments and closures explained.",
+            difficulty="intermediate",
+            duration_hours=3,
+        )
+        self.basics = Course.objects.create(
+            title="JavaScript Basics",
+            description="Variables, loops and a short note on closures.",
+            difficulty="junior",
+            duration_hours=2,
+        )
+        module = Module.objects.create(course=self.basics, title="Functions", description="", order=1)
+        self.lesson = Lesson.objects.create(
+            module=module, title="Callbacks", content="Passing functions around <script>alert(1)</script>", order=1
+        )
+
+    def test_title_matches_rank_first(self):
+        results = search("closures")
+        self.assertEqual([r.object_id for r in results[:2]], [self.closures.pk, self.basics.pk])
+        self.assertIn("<mark>closures</mark>", results[0].snippet)
+
+    def test_prefix_and_kind_filter(self):
+        self.assertEqual(search_ids("callb", KIND_LESSON), [self.lesson.pk])
+        self.assertEqual(search_ids("callb", KIND_COURSE), [])
+
+    def test_snippet_is_escaped(self):
+        snippet = search("passing", KIND_LESSON)[0].snippet
+        self.assertIn("&lt;script&gt;", snippet)
+        self.assertNotIn("<script>", snippet)
+
+    def test_index_follows_saves_and_deletes(self):
+        self.lesson.title = "Higher-order functions"
+        self.lesson.save()
+        self.assertEqual(search_ids("callbacks", KIND_LESSON), [])
+        self.assertEqual(search_ids("higher order", KIND_LESSON), [self.lesson.pk])
+        self.basics.delete()
+        self.assertEqual(search_ids("higher", KIND_LESSON), [])
+        self.assertEqual(search_ids("loops", KIND_COURSE), [])
+
+    def test_rebuild_index(self):
+        self.assertEqual(rebuild_index(), 3)
+        self.assertEqual(search_ids("lexical", KIND_COURSE), [self.closures.pk])
+
+    def test_search_view(self):
+        response = self.client.get(reverse('search'), {'q': 'callbacks'}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse('lesson_detail', args=[self.basics.pk, self.lesson.pk]))
+
+    def test_admin_search_uses_index(self):
+        from django.contrib.admin.sites import site
+        from django.contrib.auth.models import User as StaffUser
+        request = RequestFactory().get('/admin/script/course/')
+        request.user = StaffUser(is_staff=True, is_superuser=True)
+        queryset, may_have_duplicates = site._registry[Course].get_search_results(
+            request, Course.objects.all(), "lexical"
+        )
+        self.assertEqual(list(queryset), [self.closures])
+        self.assertFalse(may_have_duplicates)
+
+    def test_admin_search_is_not_capped(self):
+        from django.contrib.admin.sites import site
+        Course.objects.bulk_create(
+            Course(title=f"Lexical {i}", slug=f"lexical-{i}", description="", difficulty="junior") for i in range(1000)
+        )
+        rebuild_index()
+        self.assertEqual(len(search_ids("lexical", KIND_COURSE)), 1000)
+        queryset, _ = site._registry[Course].get_search_results(None, Course.objects.all(), "lexical")
+        self.assertEqual(queryset.count(), 1001)
+
+
+class DashboardSummaryTest(HubTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(firstname="Dash", lastname="Board", email="dash@example.com")
+        self.courses = []
+        for i in range(3):
+            course = Course.objects.create(
+                title=f"Course {i}", description="", difficulty="junior", duration_hours=1
+            )
+            module = Module.objects.create(course=course, title="Module", description="", order=1)
+            for j in range(2):
+                Lesson.objects.create(module=module, title=f"Lesson {i}.{j}", content="", order=j)
+            enroll_user(self.user, course)
+            self.courses.append(course)
+
+    def complete(self, course, count):
+        for lesson in Lesson.objects.filter(module__course=course).select_related('module')[:count]:
+            record_lesson_progress(self.user, lesson, 100, is_completed=True)
+
+    def test_summary_counts(self):
+        self.complete(self.courses[0], 2)
+        self.complete(self.courses[1], 1)
+        summary = get_dashboard_summary(self.user.id)
+        self.assertEqual(summary['total_courses'], 3)
+        self.assertEqual(summary['completed_courses'], 1)
+        self.assertEqual(summary['in_progress_courses'], 2)
+        self.assertEqual(summary['overall_progress'], 50)
+        self.assertEqual(len(summary['recent_progress']), 3)
+        self.assertEqual(summary['recent_progress'][0]['course_id'], self.courses[1].pk)
+
+    def test_summary_is_cached_until_progress_changes(self):
+        get_dashboard_summary(self.user.id)
+        with self.assertNumQueries(0):
+            get_dashboard_summary(self.user.id)
+        self.complete(self.courses[2], 2)
+        self.assertEqual(get_dashboard_summary(self.user.id)['completed_courses'], 1)
+
+    def test_lesson_count_change_invalidates_summary(self):
+        self.complete(self.courses[0], 2)
+        self.assertEqual(get_dashboard_summary(self.user.id)['completed_courses'], 1)
+        module = self.courses[0].modules.get()
+        Lesson.objects.create(module=module, title="Extra", content="", order=5)
+        self.assertEqual(get_dashboard_summary(self.user.id)['overall_progress'], 28)
+
+    def test_dashboard_queries_do_not_grow_with_enrollments(self):
+        session = self.client.session
+        session['user_id'] = self.user.id
+        session.save()
+        self.client.get(reverse('dashboard'), secure=True)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('dashboard'), secure=True)
+        self.assertEqual(response.context['total_courses'], 3)
+        with self.assertNumQueries(1):
+            self.client.get(reverse('my_courses'), secure=True)
+
+
+class SessionModeTest(HubTestCase):
+    def setUp(self):
+        cache.clear()
+        local_sessions.clear()
+        self.user = User.objects.create(firstname="Sam", lastname="Session", email="sam@example.com")
+
+    def log_in(self):
+        session = self.client.session
+        session['user_id'] = self.user.id
+        session['user_name'] = "Sam Session"
+        session.save()
+        # Signed-cookie sessions get a new key whenever the payload changes
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    def test_cached_db_serves_session_without_queries(self):
+        self.log_in()
+        self.client.get(reverse('about'), secure=True)
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('about'), secure=True)
+        self.assertContains(response, "Sam Session")
+
+    def test_local_tier_is_refreshed_from_shared_cache(self):
+        self.log_in()
+        key = self.client.session.session_key
+        local_sessions.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.session['user_id'], self.user.id)
+        self.assertEqual(local_sessions.get(key)['user_name'], "Sam Session")
+
+    def test_logout_evicts_local_copy(self):
+        self.log_in()
+        key = self.client.session.session_key
+        self.client.get(reverse('logout'), secure=True)
+        self.assertIsNone(local_sessions.get(key))
+        response = self.client.get(reverse('about'), secure=True)
+        self.assertNotContains(response, "Sam Session")
+
+    @override_settings(SESSION_MODE='signed_cookies', SESSION_ENGINE=settings.SESSION_ENGINES['signed_cookies'])
+    def test_signed_cookie_mode(self):
+        self.log_in()
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('about'), secure=True)
+        self.assertContains(response, "Sam Session")
+        out = StringIO()
+        call_command('purge_sessions', stdout=out)
+        self.assertIn("nothing to purge", out.getvalue())
+
+    @override_settings(SESSION_MODE='db', SESSION_ENGINE=settings.SESSION_ENGINES['db'])
+    def test_purge_sessions_in_chunks(self):
+        for i in range(5):
+            session = DatabaseSessionStore()
+            session['n'] = i
+            session.set_expiry(-60 if i < 4 else 3600)
+            session.save()
+        out = StringIO()
+        call_command('purge_sessions', chunk_size=2, sleep=0, stdout=out)
+        self.assertIn("Purged 4", out.getvalue())
+        self.assertEqual(Session.objects.count(), 1)
+
+
+class SQLiteProfileTest(HubTransactionTestCase):
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("SQLite profile only")
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_connection_pragmas(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('busy_timeout'), settings.SQLITE_BUSY_TIMEOUT)
+        self.assertEqual(self.pragma('temp_store'), 2)  # MEMORY
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+    def test_concurrent_progress_writes_do_not_lock(self):
+        out = StringIO()
+        call_command('stress_progress', threads=8, updates=15, lessons=5, stdout=out)
+        self.assertIn("120 writes", out.getvalue())
+        self.assertIn(", 0 lock errors", out.getvalue())
+        self.assertFalse(Course.objects.exists())
+
+    def test_worker_processes_without_the_process_lock_do_not_lock(self):
+        # Separate processes share no Python lock, as with gunicorn workers
+        out = StringIO()
+        call_command('stress_progress', processes=3, threads=3, updates=10, lessons=5, no_serialize=True, stdout=out)
+        self.assertIn("across 3 processes: 90 writes", out.getvalue())
+        self.assertIn(", 0 lock errors", out.getvalue())
+        self.assertFalse(Course.objects.exists())
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTest(HubTransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # A second connection to the test database stands in for a replica
+        primary = connections['default'].settings_dict
+        connections.settings['replica'] = {**primary, 'TEST': {**primary['TEST'], 'MIRROR': 'default'}}
+        cls.databases = {'default', 'replica'}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.course = Course.objects.create(
+            title="Replicated", description="", difficulty="junior", duration_hours=1
+        )
+        module = Module.objects.create(course=self.course, title="Module", description="", order=1)
+        Lesson.objects.create(module=module, title="Lesson", content="", order=1)
+        self.user = User.objects.create(firstname="Rea", lastname="Plica", email="rea@example.com")
+        session = self.client.session
+        session['user_id'] = self.user.id
+        session.save()
+
+    def get(self, url):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(url, secure=True)
+        return response, len(replica)
+
+    def test_catalog_reads_from_replica(self):
+        response, replica_queries = self.get(reverse('catalog'))
+        self.assertContains(response, "Replicated")
+        self.assertGreater(replica_queries, 0)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_write_pins_client_to_primary(self):
+        _, replica_queries = self.get(reverse('course_detail', args=[self.course.id]))
+        self.assertGreater(replica_queries, 0)
+
+        response, _ = self.get(reverse('enroll_course', args=[self.course.id]))
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        response, replica_queries = self.get(reverse('course_detail', args=[self.course.id]))
+        self.assertEqual(replica_queries, 0)
+        self.assertTrue(response.context['is_enrolled'])
+
+    def test_search_reads_index_from_replica(self):
+        with CaptureQueriesContext(connections['default']) as primary:
+            response, replica_queries = self.get(reverse('search') + '?q=replicated')
+        self.assertContains(response, "Replicated")
+        self.assertFalse([query for query in primary.captured_queries if 'script_search_index' in query['sql']])
+        self.assertGreater(replica_queries, 0)
+
+    def test_unmarked_views_and_migrations_use_primary(self):
+        _, replica_queries = self.get(reverse('dashboard'))
+        self.assertEqual(replica_queries, 0)
+        self.assertFalse(ReplicaRouter().allow_migrate('replica', 'script'))
+
+
+class QueryPlanTest(HubTestCase):
+    """EXPLAIN every query of the hot paths and fail when one needs a full table scan"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(firstname="Plan", lastname="Ner", email="plan@example.com")
+        self.course = Course.objects.create(
+            title="Indexed", description="", difficulty="junior", duration_hours=1
+        )
+        module = Module.objects.create(course=self.course, title="Module", description="", order=1)
+        self.lesson = Lesson.objects.create(module=module, title="Lesson", content="", order=1)
+        enroll_user(self.user, self.course)
+        record_lesson_progress(self.user, self.lesson, 100, is_completed=True)
+        session = self.client.session
+        session['user_id'] = self.user.id
+        session.save()
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Tiny test tables are always cheaper to scan; ask what an index would do
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute(f'EXPLAIN {sql}')
+                return '\n'.join(row[0] for row in cursor.fetchall())
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return '\n'.join(row[-1] for row in cursor.fetchall())
+
+    def assertIndexedQueries(self, run, *indexes):
+        with CaptureQueriesContext(connection) as captured:
+            run()
+        plans = [self.explain(query['sql']) for query in captured if query['sql'].startswith('SELECT')]
+        self.assertTrue(plans)
+        for plan in plans:
+            scan = r'Seq Scan' if connection.vendor == 'postgresql' else r'\bSCAN\b'
+            self.assertIsNone(re.search(scan, plan), plan)
+        for index in indexes:
+            self.assertTrue(any(index in plan for plan in plans), f"{index} unused:\n" + '\n'.join(plans))
+
+    def test_dashboard(self):
+        self.assertIndexedQueries(
+            lambda: self.client.get(reverse('dashboard'), secure=True),
+            'enrollment_user_active_idx', 'progress_user_completed_idx',
+        )
+
+    def test_recent_progress_needs_no_sort(self):
+        with CaptureQueriesContext(connection) as captured:
+            get_dashboard_summary(self.user.id)
+        plan = self.explain(captured[-1]['sql'])
+        self.assertNotIn('TEMP B-TREE', plan)
+        self.assertIsNone(re.search(r'^\s*(->\s*)?Sort\b', plan, re.MULTILINE), plan)
+
+    def test_my_courses(self):
+        self.assertIndexedQueries(
+            lambda: self.client.get(reverse('my_courses'), secure=True), 'enrollment_user_active_idx'
+        )
+
+    def test_catalog(self):
+        self.assertIndexedQueries(
+            lambda: self.client.get(reverse('junior_courses'), secure=True), 'course_difficulty_created_idx'
+        )
+
+    def test_course_outline(self):
+        self.assertIndexedQueries(
+            lambda: build_course_outline(self.course.id), 'module_course_order_idx', 'lesson_module_order_idx'
+        )
+
+    def test_course_detail(self):
+        self.assertIndexedQueries(
+            lambda: self.client.get(reverse('course_detail', args=[self.course.id]), secure=True),
+            'module_course_order_idx',
+        )
+
+
+class QueryBudgetTest(HubTestCase):
+    """Every named URL declares how many queries it may issue for an enrolled user
+
+    Staff-only and OAuth views are driven down their real paths: a logged-in
+    staff export and callbacks against stubbed provider responses.
+    """
+
+    # Cold cache (cleared before every request), a course of three modules with four lessons each
+    BUDGETS = {
+        'home': 1,
+        'about': 0,
+        'contact': 0,
+        'catalog': 1,
+        'junior_courses': 1,
+        'intermediate_courses': 1,
+        'advanced_courses': 1,
+        'search': 1,
+        'video_tutorials': 0,
+        'code_examples': 0,
+        'practice_exercises': 0,
+        'registration': 0,
+        'login': 0,
+        'logout': 2,
+        'enroll_course': 9,
+        'course_detail': 6,
+        'lesson_detail': 8,
+        'update_lesson_progress': 6,
+        'update_lesson_progress_batch': 7,
+        'dashboard': 4,
+        'my_courses': 2,
+        'export_data': 2,
+        'google_auth': 0,
+        'google_callback': 5,
+        'github_auth': 0,
+        'github_callback': 5,
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(firstname="Bud", lastname="Get", email="budget@example.com")
+        self.course = Course.objects.create(
+            title="Budgeted", description="", difficulty="junior", duration_hours=1
+        )
+        self.other = Course.objects.create(title="Other", description="", difficulty="junior", duration_hours=1)
+        for m in range(3):
+            module = Module.objects.create(course=self.course, title=f"Module {m}", description="", order=m)
+            for n in range(4):
+                self.lesson = Lesson.objects.create(module=module, title=f"Lesson {m}.{n}", content="", order=n)
+        enroll_user(self.user, self.course)
+        self.staff = StaffUserModel.objects.create_user("budget-staff", password="x", is_staff=True)
+        session = self.client.session
+        session['user_id'] = self.user.id
+        session['user_name'] = "Bud Get"
+        session.save()
+
+    def request(self, name):
+        course_id, lesson_id = self.course.id, self.lesson.id
+        if name == 'enroll_course':
+            return self.client.get(reverse(name, args=[self.other.id]), secure=True)
+        if name == 'course_detail':
+            return self.client.get(reverse(name, args=[course_id]), secure=True)
+        if name == 'lesson_detail':
+            return self.client.get(reverse(name, args=[course_id, lesson_id]), secure=True)
+        if name == 'update_lesson_progress':
+            return self.client.post(reverse(name, args=[lesson_id]), {'progress_percentage': 50}, secure=True)
+        if name == 'update_lesson_progress_batch':
+            payload = json.dumps([{'lesson_id': lesson_id, 'progress_percentage': 100, 'is_completed': True}])
+            return self.client.post(reverse(name), payload, content_type='application/json', secure=True)
+        if name == 'search':
+            return self.client.get(reverse(name), {'q': 'Budgeted'}, secure=True)
+        if name == 'export_data':
+            response = self.client.get(reverse(name, args=['enrollments']), secure=True)
+            b''.join(response.streaming_content)
+            return response
+        if name in ('google_callback', 'github_callback'):
+            return self.oauth_callback(name)
+        return self.client.get(reverse(name), secure=True)
+
+    def prepare(self, name):
+        # Logins and session writes happen before the measured request
+        if name == 'export_data':
+            self.client.force_login(self.staff)
+        if name in ('google_callback', 'github_callback'):
+            session = self.client.session
+            session['oauth_state'] = 'state-abc'
+            session.save()
+
+    def oauth_callback(self, name):
+        token = {'access_token': 'token-123'}
+        payloads = {
+            settings.GOOGLE_OAUTH2_TOKEN_URL: token,
+            settings.GOOGLE_OAUTH2_USERINFO_URL: {'email': 'budget@example.com', 'given_name': 'Bud', 'family_name': 'Get'},
+            settings.GITHUB_OAUTH2_TOKEN_URL: token,
+            settings.GITHUB_OAUTH2_USERINFO_URL: {'name': 'Bud Get'},
+            settings.GITHUB_OAUTH2_EMAILS_URL: [{'email': 'budget@example.com', 'primary': True, 'verified': True}],
+        }
+        with override_settings(GOOGLE_OAUTH2_CLIENT_ID='google-id', GITHUB_OAUTH2_CLIENT_ID='github-id'), \
+                mock.patch.object(oauth_http, 'fetch_json', side_effect=lambda method, url, **kwargs: payloads[url]):
+            response = self.client.get(reverse(name), {'state': 'state-abc', 'code': 'code-xyz'}, secure=True)
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        return response
+
+    def assertQueryBudget(self, name, budget):
+        self.prepare(name)
+        cache.clear()
+        with collect_metrics() as metrics:
+            response = self.request(name)
+        self.assertLess(response.status_code, 400, name)
+        self.assertLessEqual(metrics.queries, budget, f"{name} issued {metrics.queries} queries")
+        self.assertEqual(metrics.repeated(1), [], f"{name} repeats a query")
+
+    def test_every_named_url_has_a_budget(self):
+        names = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(names, set(self.BUDGETS))
+
+    def test_views_stay_within_budget(self):
+        for name, budget in self.BUDGETS.items():
+            if name != 'logout':
+                with self.subTest(name):
+                    self.assertQueryBudget(name, budget)
+        self.assertQueryBudget('logout', self.BUDGETS['logout'])
+
+    @override_settings(QUERY_INSTRUMENTATION=True, QUERY_SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        with self.assertNoLogs('script.requests', 'WARNING'):
+            response = self.request('dashboard')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, total;dur=')
+
+    @override_settings(QUERY_INSTRUMENTATION=True, QUERY_SERVER_TIMING=False)
+    def test_server_timing_header_can_be_turned_off(self):
+        self.assertNotIn('Server-Timing', self.request('dashboard'))
+
+    @override_settings(QUERY_INSTRUMENTATION=True)
+    def test_n_plus_one_loop_is_logged(self):
+        def n_plus_one(request):
+            # One query per lesson, above the default QUERY_REPEAT_THRESHOLD of 5
+            titles = [Lesson.objects.get(pk=pk).title for pk in Lesson.objects.values_list('pk', flat=True)]
+            return HttpResponse(len(titles))
+
+        with self.assertLogs('script.requests', 'WARNING') as logs:
+            QueryBudgetMiddleware(n_plus_one)(RequestFactory().get('/n-plus-one/'))
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('/n-plus-one/ ran the same query 12 times', logs.output[0])
+
+    def test_fingerprint_ignores_values(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x'"),
+            fingerprint("SELECT *  FROM t WHERE id IN (%s, %s) AND name = 'y'"),
+        )
+
+
+class LoadBenchTest(HubTransactionTestCase):
+    def test_seed_run_and_compare(self):
+        cache.clear()
+        output = os.path.join(tempfile.mkdtemp(), 'loadbench.json')
+        call_command(
+            'loadbench', '--route', 'dashboard', '--route', 'lesson_detail',
+            courses=4, lessons=12, users=6, progress=36, requests=4, concurrency=2,
+            output=output, stdout=StringIO(),
+        )
+
+        self.assertEqual(Course.objects.count(), 4)
+        self.assertEqual(LessonProgress.objects.count(), 36)
+        with open(output) as f:
+            report = json.load(f)
+        self.assertEqual(report['dataset'], {'courses': 4, 'users': 6})
+        for route in ('dashboard', 'lesson_detail'):
+            self.assertEqual(report['routes'][route]['statuses'], {'200': 4})
+            self.assertGreater(report['routes'][route]['queries_max'], 0)
+
+        out = StringIO()
+        call_command(
+            'loadbench', '--route', 'dashboard', skip_seed=True, requests=2, concurrency=1,
+            output=output + '.2', baseline=output, tolerance=1000, stdout=out,
+        )
+        self.assertIn('Compared with', out.getvalue())
+
+        real = Course.objects.create(title="Loadbench tips", description="", difficulty="junior")
+        call_command('loadbench', purge=True, stdout=StringIO())
+        self.assertFalse(User.objects.exists())
+        self.assertEqual(list(Course.objects.all()), [real])
+        self.assertFalse(Lesson.objects.exists())
+        self.assertEqual(search_ids("synthetic", KIND_COURSE), [])
+
+
+class CourseTreeIOTest(HubTestCase):
+    def setUp(self):
+        self.course = Course.objects.create(
+            title="Async JavaScript", description="Promises and await.", difficulty="intermediate", duration_hours=4
+        )
+        for m in range(2):
+            module = Module.objects.create(course=self.course, title=f"Part {m + 1}", description="", order=m)
+            for n in range(3):
+                Lesson.objects.create(module=module, title=f"Step {n + 1}", content=f"Body {m}.{n}", order=n)
+
+    def export(self):
+        return list(export_courses(Course.objects.filter(pk=self.course.pk)))
+
+    def test_slugs_are_filled_and_unique_per_parent(self):
+        self.assertEqual(self.course.slug, "async-javascript")
+        self.assertEqual(
+            sorted(Lesson.objects.filter(module__course=self.course).values_list('slug', flat=True)),
+            ["step-1", "step-1", "step-2", "step-2", "step-3", "step-3"],
+        )
+        twin = Course.objects.create(title="Async JavaScript", description="", difficulty="junior")
+        self.assertEqual(twin.slug, "async-javascript-2")
+
+    def test_export_streams_nested_trees(self):
+        with self.assertNumQueries(3):
+            [document] = self.export()
+        self.assertEqual(document['slug'], "async-javascript")
+        self.assertEqual([m['slug'] for m in document['modules']], ["part-1", "part-2"])
+        self.assertEqual([l['content'] for l in document['modules'][1]['lessons']], ["Body 1.0", "Body 1.1", "Body 1.2"])
+
+    def test_export_skips_rows_of_courses_deleted_mid_export(self):
+        doomed = self.course
+        self.course = Course.objects.create(title="Later", description="", difficulty="junior")
+        Module.objects.create(course=self.course, title="Only", description="", order=0)
+        iterator = QuerySet.iterator
+
+        # The course stream starts after the module and lesson streams have read their rows
+        def delete_then_iterate(queryset, *args, **kwargs):
+            if queryset.model is Course:
+                doomed.delete()
+            return iterator(queryset, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, 'iterator', delete_then_iterate):
+            documents = list(export_courses())
+        self.assertEqual([d['slug'] for d in documents], ["later"])
+        self.assertEqual([m['slug'] for m in documents[0]['modules']], ["only"])
+
+    def test_commands_round_trip(self):
+        path = os.path.join(tempfile.mkdtemp(), 'courses.json')
+        call_command('export_courses', output=path, format='json', stdout=StringIO())
+        before = self.export()
+        self.course.delete()
+
+        out = StringIO()
+        call_command('import_courses', path, stdout=out)
+        self.assertIn("Imported 1 courses", out.getvalue())
+        self.course = Course.objects.get(slug="async-javascript")
+        self.assertEqual(self.export(), before)
+        self.assertEqual(self.course.lesson_count, 6)
+        self.assertEqual(len(search_ids("async", KIND_COURSE)), 1)
+        self.assertEqual(len(search_ids("body", KIND_LESSON)), 6)
+
+    def test_reimport_updates_in_place(self):
+        [document] = self.export()
+        lesson_ids = set(Lesson.objects.values_list('id', flat=True))
+        document['modules'][0]['lessons'][0]['title'] = "Renamed"
+        document['modules'][0]['lessons'].append({'slug': "extra", 'title': "Extra", 'content': ""})
+
+        course, stats = import_course(document)
+        self.assertEqual(course.pk, self.course.pk)
+        self.assertEqual((stats['lessons_created'], stats['lessons_updated']), (1, 6))
+        self.assertTrue(lesson_ids < set(Lesson.objects.values_list('id', flat=True)))
+        self.assertTrue(Lesson.objects.filter(title="Renamed", slug="step-1").exists())
+        self.assertEqual(Course.objects.get(pk=self.course.pk).lesson_count, 7)
+
+    def test_prune_removes_missing_children(self):
+        [document] = self.export()
+        del document['modules'][1]
+        document['modules'][0]['lessons'].pop()
+        import_courses([document], prune=True)
+        self.assertEqual(Module.objects.filter(course=self.course).count(), 1)
+        self.assertEqual(Lesson.objects.filter(module__course=self.course).count(), 2)
+        self.assertEqual(
+            sorted(search_ids("body", KIND_LESSON)),
+            sorted(Lesson.objects.filter(module__course=self.course).values_list('id', flat=True)),
+        )
+
+    def test_iter_documents_reads_json_and_jsonl_in_small_chunks(self):
+        documents = [json.loads(line) for line in write_jsonl(self.export() * 3)]
+        for text in (''.join(write_json(documents)), ''.join(write_jsonl(documents))):
+            self.assertEqual(list(iter_documents(StringIO(text), chunk_size=7)), documents)
+        with self.assertRaises(CourseImportError):
+            list(iter_documents(StringIO('[{"slug": "a"'), chunk_size=7))
+
+    def test_bad_document_rolls_back_its_course(self):
+        [document] = self.export()
+        document['title'] = "Changed"
+        document['modules'][1]['lessons'][0]['slug'] = "Not a slug"
+        with self.assertRaises(CourseImportError):
+            import_course(document)
+        self.assertEqual(Course.objects.get(pk=self.course.pk).title, "Async JavaScript")
+
+    def test_badly_typed_documents_are_rejected(self):
+        [document] = self.export()
+        bad_values = [
+            (document, 'is_free', "no"),
+            (document, 'duration_hours', "x"),
+            (document, 'title', "t" * 201),
+            (document['modules'][0], 'title', ""),
+            (document['modules'][0]['lessons'][0], 'duration_minutes', "ten"),
+        ]
+        for target, field, value in bad_values:
+            original = target[field]
+            target[field] = value
+            with self.assertRaisesMessage(CourseImportError, field):
+                import_course(document)
+            target[field] = original
+        self.assertEqual(import_course(document)[1]['lessons_updated'], 6)
+
+        self.client.force_login(StaffUserModel.objects.create_superuser('staff', 'staff@example.com', 'pw'))
+        document['is_free'] = "no"
+        upload = SimpleUploadedFile('courses.jsonl', json.dumps(document, cls=DjangoJSONEncoder).encode())
+        response = self.client.post(reverse('admin:script_course_import'), {'file': upload}, secure=True)
+        self.assertContains(response, 'is_free')
+
+    def test_admin_export_and_import(self):
+        from django.contrib.auth.models import User as StaffUser
+        self.client.force_login(StaffUser.objects.create_superuser('staff', 'staff@example.com', 'pw'))
+        response = self.client.post(
+            reverse('admin:script_course_changelist'),
+            {'action': 'export_course_trees', '_selected_action': [self.course.pk]},
+            secure=True,
+        )
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        body = b''.join(response.streaming_content)
+        self.assertEqual(body.decode(), ''.join(write_jsonl(self.export())))
+
+        self.assertContains(self.client.get(reverse('admin:script_course_import'), secure=True), 'Import course trees')
+        upload = SimpleUploadedFile('courses.jsonl', body.replace(b'Step 1', b'Intro'))
+        response = self.client.post(reverse('admin:script_course_import'), {'file': upload}, secure=True)
+        self.assertRedirects(response, reverse('admin:script_course_changelist'), fetch_redirect_response=False)
+        self.assertEqual(Lesson.objects.filter(title="Intro").count(), 2)
+
+
+@override_settings(EXPORT_SAFETY_LAG=0)
+class AnalyticsExportTest(HubTestCase):
+    def setUp(self):
+        self.user = User.objects.create(firstname="Ana", lastname="Lytics", email="ana@example.com")
+        self.course = Course.objects.create(title="Exports", description="", difficulty="junior", duration_hours=1)
+        module = Module.objects.create(course=self.course, title="Module", description="", order=1)
+        self.lessons = [
+            Lesson.objects.create(module=module, title=f"Lesson {n}", content="", order=n) for n in range(3)
+        ]
+        with override_settings(LAZY_LESSON_PROGRESS=False):
+            enroll_user(self.user, self.course)
+
+    def export(self, *args, **options):
+        path = os.path.join(tempfile.mkdtemp(), 'export')
+        call_command('export_analytics', *args, output=path, stderr=StringIO(), **options)
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_rows_come_from_one_query(self):
+        with self.assertNumQueries(1):
+            columns, rows = export_rows('progress')
+            rows = list(rows)
+        self.assertEqual(len(rows), 3)
+        row = dict(zip(columns, rows[0]))
+        self.assertEqual((row['user_email'], row['course_id']), ("ana@example.com", self.course.pk))
+
+    def test_command_writes_csv_and_gzipped_jsonl(self):
+        lines = self.export('enrollments').decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'user_id', 'user_email'])
+        self.assertIn('exports', lines[1])
+
+        data = gzip.decompress(self.export('progress', format='jsonl', gzip=True)).decode()
+        rows = [json.loads(line) for line in data.splitlines()]
+        self.assertEqual(sorted(row['lesson_id'] for row in rows), [lesson.pk for lesson in self.lessons])
+
+    def test_since_only_returns_changed_rows(self):
+        since = timezone.now()
+        self.assertEqual(self.export('progress', since=since.isoformat()).decode().count('\n'), 1)
+
+        record_lesson_progress(self.user, self.lessons[1], 100, is_completed=True)
+        rows = list(csv.DictReader(StringIO(self.export('progress', since=since.isoformat()).decode())))
+        self.assertEqual([int(row['lesson_id']) for row in rows], [self.lessons[1].pk])
+        self.assertEqual(len(list(export_rows('enrollments', since=since)[1])), 1)
+
+    def test_until_lags_behind_in_flight_writes(self):
+        with override_settings(EXPORT_SAFETY_LAG=60):
+            until = export_until()
+            self.assertEqual(len(list(export_rows('progress', until=until)[1])), 0)
+        # Rows stamped inside the lag window are left for the next run
+        self.assertEqual(len(list(export_rows('progress', since=until, until=export_until())[1])), 3)
+
+    def test_view_is_staff_only_and_streams(self):
+        from django.contrib.auth.models import User as StaffUser
+        url = reverse('export_data', args=['progress'])
+        self.assertEqual(self.client.get(url, secure=True).status_code, 302)
+
+        self.client.force_login(StaffUser.objects.create_superuser('staff', 'staff@example.com', 'pw'))
+        response = self.client.get(url, {'format': 'jsonl', 'gzip': '1'}, secure=True)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('progress.jsonl.gz', response['Content-Disposition'])
+        rows = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(len(rows), 3)
+
+        until = response['X-Export-Until']
+        response = self.client.get(url, {'since': until}, secure=True)
+        self.assertEqual(b''.join(response.streaming_content).decode().count('\n'), 1)
+        self.assertEqual(self.client.get(url, {'since': 'yesterday'}, secure=True).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export_data', args=['users']), secure=True).status_code, 404)
+
+
+class PasswordHashingTest(HubTestCase):
+    def setUp(self):
+        self.user = User.objects.create(firstname="Hash", lastname="Er", email="hash@example.com")
+
+    def test_outdated_hash_is_upgraded_on_login(self):
+        self.user.password = make_password("testpassword123", hasher="scrypt")
+        self.user.save()
+        response = self.client.post(
+            reverse('login'), {'email': "hash@example.com", 'password': "testpassword123"}, secure=True
+        )
+        self.assertEqual(response.status_code, 302)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+        self.assertTrue(self.user.check_password("testpassword123"))
+
+    def test_wrong_password_keeps_hash(self):
+        self.user.password = make_password("testpassword123", hasher="scrypt")
+        self.user.save()
+        self.assertFalse(self.user.check_password("wrong"))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$"))
+
+    def test_busy_pool_returns_503(self):
+        with mock.patch.object(hashing_pool, 'run', side_effect=HashingBusy):
+            response = self.client.post(
+                reverse('login'), {'email': "hash@example.com", 'password': "whatever1"}, secure=True
+            )
+        self.assertEqual(response.status_code, 503)
+
+    @override_settings(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=0)
+    def test_pool_rejects_beyond_queue(self):
+        pool = HashingPool()
+        started, release = threading.Event(), threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return "done"
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            first = executor.submit(pool.run, slow)
+            started.wait(5)
+            with self.assertRaises(HashingBusy):
+                pool.run(len, "x")
+            release.set()
+            self.assertEqual(first.result(), "done")
+        self.assertEqual(pool.run(len, "x"), 1)
+
+
+class StandInOAuthHandler(BaseHTTPRequestHandler):
+    delay = 0
+    token = {'access_token': 'token-123'}
+    userinfo = {'email': 'oauth@example.com', 'given_name': 'Ada', 'family_name': 'Lovelace'}
+    emails = [
+        {'email': 'old@example.com', 'primary': False, 'verified': True},
+        {'email': 'grace@example.com', 'primary': True, 'verified': True},
+    ]
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.reply(self.token)
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        if self.headers.get('Authorization') not in ('Bearer token-123', 'token token-123'):
+            return self.reply({'message': 'Bad credentials'}, status=401)
+        payloads = {
+            '/userinfo': self.userinfo,
+            '/user': {'name': 'Grace Brewster Hopper'},
+            '/user/emails': self.emails,
+        }
+        self.reply(payloads[self.path])
+
+    def reply(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class OAuthCallbackTest(HubTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInOAuthHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{cls.server.server_port}'
+        cls.provider = override_settings(
+            GOOGLE_OAUTH2_CLIENT_ID='google-id',
+            GOOGLE_OAUTH2_TOKEN_URL=f'{base}/token',
+            GOOGLE_OAUTH2_USERINFO_URL=f'{base}/userinfo',
+            GITHUB_OAUTH2_CLIENT_ID='github-id',
+            GITHUB_OAUTH2_TOKEN_URL=f'{base}/token',
+            GITHUB_OAUTH2_USERINFO_URL=f'{base}/user',
+            GITHUB_OAUTH2_EMAILS_URL=f'{base}/user/emails',
+        )
+        cls.provider.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.provider.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        StandInOAuthHandler.delay = 0
+        session = self.client.session
+        session['oauth_state'] = 'state-abc'
+        session.save()
+
+    def callback(self, name):
+        return self.client.get(reverse(name), {'state': 'state-abc', 'code': 'code-xyz'}, secure=True)
+
+    def test_google_callback_logs_in(self):
+        response = self.callback('google_callback')
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        user = User.objects.get(email='oauth@example.com')
+        self.assertEqual((user.firstname, user.lastname), ('Ada', 'Lovelace'))
+        self.assertEqual(self.client.session['user_id'], user.id)
+
+    def test_github_fetches_profile_and_emails_concurrently(self):
+        StandInOAuthHandler.delay = 0.4
+        started = time.perf_counter()
+        response = self.callback('github_callback')
+        elapsed = time.perf_counter() - started
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        user = User.objects.get(email='grace@example.com')
+        self.assertEqual((user.firstname, user.lastname), ('Grace', 'Brewster Hopper'))
+        self.assertLess(elapsed, 0.75)
+
+    @override_settings(OAUTH_HTTP_TIMEOUT=0.2)
+    def test_slow_provider_times_out(self):
+        oauth_http.close()
+        self.addCleanup(oauth_http.close)
+        StandInOAuthHandler.delay = 1
+        response = self.callback('google_callback')
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        self.assertFalse(User.objects.filter(email='oauth@example.com').exists())
+
+    def test_google_payloads_that_are_not_objects_are_rejected(self):
+        cases = (
+            ('token', 'access_token', 'Access token not received from Google.'),
+            ('userinfo', ['oauth@example.com'], 'Unexpected response from Google.'),
+        )
+        for attribute, payload, message in cases:
+            with self.subTest(attribute), mock.patch.object(StandInOAuthHandler, attribute, payload):
+                response = self.callback('google_callback')
+                self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+                self.assertEqual([str(m) for m in get_messages(response.wsgi_request)][-1], message)
+        self.assertFalse(User.objects.filter(email='oauth@example.com').exists())
+
+    def test_github_emails_that_are_not_a_list_are_rejected(self):
+        self.addCleanup(setattr, StandInOAuthHandler, 'emails', StandInOAuthHandler.emails)
+        StandInOAuthHandler.emails = {'message': 'Not a list'}
+        response = self.callback('github_callback')
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        self.assertFalse(User.objects.filter(email='grace@example.com').exists())
+
+    def test_state_mismatch_is_rejected(self):
+        response = self.client.get(reverse('github_callback'), {'state': 'other', 'code': 'x'}, secure=True)
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+
+
+class StaticPipelineTest(HubTestCase):
+    def test_pages_use_vendored_assets_and_inline_critical_css(self):
+        response = self.client.get(reverse('about'), secure=True)
+        content = response.content.decode()
+        self.assertNotIn('cdn.jsdelivr.net', content)
+        self.assertNotIn('cdnjs.cloudflare.com', content)
+        self.assertIn('/static/vendor/bootstrap/bootstrap.min.css', content)
+        self.assertIn('.navbar-brand{', content)
+
+    def test_unhashed_names_before_collectstatic(self):
+        self.assertEqual(staticfiles_storage.url('css/style.css'), '/static/css/style.css')
+
+    def test_collected_files_are_hashed_compressed_and_immutable(self):
+        root = tempfile.mkdtemp()
+        with override_settings(STATIC_ROOT=root):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            url = staticfiles_storage.url('vendor/bootstrap/bootstrap.min.css')
+            self.assertRegex(url, r'/static/vendor/bootstrap/bootstrap\.min\.[0-9a-f]{12}\.css$')
+            self.assertTrue(staticfiles_storage.exists(url[len('/static/'):] + '.br'))
+
+            middleware = HubWhiteNoiseMiddleware(lambda request: HttpResponse())
+            response = middleware(RequestFactory().get(url, HTTP_ACCEPT_ENCODING='br, gzip'))
+            self.assertEqual(response['Content-Encoding'], 'br')
+            self.assertIn('immutable', response['Cache-Control'])
+
+    def test_pages_render_with_a_manifest(self):
+        # The manifest is strict once written, so every {% static %} path must exist
+        with override_settings(STATIC_ROOT=tempfile.mkdtemp(), PRERENDER_ROOT=tempfile.mkdtemp()):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            for url_name in ('home', 'video_tutorials'):
+                response = self.client.get(reverse(url_name), secure=True)
+                self.assertEqual(response.status_code, 200)
+                self.assertRegex(response.content.decode(), r'/static/css/style\.[0-9a-f]{12}\.css')
+            call_command('prerender_pages', stdout=StringIO())
+
+
+@override_settings(IMAGE_WORKERS=0, IMAGE_VARIANT_WIDTHS=[320, 640])
+class CourseImageVariantTest(HubTestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def upload(self, name, color):
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), color).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def create_course(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Course.objects.create(
+                title="Pictures", description="", difficulty="junior", duration_hours=1,
+                image=self.upload("cover.png", "red"),
+            )
+
+    def test_upload_generates_hashed_variants(self):
+        course = self.create_course()
+        course.refresh_from_db()
+        variants = course.image_variants['variants']
+        self.assertEqual(course.image_variants['source'], course.image.name)
+        self.assertEqual(sorted((v['width'], v['format']) for v in variants),
+                         [(320, 'jpg'), (320, 'webp'), (640, 'jpg'), (640, 'webp')])
+        for variant in variants:
+            self.assertRegex(variant['name'], r'^course_images/derived/cover(_\w+)?\.[0-9a-f]{12}\.\d+w\.(webp|jpg)$')
+            with default_storage.open(variant['name']) as f, Image.open(f) as image:
+                self.assertEqual(image.width, variant['width'])
+
+    def test_new_variants_bump_catalog_version(self):
+        course = self.create_course()
+        version = get_catalog_version()
+        refresh_course_image_variants(course.pk, force=True)
+        self.assertNotEqual(get_catalog_version(), version)
+
+    def test_template_tag_emits_srcset(self):
+        course = self.create_course()
+        course.refresh_from_db()
+        html = Template('{% load course_images %}{% course_image course css_class="card-img-top" %}').render(
+            Context({'course': course})
+        )
+        self.assertIn('<source type="image/webp" srcset="/media/course_images/derived/', html)
+        self.assertIn('.320w.webp 320w, ', html)
+        self.assertIn('class="card-img-top"', html)
+
+    def test_replacing_image_removes_old_variants(self):
+        course = self.create_course()
+        course.refresh_from_db()
+        old_names = [v['name'] for v in course.image_variants['variants']]
+        course.image = self.upload("cover2.png", "blue")
+        with self.captureOnCommitCallbacks(execute=True):
+            course.save()
+        course.refresh_from_db()
+        self.assertTrue(all(not default_storage.exists(name) for name in old_names))
+        self.assertEqual(course.image_variants['source'], course.image.name)
+
+    def test_backfill_command(self):
+        course = self.create_course()
+        Course.objects.filter(pk=course.pk).update(image_variants={})
+        call_command('generate_image_variants', stdout=StringIO())
+        course.refresh_from_db()
+        self.assertEqual(len(course.image_variants['variants']), 4)
+
+
+class ContactQueueTest(HubTestCase):
+    def setUp(self):
+        self.spool = tempfile.mkdtemp()
+        self.settings_override = override_settings(CONTACT_SPOOL_DIR=self.spool, CONTACT_DRAIN_INTERVAL=0)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.data = {'name': 'Bot', 'email': 'bot@example.com', 'subject': 'Hi', 'message': 'Buy now'}
+
+    def test_post_only_enqueues(self):
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('contact'), self.data, secure=True)
+        self.assertRedirects(response, reverse('contact'), fetch_redirect_response=False)
+        self.assertFalse(Contact.objects.exists())
+        self.assertEqual(drain_contact_queue(), (1, 0))
+        self.assertEqual(Contact.objects.get().subject, 'Hi')
+
+    def test_drain_batches_and_deduplicates(self):
+        for i in range(5):
+            enqueue_contact('Bot', 'bot@example.com', 'Hi', 'Buy now')
+            enqueue_contact('Ada', f'ada{i}@example.com', '', 'Hello')
+        with self.assertNumQueries(5):  # savepoint, duplicate lookup, two inserts, release
+            self.assertEqual(drain_contact_queue(batch_size=3), (6, 4))
+        self.assertEqual(Contact.objects.filter(email='bot@example.com').count(), 1)
+        self.assertEqual(os.listdir(self.spool), [])
+
+    def test_duplicate_of_stored_row_is_skipped_within_window(self):
+        Contact.objects.create(**self.data)
+        enqueue_contact(*self.data.values())
+        self.assertEqual(drain_contact_queue(), (0, 1))
+        Contact.objects.update(created_at=timezone.now() - timedelta(seconds=settings.CONTACT_DEDUP_WINDOW + 1))
+        enqueue_contact(*self.data.values())
+        self.assertEqual(drain_contact_queue(), (1, 0))
+
+    def test_interrupted_drain_is_retried(self):
+        enqueue_contact(*self.data.values())
+        with mock.patch.object(Contact.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                drain_contact_queue()
+        enqueue_contact('Ada', 'ada@example.com', '', 'Hello')
+        self.assertEqual(drain_contact_queue(), (2, 0))
+
+    def test_invalid_submission_is_not_queued(self):
+        response = self.client.post(reverse('contact'), {**self.data, 'name': 'x' * 101}, secure=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(os.listdir(self.spool), [])
+
+    def test_bad_rows_are_dead_lettered(self):
+        enqueue_contact(*self.data.values())
+        enqueue_contact('x' * 101, 'long@example.com', 'Hi', 'Name too long')
+        self.assertEqual(drain_contact_queue(), (1, 0))
+        self.assertEqual(os.listdir(self.spool), [DEAD_LETTER_NAME])
+        with open(os.path.join(self.spool, DEAD_LETTER_NAME)) as f:
+            [dead] = [json.loads(line) for line in f]
+        self.assertEqual(dead['row']['email'], 'long@example.com')
+        self.assertEqual(drain_contact_queue(), (0, 0))
+
+    def test_database_rejection_falls_back_to_single_inserts(self):
+        enqueue_contact(*self.data.values())
+        enqueue_contact('Ada', 'ada@example.com', '', 'Hello')
+        with mock.patch.object(Contact.objects, 'bulk_create', side_effect=DataError):
+            self.assertEqual(drain_contact_queue(), (2, 0))
+        self.assertEqual(Contact.objects.count(), 2)
+        self.assertEqual(os.listdir(self.spool), [])
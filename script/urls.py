@@ -6,9 +6,11 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('about/', views.about, name='about'),
     path('contact/', views.contact, name='contact'),
+    path('courses/', views.catalog, name='catalog'),
     path('junior-courses/', views.junior_courses, name='junior_courses'),
     path('intermediate-courses/', views.intermediate_courses, name='intermediate_courses'),
     path('advanced-courses/', views.advanced_courses, name='advanced_courses'),
+    path('search/', views.search, name='search'),
     path('video-tutorials/', views.video_tutorials, name='video_tutorials'),
     path('code-examples/', views.code_examples, name='code_examples'),
     path('practice-exercises/', views.practice_exercises, name='practice_exercises'),
@@ -21,9 +23,13 @@ urlpatterns = [
     path('course/<int:course_id>/', views.course_detail, name='course_detail'),
     path('course/<int:course_id>/lesson/<int:lesson_id>/', views.lesson_detail, name='lesson_detail'),
     path('update-progress/<int:lesson_id>/', views.update_lesson_progress, name='update_lesson_progress'),
+    path('update-progress/batch/', views.update_lesson_progress_batch, name='update_lesson_progress_batch'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('my-courses/', views.my_courses, name='my_courses'),
     
+    # Staff-only analytics exports
+    path('exports/<slug:dataset>/', views.export_data, name='export_data'),
+    
     # Social Authentication URLs
     path('auth/google/', views.google_auth, name='google_auth'),
     path('auth/google/callback/', views.google_callback, name='google_callback'),
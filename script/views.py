@@ -1,25 +1,46 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
-from django.utils import timezone
+from django.http import Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.conf import settings
-from django.urls import reverse
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import ValidationError
+from django.db import router
 from django.views.decorators.csrf import ensure_csrf_cookie
-import requests
-from urllib.parse import urlencode, parse_qs
+import httpx
+from urllib.parse import urlencode
 import json
 import secrets
-from .models import User, Contact, Course, Module, Lesson, Enrollment, LessonProgress
+from .models import User, Contact, Course, Lesson, Enrollment, LessonProgress
+from .auth import hub_login_required
+from .caching import cache_catalog_page, cache_static_page
+from .catalog import catalog_page
+from .contact_queue import enqueue_contact
+from .dashboard import get_dashboard_summary
+from .exports import EXPORTS, FORMATS, export_rows, export_until, parse_since, stream_export
+from .hashing import HashingBusy, hash_password
+from .oauth import oauth_http
+from .outline import get_course_outline, invalidate_course_outline
+from .progress_buffer import progress_buffer
+from .routers import read_from_replica
+from .search import KIND_COURSE, KIND_LESSON, search as search_index
+from .services import apply_progress_batch, enroll_user, record_lesson_progress
+
+PROGRESS_BATCH_LIMIT = 500
+SEARCH_RESULT_LIMIT = 50
+BUSY_MESSAGE = 'We are handling a lot of sign-ins right now. Please try again in a moment.'
 
 # Create your views here.
+@cache_catalog_page
+@read_from_replica
 def home(request):
     # Get featured courses
-    featured_courses = Course.objects.all()[:6]
+    featured_courses = Course.objects.with_enrollment_count()[:6]
     context = {
         'featured_courses': featured_courses
     }
     return render(request, 'home.html', context)
 
+@cache_static_page
 def about(request):
     return render(request, 'about.html')
 
@@ -31,46 +52,85 @@ def contact(request):
         message = request.POST.get('message')
         
         if name and email and message:
-            Contact.objects.create(
-                name=name,
-                email=email,
-                subject=subject,
-                message=message
-            )
+            submission = Contact(name=name, email=email, subject=subject, message=message)
+            # Validate before queueing so the drainer only ever sees rows the database accepts
+            try:
+                submission.full_clean()
+            except ValidationError as e:
+                for field, errors in e.message_dict.items():
+                    messages.error(request, f'{field.capitalize()}: {" ".join(errors)}')
+                return render(request, 'contact.html', status=400)
+            # Queue the submission; the drainer inserts queued rows in batches
+            if settings.CONTACT_QUEUE:
+                enqueue_contact(name, email, subject, message)
+            else:
+                submission.save()
             return redirect('contact')
     
     return render(request, 'contact.html')
 
-def junior_courses(request):
-    courses = Course.objects.filter(difficulty='junior')
+def _render_catalog(request, template_name, difficulty=None):
+    courses, next_cursor = catalog_page(request.GET, difficulty=difficulty)
+    
+    next_query = None
+    if next_cursor:
+        query = request.GET.copy()
+        query['after'] = next_cursor
+        next_query = query.urlencode()
+    
     context = {
         'courses': courses,
-        'difficulty': 'junior'
+        'difficulty': difficulty or request.GET.get('difficulty', ''),
+        'difficulty_choices': Course.DIFFICULTY_CHOICES,
+        'filters': request.GET,
+        'next_query': next_query
     }
-    return render(request, 'junior_course.html', context)
+    return render(request, template_name, context)
 
+@cache_catalog_page
+@read_from_replica
+def catalog(request):
+    return _render_catalog(request, 'catalog.html')
+
+# The difficulty pages are aliases of the catalog with a fixed filter
+@cache_catalog_page
+@read_from_replica
+def junior_courses(request):
+    return _render_catalog(request, 'junior_course.html', difficulty='junior')
+
+@cache_catalog_page
+@read_from_replica
 def intermediate_courses(request):
-    courses = Course.objects.filter(difficulty='intermediate')
-    context = {
-        'courses': courses,
-        'difficulty': 'intermediate'
-    }
-    return render(request, 'intermediate_course.html', context)
+    return _render_catalog(request, 'intermediate_course.html', difficulty='intermediate')
 
+@cache_catalog_page
+@read_from_replica
 def advanced_courses(request):
-    courses = Course.objects.filter(difficulty='advanced')
+    return _render_catalog(request, 'advanced_course.html', difficulty='advanced')
+
+@read_from_replica
+def search(request):
+    query = request.GET.get('q', '').strip()
+    kind = request.GET.get('kind')
+    if kind not in (KIND_COURSE, KIND_LESSON):
+        kind = None
+    
     context = {
-        'courses': courses,
-        'difficulty': 'advanced'
+        'query': query,
+        'kind': kind,
+        'results': search_index(query, kind=kind, limit=SEARCH_RESULT_LIMIT) if query else []
     }
-    return render(request, 'advanced_course.html', context)
+    return render(request, 'search.html', context)
 
+@cache_static_page
 def video_tutorials(request):
     return render(request, 'video_tutorials.html')
 
+@cache_static_page
 def code_examples(request):
     return render(request, 'code_examples.html')
 
+@cache_static_page
 def practice_exercises(request):
     return render(request, 'practice_exercises.html')
 
@@ -103,7 +163,7 @@ def registration(request):
         
         # Create new user
         try:
-            user = User.objects.create(
+            user = User(
                 firstname=first_name,
                 lastname=last_name,
                 email=email
@@ -113,6 +173,9 @@ def registration(request):
             
             messages.success(request, 'Registration successful! Please log in.')
             return redirect('login')
+        except HashingBusy:
+            messages.error(request, BUSY_MESSAGE)
+            return render(request, 'registration.html', status=503)
         except Exception as e:
             messages.error(request, 'An error occurred during registration. Please try again.')
             return render(request, 'registration.html')
@@ -130,8 +193,11 @@ def login(request):
             return render(request, 'login.html')
         
         try:
-            user = User.objects.get(email=email)
-            if user.check_password(password):
+            user = User.objects.filter(email=email).first()
+            if user is None:
+                # Hash anyway so response time does not reveal which emails exist
+                hash_password(password)
+            elif user.check_password(password):
                 # Store user info in session
                 request.session['user_id'] = user.id
                 request.session['user_name'] = f"{user.firstname} {user.lastname}"
@@ -139,12 +205,12 @@ def login(request):
                 
                 messages.success(request, f'Welcome back, {user.firstname}!')
                 return redirect('home')
-            else:
-                messages.error(request, 'Invalid email or password.')
-                return render(request, 'login.html')
-        except User.DoesNotExist:
-            messages.error(request, 'Invalid email or password.')
-            return render(request, 'login.html')
+        except HashingBusy:
+            messages.error(request, BUSY_MESSAGE)
+            return render(request, 'login.html', status=503)
+        
+        messages.error(request, 'Invalid email or password.')
+        return render(request, 'login.html')
     
     return render(request, 'login.html')
 
@@ -154,32 +220,20 @@ def logout(request):
     return redirect('home')
 
 # New enrollment and learning views
+@hub_login_required
 def enroll_course(request, course_id):
-    if 'user_id' not in request.session:
-        return redirect('login')
-    
-    user = get_object_or_404(User, id=request.session['user_id'])
+    user = request.hub_user
     course = get_object_or_404(Course, id=course_id)
     
-    # Check if already enrolled
-    if Enrollment.objects.filter(user=user, course=course).exists():
-        return redirect('course_detail', course_id=course_id)
-    
-    # Create enrollment
-    enrollment = Enrollment.objects.create(user=user, course=course)
-    
-    # Initialize lesson progress for all lessons in the course
-    for module in course.modules.all():
-        for lesson in module.lessons.all():
-            LessonProgress.objects.create(user=user, lesson=lesson)
+    # Create enrollment and initialize lesson progress (no-op if already enrolled)
+    enroll_user(user, course)
     
     return redirect('course_detail', course_id=course_id)
 
+@hub_login_required
+@read_from_replica
 def course_detail(request, course_id):
-    if 'user_id' not in request.session:
-        return redirect('login')
-    
-    user = get_object_or_404(User, id=request.session['user_id'])
+    user = request.hub_user
     course = get_object_or_404(Course, id=course_id)
     
     # Check if user is enrolled
@@ -190,35 +244,25 @@ def course_detail(request, course_id):
         enrollment = None
         is_enrolled = False
     
-    # Get progress data
-    if is_enrolled:
-        total_lessons = course.get_total_lessons()
-        completed_lessons = LessonProgress.objects.filter(
-            user=user, 
-            lesson__module__course=course, 
-            is_completed=True
-        ).count()
-        progress_percentage = (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
-    else:
-        progress_percentage = 0
+    # Get progress data from the enrollment counters
+    progress_percentage = enrollment.progress_percentage if is_enrolled else 0
     
     context = {
         'course': course,
         'is_enrolled': is_enrolled,
         'enrollment': enrollment,
         'progress_percentage': progress_percentage,
-        'modules': course.modules.all()
+        'first_lesson_id': get_course_outline(course.id).first_id(),
+        'modules': course.modules.prefetch_related('lessons')
     }
     
     return render(request, 'course_detail.html', context)
 
+@hub_login_required
 def lesson_detail(request, course_id, lesson_id):
-    if 'user_id' not in request.session:
-        return redirect('login')
-    
-    user = get_object_or_404(User, id=request.session['user_id'])
+    user = request.hub_user
     course = get_object_or_404(Course, id=course_id)
-    lesson = get_object_or_404(Lesson, id=lesson_id, module__course=course)
+    lesson = get_object_or_404(Lesson.objects.select_related('module'), id=lesson_id, module__course=course)
     
     # Check if user is enrolled
     try:
@@ -233,96 +277,105 @@ def lesson_detail(request, course_id, lesson_id):
         defaults={'progress_percentage': 0}
     )
     
-    # Get navigation data
-    all_lessons = []
-    for module in course.modules.all():
-        for lesson_item in module.lessons.all():
-            all_lessons.append(lesson_item)
+    # Show updates that are still waiting in the write-behind buffer
+    pending = progress_buffer.pending_percentage(user.id, lesson.id)
+    if pending is not None and pending > progress.progress_percentage:
+        progress.progress_percentage = pending
     
-    current_index = None
-    for i, lesson_item in enumerate(all_lessons):
-        if lesson_item.id == lesson.id:
-            current_index = i
-            break
-    
-    prev_lesson = all_lessons[current_index - 1] if current_index > 0 else None
-    next_lesson = all_lessons[current_index + 1] if current_index < len(all_lessons) - 1 else None
+    # Get navigation data from the cached course outline
+    outline = get_course_outline(course.id)
+    if lesson.id not in outline:
+        invalidate_course_outline(course.id)
+        outline = get_course_outline(course.id)
     
     context = {
         'course': course,
         'lesson': lesson,
         'progress': progress,
-        'prev_lesson': prev_lesson,
-        'next_lesson': next_lesson,
-        'current_index': current_index,
-        'total_lessons': len(all_lessons)
+        'modules': course.modules.prefetch_related('lessons'),
+        'prev_lesson_id': outline.prev_id(lesson.id),
+        'next_lesson_id': outline.next_id(lesson.id),
+        'current_index': outline.position(lesson.id),
+        'total_lessons': len(outline)
     }
     
     return render(request, 'lesson_detail.html', context)
 
+@hub_login_required(json=True)
 def update_lesson_progress(request, lesson_id):
-    if 'user_id' not in request.session:
-        return JsonResponse({'error': 'Not authenticated'}, status=401)
-    
     if request.method == 'POST':
-        user = get_object_or_404(User, id=request.session['user_id'])
-        lesson = get_object_or_404(Lesson, id=lesson_id)
-        
         progress_percentage = int(request.POST.get('progress_percentage', 0))
         is_completed = request.POST.get('is_completed', 'false').lower() == 'true'
         
-        progress, created = LessonProgress.objects.get_or_create(
-            user=user, 
-            lesson=lesson,
-            defaults={'progress_percentage': 0}
-        )
+        # Percentage-only updates are coalesced and written in bulk
+        if settings.PROGRESS_WRITE_BEHIND and not is_completed:
+            lesson = get_object_or_404(Lesson.objects.only('id'), id=lesson_id)
+            progress_buffer.add(request.hub_user.id, lesson.id, progress_percentage)
+            return JsonResponse({'success': True})
         
-        progress.progress_percentage = progress_percentage
-        if is_completed and not progress.is_completed:
-            progress.is_completed = True
-            progress.completed_at = timezone.now()
+        lesson = get_object_or_404(Lesson.objects.select_related('module'), id=lesson_id)
         
-        progress.save()
+        record_lesson_progress(request.hub_user, lesson, progress_percentage, is_completed)
         
         return JsonResponse({'success': True})
     
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
-def dashboard(request):
-    if 'user_id' not in request.session:
-        return redirect('login')
+def _is_true(value):
+    # Same rule as the single-lesson form field: only true (or "true") completes a lesson
+    return value is True or (isinstance(value, str) and value.lower() == 'true')
+
+@hub_login_required(json=True)
+def update_lesson_progress_batch(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    
+    try:
+        payload = json.loads(request.body)
+        items = payload['updates'] if isinstance(payload, dict) else payload
+        updates = [
+            (
+                int(item['lesson_id']),
+                max(0, min(100, int(item.get('progress_percentage', 0)))),
+                _is_true(item.get('is_completed', False)),
+            )
+            for item in items
+        ]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Invalid payload'}, status=400)
+    
+    if len(updates) > PROGRESS_BATCH_LIMIT:
+        return JsonResponse({'error': f'At most {PROGRESS_BATCH_LIMIT} updates per batch'}, status=400)
     
-    user = get_object_or_404(User, id=request.session['user_id'])
+    applied, missing = apply_progress_batch(request.hub_user.id, updates)
     
-    # Get user's enrollments
-    enrollments = Enrollment.objects.filter(user=user, is_active=True)
+    return JsonResponse({'success': True, 'applied': applied, 'missing': missing})
+
+@hub_login_required
+def dashboard(request):
+    user = request.hub_user
     
-    # Calculate overall progress
-    total_courses = enrollments.count()
-    completed_courses = enrollments.filter(completed_at__isnull=False).count()
+    # Get user's enrollments with their courses in the same query
+    enrollments = Enrollment.objects.filter(user=user, is_active=True).select_related('course')
     
-    # Get recent activity
-    recent_progress = LessonProgress.objects.filter(
-        user=user, 
-        is_completed=True
-    ).order_by('-completed_at')[:5]
+    # Counters and recent activity come from the cached per-user summary
+    summary = get_dashboard_summary(user.id)
     
     context = {
         'user': user,
         'enrollments': enrollments,
-        'total_courses': total_courses,
-        'completed_courses': completed_courses,
-        'recent_progress': recent_progress
+        'summary': summary,
+        'total_courses': summary['total_courses'],
+        'completed_courses': summary['completed_courses'],
+        'recent_progress': summary['recent_progress']
     }
     
     return render(request, 'dashboard.html', context)
 
+@hub_login_required
 def my_courses(request):
-    if 'user_id' not in request.session:
-        return redirect('login')
-    
-    user = get_object_or_404(User, id=request.session['user_id'])
-    enrollments = Enrollment.objects.filter(user=user, is_active=True)
+    user = request.hub_user
+    enrollments = Enrollment.objects.filter(user=user, is_active=True).select_related('course')
     
     context = {
         'enrollments': enrollments
@@ -330,6 +383,34 @@ def my_courses(request):
     
     return render(request, 'my_courses.html', context)
 
+@staff_member_required
+@read_from_replica
+def export_data(request, dataset):
+    """Stream enrollments or lesson progress as CSV or JSONL, optionally gzipped"""
+    if dataset not in EXPORTS:
+        raise Http404('Unknown export')
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in FORMATS:
+        return HttpResponseBadRequest(f'format must be one of: {", ".join(FORMATS)}')
+    try:
+        since = parse_since(request.GET['since']) if request.GET.get('since') else None
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    compress = request.GET.get('gzip') in ('1', 'true')
+
+    # Rows are read while the response streams, after the view returns, so pick the database now
+    until = export_until()
+    columns, rows = export_rows(dataset, since, until, using=router.db_for_read(EXPORTS[dataset][0]))
+    response = StreamingHttpResponse(
+        stream_export(columns, rows, export_format, compress),
+        content_type='application/gzip' if compress else FORMATS[export_format],
+    )
+    filename = f'{dataset}.{export_format}' + ('.gz' if compress else '')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Pass this back as since on the next run to fetch only newer changes
+    response['X-Export-Until'] = until.isoformat()
+    return response
+
 # Social Authentication Views
 
 def google_auth(request):
@@ -356,6 +437,17 @@ def google_auth(request):
     auth_url = f"{settings.GOOGLE_OAUTH2_AUTH_URL}?{urlencode(params)}"
     return redirect(auth_url)
 
+def _access_token(token_info):
+    # Providers answer errors with 200 and odd bodies; accept only a token string
+    token = token_info.get('access_token') if isinstance(token_info, dict) else None
+    return token if isinstance(token, str) and token else None
+
+
+def _text(info, key):
+    value = info.get(key)
+    return value if isinstance(value, str) else ''
+
+
 def google_callback(request):
     """Handle Google OAuth2 callback"""
     if not settings.GOOGLE_OAUTH2_CLIENT_ID:
@@ -384,47 +476,46 @@ def google_callback(request):
     }
     
     try:
-        response = requests.post(settings.GOOGLE_OAUTH2_TOKEN_URL, data=token_data)
-        response.raise_for_status()
-        token_info = response.json()
-        
-        # Get user info
-        headers = {'Authorization': f"Bearer {token_info['access_token']}"}
-        user_response = requests.get(settings.GOOGLE_OAUTH2_USERINFO_URL, headers=headers)
-        user_response.raise_for_status()
-        user_info = user_response.json()
-        
-        # Create or get user
-        email = user_info.get('email')
-        if not email:
-            messages.error(request, 'Email not provided by Google.')
+        token_info = oauth_http.fetch_json('POST', settings.GOOGLE_OAUTH2_TOKEN_URL, data=token_data)
+        access_token = _access_token(token_info)
+        if not access_token:
+            messages.error(request, 'Access token not received from Google.')
             return redirect('login')
         
-        user, created = User.objects.get_or_create(
-            email=email,
-            defaults={
-                'firstname': user_info.get('given_name', ''),
-                'lastname': user_info.get('family_name', ''),
-            }
-        )
-        
-        # Update user info if not created
-        if not created:
-            user.firstname = user_info.get('given_name', user.firstname)
-            user.lastname = user_info.get('family_name', user.lastname)
-            user.save()
-        
-        # Store user info in session
-        request.session['user_id'] = user.id
-        request.session['user_name'] = f"{user.firstname} {user.lastname}"
-        request.session['user_email'] = user.email
-        
-        messages.success(request, f'Welcome back, {user.firstname}!')
-        return redirect('dashboard')
-        
-    except requests.RequestException as e:
+        # Get user info
+        headers = {'Authorization': f"Bearer {access_token}"}
+        user_info = oauth_http.fetch_json('GET', settings.GOOGLE_OAUTH2_USERINFO_URL, headers=headers)
+    except (httpx.HTTPError, ValueError) as e:
         messages.error(request, f'Error during Google authentication: {str(e)}')
         return redirect('login')
+    
+    if not isinstance(user_info, dict):
+        messages.error(request, 'Unexpected response from Google.')
+        return redirect('login')
+    
+    # Create or get user
+    email = _text(user_info, 'email')
+    if not email:
+        messages.error(request, 'Email not provided by Google.')
+        return redirect('login')
+    
+    user, created = User.objects.get_or_create(
+        email=email,
+        defaults={
+            'firstname': _text(user_info, 'given_name'),
+            'lastname': _text(user_info, 'family_name'),
+        }
+    )
+    
+    # Update user info if not created
+    if not created:
+        user.firstname = _text(user_info, 'given_name') or user.firstname
+        user.lastname = _text(user_info, 'family_name') or user.lastname
+        user.save()
+    
+    _start_oauth_session(request, user)
+    messages.success(request, f'Welcome back, {user.firstname}!')
+    return redirect('dashboard')
 
 def github_auth(request):
     """Initiate GitHub OAuth2 authentication"""
@@ -476,64 +567,64 @@ def github_callback(request):
     headers = {'Accept': 'application/json'}
     
     try:
-        response = requests.post(settings.GITHUB_OAUTH2_TOKEN_URL, data=token_data, headers=headers)
-        response.raise_for_status()
-        token_info = response.json()
+        token_info = oauth_http.fetch_json('POST', settings.GITHUB_OAUTH2_TOKEN_URL, data=token_data, headers=headers)
         
-        if 'access_token' not in token_info:
+        access_token = _access_token(token_info)
+        if not access_token:
             messages.error(request, 'Access token not received from GitHub.')
             return redirect('login')
         
-        # Get user info
+        # Get user info and emails concurrently
         headers = {
-            'Authorization': f"token {token_info['access_token']}",
+            'Authorization': f"token {access_token}",
             'Accept': 'application/vnd.github.v3+json'
         }
-        user_response = requests.get(settings.GITHUB_OAUTH2_USERINFO_URL, headers=headers)
-        user_response.raise_for_status()
-        user_info = user_response.json()
-        
-        # Get user email
-        email_response = requests.get('https://api.github.com/user/emails', headers=headers)
-        email_response.raise_for_status()
-        emails = email_response.json()
-        
-        # Find primary email
-        primary_email = None
-        for email_data in emails:
-            if email_data.get('primary') and email_data.get('verified'):
-                primary_email = email_data.get('email')
-                break
-        
-        if not primary_email:
-            messages.error(request, 'No verified email found for GitHub account.')
-            return redirect('login')
-        
-        # Create or get user
-        user, created = User.objects.get_or_create(
-            email=primary_email,
-            defaults={
-                'firstname': user_info.get('name', '').split()[0] if user_info.get('name') else '',
-                'lastname': ' '.join(user_info.get('name', '').split()[1:]) if user_info.get('name') and len(user_info.get('name', '').split()) > 1 else '',
-            }
+        user_info, emails = oauth_http.fetch_json_concurrently(
+            ('GET', settings.GITHUB_OAUTH2_USERINFO_URL, {'headers': headers}),
+            ('GET', settings.GITHUB_OAUTH2_EMAILS_URL, {'headers': headers}),
         )
-        
-        # Update user info if not created
-        if not created:
-            name_parts = user_info.get('name', '').split()
-            if len(name_parts) > 0:
-                user.firstname = name_parts[0]
-                user.lastname = ' '.join(name_parts[1:]) if len(name_parts) > 1 else ''
-                user.save()
-        
-        # Store user info in session
-        request.session['user_id'] = user.id
-        request.session['user_name'] = f"{user.firstname} {user.lastname}"
-        request.session['user_email'] = user.email
-        
-        messages.success(request, f'Welcome back, {user.firstname}!')
-        return redirect('dashboard')
-        
-    except requests.RequestException as e:
+    except (httpx.HTTPError, ValueError) as e:
         messages.error(request, f'Error during GitHub authentication: {str(e)}')
-        return redirect('login')
\ No newline at end of file
+        return redirect('login')
+    
+    if not isinstance(user_info, dict) or not isinstance(emails, list):
+        messages.error(request, 'Unexpected response from GitHub.')
+        return redirect('login')
+    
+    # Find primary email
+    primary_email = None
+    for email_data in emails:
+        if isinstance(email_data, dict) and email_data.get('primary') and email_data.get('verified'):
+            primary_email = _text(email_data, 'email')
+            break
+    
+    if not primary_email:
+        messages.error(request, 'No verified email found for GitHub account.')
+        return redirect('login')
+    
+    # Create or get user
+    name_parts = _text(user_info, 'name').split()
+    user, created = User.objects.get_or_create(
+        email=primary_email,
+        defaults={
+            'firstname': name_parts[0] if name_parts else '',
+            'lastname': ' '.join(name_parts[1:]),
+        }
+    )
+    
+    # Update user info if not created
+    if not created and name_parts:
+        user.firstname = name_parts[0]
+        user.lastname = ' '.join(name_parts[1:])
+        user.save()
+    
+    _start_oauth_session(request, user)
+    messages.success(request, f'Welcome back, {user.firstname}!')
+    return redirect('dashboard')
+
+
+def _start_oauth_session(request, user):
+    # Store user info in session
+    request.session['user_id'] = user.id
+    request.session['user_name'] = f"{user.firstname} {user.lastname}"
+    request.session['user_email'] = user.email